@@ -0,0 +1,92 @@
+"""Time cache bundle export/import and measure import peak memory.
+
+    python benchmarks/bench_bundle.py [--tips 100000] [--keys 30]
+
+Builds a cache of synthetic AI tips, exports it, then imports the bundle
+into an empty cache (every tip added) and into the full cache (every tip a
+duplicate).  Peak memory is the tracemalloc high-water mark of the import
+alone, taken in a separate run because tracing slows it down several times.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+
+def _make_cache(n: int, keys: int) -> dict:
+    topics = ["python", "git", "docker", "sql", "linux", "kubernetes", "vim", "javascript", "terraform", "rust"]
+    levels = ["beginner", "intermediate", "advanced"]
+    entries: dict = {}
+    for i in range(n):
+        k = i % keys
+        topic, level = topics[k % len(topics)], levels[(k // len(topics)) % len(levels)]
+        entries.setdefault(f"{topic}:{level}", {"generated_at": 0.0, "tips": []})["tips"].append({
+            "id": f"ai-{i:08x}",
+            "topic": topic,
+            "level": level,
+            "title": f"Synthetic {topic} tip {i}",
+            "body": f"Use option {i} of {topic} to make the {level} workflow {i % 97} times faster.",
+            "example": f"{topic} --option-{i}",
+            "source": "ai",
+        })
+    return {"version": 2, "keys": entries}
+
+
+def _measure(setup, fn) -> tuple[float, float, object]:
+    setup()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+
+    setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tips", type=int, default=100_000)
+    parser.add_argument("--keys", type=int, default=30)
+    args = parser.parse_args()
+
+    import json
+
+    import dev_tip.ai.cache as cache
+    import dev_tip.search as search
+    from dev_tip.ai.bundle import export_bundle, import_bundle
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        cache.CACHE_DIR = root
+        cache.CACHE_FILE = root / "ai_cache.json"
+        search.INDEX_FILE = root / "search.idx"
+        search.DELTA_FILE = root / "search_delta.jsonl"
+        full_cache = json.dumps(_make_cache(args.tips, args.keys))
+        cache.CACHE_FILE.write_text(full_cache)
+        cache_mb = cache.CACHE_FILE.stat().st_size / 2**20
+
+        bundle = root / "bundle.jsonl.gz"
+        start = time.perf_counter()
+        export_bundle(bundle)
+        export_s = time.perf_counter() - start
+        bundle_mb = bundle.stat().st_size / 2**20
+
+        dup_s, dup_mb, dup = _measure(lambda: cache.CACHE_FILE.write_text(full_cache), lambda: import_bundle(bundle))
+        new_s, new_mb, new = _measure(lambda: cache.CACHE_FILE.unlink(missing_ok=True), lambda: import_bundle(bundle))
+
+    print(f"{args.tips} tips in {args.keys} keys: cache {cache_mb:.1f} MiB, bundle {bundle_mb:.1f} MiB gzip")
+    print(f"export:                 {export_s:6.2f} s")
+    print(f"import into empty:      {new_s:6.2f} s  peak {new_mb:6.1f} MiB  added {new['added']}")
+    print(f"import, all duplicates: {dup_s:6.2f} s  peak {dup_mb:6.1f} MiB  skipped {dup['duplicates']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
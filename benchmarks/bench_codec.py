@@ -0,0 +1,114 @@
+"""Parse/serialize time and memory of a large AI cache: dicts + json vs Tip + codec.
+
+    python benchmarks/bench_codec.py [--tips 50000] [--backend json]
+
+"before" is how the cache used to be handled: stdlib json, pretty-printed
+with indent=2, every tip a dict.  "after" is dev_tip.codec (orjson or
+msgspec when installed, see --backend) on the compact file, with tips
+handed out as Tip records.  "parse" reads the whole file, as every prompt
+does; "all tips" is ``load_cache(None, None)``, what a long-running engine
+or ``dev-tip digest`` keeps.  Memory is what those tips keep allocated
+(tracemalloc), measured in a separate pass because tracing slows it down.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+
+def _make_cache(n: int) -> dict:
+    topics = ["python", "git", "docker", "sql", "linux", "kubernetes", "vim", "javascript", "terraform", "rust"]
+    levels = ["beginner", "intermediate", "advanced"]
+    entries: dict = {}
+    for i in range(n):
+        topic, level = topics[i % len(topics)], levels[(i // len(topics)) % len(levels)]
+        entries.setdefault(f"{topic}:{level}", {"generated_at": 0.0, "tips": []})["tips"].append({
+            "id": f"ai-{i:08x}",
+            "topic": topic,
+            "level": level,
+            "title": f"Synthetic {topic} tip {i}",
+            "body": f"Use option {i} of {topic} to make the {level} workflow {i % 97} times faster.",
+            "example": f"{topic} --option-{i}",
+            "source": "ai",
+        })
+    return {"version": 3, "keys": entries}
+
+
+def _best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _retained(fn) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tips", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", choices=["auto", "json"], default="auto", help="json: ignore orjson/msgspec")
+    args = parser.parse_args()
+
+    if args.backend == "json":
+        sys.modules["orjson"] = sys.modules["msgspec"] = None  # type: ignore[assignment]
+    from dev_tip import codec
+    from dev_tip.ai.cache import _load_all, load_cache
+    from dev_tip.state import use_state_dir
+
+    data = _make_cache(args.tips)
+    with tempfile.TemporaryDirectory() as tmp:
+        old_file, new_file = Path(tmp) / "old.json", Path(tmp) / "ai_cache.json"
+        old_file.write_text(json.dumps(data, indent=2))
+        new_file.write_bytes(codec.dumps(data))
+        old_data = json.loads(old_file.read_text())
+        new_data = _load_all(new_file)
+
+        def old_all() -> list[dict]:
+            return [t for entry in json.loads(old_file.read_text())["keys"].values() for t in entry["tips"]]
+
+        def new_all() -> list:
+            with use_state_dir(tmp):
+                return load_cache(None, None)
+
+        rows = [
+            ("before (json, dict)", old_file,
+             lambda: json.loads(old_file.read_text()),
+             lambda: old_file.write_text(json.dumps(old_data, indent=2)),
+             old_all),
+            (f"after ({codec.BACKEND}, Tip)", new_file,
+             lambda: _load_all(new_file),
+             lambda: new_file.write_bytes(codec.dumps(new_data)),
+             new_all),
+        ]
+        print(f"{args.tips} tips")
+        print(f"{'':<24}{'file':>10}{'parse':>10}{'serialize':>11}{'all tips':>10}{'memory':>10}")
+        for name, path, parse, serialize, every in rows:
+            parse_s, dump_s, every_s = (_best(fn, args.repeat) for fn in (parse, serialize, every))
+            memory = _retained(every)
+            print(
+                f"{name:<24}{path.stat().st_size / 1e6:>8.1f}MB{parse_s * 1000:>8.0f}ms"
+                f"{dump_s * 1000:>9.0f}ms{every_s * 1000:>8.0f}ms{memory / 1e6:>8.1f}MB"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
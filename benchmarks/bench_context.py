@@ -0,0 +1,70 @@
+"""Time context classification plus the biased bucket draw.
+
+    python benchmarks/bench_context.py [--iterations 2000] [--budget-ms 1]
+
+Each shell prompt runs dev-tip in a fresh process, so "cold" clears the
+trie and sampler memos before every iteration: it is the cost one tip pays.
+"warm" is the memoized steady state.  Exits non-zero if the cold cost is
+over budget.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CONTEXTS = ["git status", "sudo docker", "kubectl get", "python3 -m", "ls -la", "cargo build", "psql -h"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--budget-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    import dev_tip.context as context
+    import dev_tip.mix as mix
+    import dev_tip.store as store_module
+    import dev_tip.tips as tips_module
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store_module.STORE_FILE = Path(tmp) / "tips.bin"
+        tips_module.PACKS_DIR = Path(tmp) / "packs"
+        store = store_module.open_store()
+        buckets = store.buckets()
+
+        def draw(i: int) -> None:
+            topic = context.classify(CONTEXTS[i % len(CONTEXTS)], "mytool*:python")
+            sampler = mix.bucket_sampler(buckets, context.bias_mix(None, topic), None)
+            store.find(*sampler.sample(rng))
+
+        def timed(clear: bool) -> list[float]:
+            samples = []
+            for i in range(args.iterations):
+                if clear:
+                    context._trie.cache_clear()
+                    mix._bucket_sampler.cache_clear()
+                start = time.perf_counter()
+                draw(i)
+                samples.append((time.perf_counter() - start) * 1000)
+            return sorted(samples)
+
+        cold, warm = timed(True), timed(False)
+        store.close()
+
+    for label, samples in (("cold", cold), ("warm", warm)):
+        p50 = samples[len(samples) // 2]
+        p99 = samples[int(len(samples) * 0.99)]
+        print(f"{label}: p50 {p50 * 1000:7.1f} us   p99 {p99 * 1000:7.1f} us")
+    p99_cold = cold[int(len(cold) * 0.99)]
+    ok = p99_cold < args.budget_ms
+    print(f"budget {args.budget_ms} ms: {'ok' if ok else 'EXCEEDED'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
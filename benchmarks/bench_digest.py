@@ -0,0 +1,81 @@
+"""Tips per second: one ``dev-tip`` run per user vs ``dev-tip digest``.
+
+    python benchmarks/bench_digest.py [--users 200] [--count 3] [--sample 20]
+
+Creates ``--users`` state directories in a temporary home and compares:
+
+- per-user: ``dev-tip`` started once per tip with HOME pointing at the
+            user, timed on ``--sample`` users (after one untimed run each,
+            so their stores are already compiled) and scaled up
+- digest:   one ``dev-tip digest --count N --targets-from`` process for
+            every user, JSON output, including interpreter startup
+- engine:   the digest loop alone, in this process, with the corpus loaded
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CLI = "from dev_tip.cli import app; app()"
+
+
+def _run(args: list[str], home: Path) -> None:
+    env = {**os.environ, "HOME": str(home), "NO_COLOR": "1"}
+    subprocess.run([sys.executable, "-c", CLI, *args], env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--count", type=int, default=3, help="tips per user")
+    parser.add_argument("--sample", type=int, default=20, help="users timed for the per-user baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        homes = [root / f"user{n}" for n in range(args.users)]
+        for home in homes:
+            (home / ".dev-tip").mkdir(parents=True)
+        listing = root / "targets.txt"
+        listing.write_text("".join(f"{home / '.dev-tip'}\n" for home in homes))
+        admin = root / "admin"
+        admin.mkdir()
+        _run(["digest", "--no-mark"], admin)  # Compile the admin's store once
+
+        sample = homes[: args.sample]
+        for home in sample:
+            _run([], home)
+        start = time.perf_counter()
+        for home in sample:
+            for _ in range(args.count):
+                _run([], home)
+        per_user = len(sample) * args.count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        _run(["digest", "--count", str(args.count), "--targets-from", str(listing), "--format", "json"], admin)
+        digest_rate = args.users * args.count / (time.perf_counter() - start)
+
+        os.environ["HOME"] = str(admin)  # Before importing dev_tip: its paths are fixed at import
+        from dev_tip.digest import digest, load_corpus
+
+        corpus = load_corpus()
+        targets = [home / ".dev-tip" for home in homes]
+        start = time.perf_counter()
+        tips = sum(len(d.tips) for d in digest(corpus, targets, args.count))
+        engine_rate = tips / (time.perf_counter() - start)
+
+    total = args.users * args.count
+    print(f"{args.users} users x {args.count} tips = {total} tips")
+    print(f"{'per-user dev-tip':<18}{per_user:>10.0f} tips/s   ({total / per_user:.1f} s for all users)")
+    print(f"{'digest process':<18}{digest_rate:>10.0f} tips/s   ({total / digest_rate:.2f} s)")
+    print(f"{'digest loop':<18}{engine_rate:>10.0f} tips/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
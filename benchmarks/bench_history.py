@@ -0,0 +1,175 @@
+"""Compare history.json rewrites with per-host segments on a slow filesystem.
+
+    python benchmarks/bench_history.py [--hosts 24] [--entries 400] [--latency-ms 2]
+                                       [--writers 8] [--marks 100]
+
+NFS is simulated by sleeping ``--latency-ms`` (one round trip) in every
+open, stat, directory scan, rename and unlink, so the numbers scale with the
+metadata operations each design needs.  A directory scan counts as one
+round trip including the entries' attributes, as with NFS READDIRPLUS.
+Reports, for the old single-file history and for segments:
+
+- read:   ``_load_history`` latency, cold (no cached view) and warm
+- write:  ``mark_seen`` latency, and a mark followed by a read (one prompt)
+- lost:   marks lost when ``--writers`` processes, each acting as a
+          different host, mark ``--marks`` tips at the same time
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _slow_filesystem(latency: float) -> None:
+    """Add one round trip to every metadata operation in this process."""
+    def slow(fn):
+        def wrapper(*args, **kwargs):
+            time.sleep(latency)
+            return fn(*args, **kwargs)
+        return wrapper
+
+    for name in ("open", "stat", "scandir", "replace", "unlink", "mkdir"):
+        setattr(os, name, slow(getattr(os, name)))
+    io.open = slow(io.open)
+
+
+# The single-file history from before segments, for comparison
+def _legacy_load(path: Path) -> list[str]:
+    if not path.exists():
+        return []
+    return json.loads(path.read_text())
+
+
+def _legacy_mark(path: Path, tip_id: str) -> None:
+    seen = _legacy_load(path)
+    if tip_id not in seen:
+        seen.append(tip_id)
+        path.write_text(json.dumps(seen))
+
+
+def _populate(root: Path, hosts: int, entries: int) -> None:
+    import dev_tip.history as history
+
+    history.HISTORY_SEGMENTS = root / "history.d"
+    history.HISTORY_FILE = root / "history.json"
+    history.HISTORY_SEGMENTS.mkdir(parents=True)
+    ids = [f"tip-{n}" for n in range(entries * hosts)]
+    legacy = []
+    for h in range(hosts):
+        lines = "".join(f"{time.time_ns()}\t+\t{tip_id}\n" for tip_id in ids[h::hosts])
+        (history.HISTORY_SEGMENTS / f"host{h}.log").write_text(lines)
+        legacy += ids[h::hosts]
+    (root / "legacy.json").write_text(json.dumps(legacy))
+
+
+def _timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def _writer(root: Path, host: str, marks: int, legacy: bool) -> None:
+    import dev_tip.history as history
+
+    # The slow filesystem is inherited from the parent through fork
+    history.HISTORY_SEGMENTS = root / "history.d"
+    history.HISTORY_FILE = root / "history.json"
+    history.HOST = host
+    for n in range(marks):
+        if legacy:
+            try:
+                _legacy_mark(root / "legacy.json", f"{host}-{n}")
+            except ValueError:
+                pass  # Read the file while another host was rewriting it
+        else:
+            history.mark_seen(f"{host}-{n}")
+
+
+def _lost(root: Path, writers: int, marks: int, legacy: bool) -> int:
+    import dev_tip.history as history
+
+    history.HISTORY_SEGMENTS = root / "history.d"
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_writer, args=(root, f"w{i}", marks, legacy)) for i in range(writers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    seen = _legacy_load(root / "legacy.json") if legacy else history._load_history()
+    return writers * marks - sum(1 for tip_id in seen if tip_id.startswith("w"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=24, help="hosts with existing history segments")
+    parser.add_argument("--entries", type=int, default=400, help="seen tips per host")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="simulated round trip per metadata call")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--marks", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    import dev_tip.history as history
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _populate(root, args.hosts, args.entries)
+        legacy_file = root / "legacy.json"
+        view = history._view_path()
+
+        # Marks go to fresh ids so the single file keeps growing like the real one
+        counter = iter(range(10**9))
+        results: dict[str, dict[str, float]] = {"history.json": {}, "segments": {}}
+        _slow_filesystem(latency)
+        legacy_read = _timed(lambda: _legacy_load(legacy_file), args.repeat)
+        results["history.json"]["read cold"] = results["history.json"]["read warm"] = legacy_read
+        results["history.json"]["write"] = _timed(lambda: _legacy_mark(legacy_file, f"new-{next(counter)}"), args.repeat)
+        results["history.json"]["read after write"] = _timed(
+            lambda: (_legacy_mark(legacy_file, f"new-{next(counter)}"), _legacy_load(legacy_file)), args.repeat
+        )
+
+        def cold_read():
+            view.unlink(missing_ok=True)
+            history._load_history()
+
+        results["segments"]["read cold"] = _timed(cold_read, args.repeat)
+        history._load_history()
+        results["segments"]["read warm"] = _timed(history._load_history, args.repeat)
+        results["segments"]["write"] = _timed(lambda: history.mark_seen(f"new-{next(counter)}"), args.repeat)
+        results["segments"]["read after write"] = _timed(
+            lambda: (history.mark_seen(f"new-{next(counter)}"), history._load_history()), args.repeat
+        )
+
+    lost = {}
+    for legacy in (True, False):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "history.d").mkdir()
+            lost["history.json" if legacy else "segments"] = _lost(root, args.writers, args.marks, legacy)
+
+    total = args.hosts * args.entries
+    print(f"{total} seen tips over {args.hosts} hosts, {args.latency_ms:g} ms per metadata call")
+    print(f"{'':<14}{'read cold':>11}{'read warm':>11}{'write':>9}{'mark+read':>11}{'lost':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:<14}{r['read cold']:>9.1f}ms{r['read warm']:>9.1f}ms{r['write']:>7.1f}ms"
+            f"{r['read after write']:>9.1f}ms{lost[name]:>8}"
+        )
+    print(f"lost = marks missing after {args.writers} hosts wrote {args.marks} each concurrently")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
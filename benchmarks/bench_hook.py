@@ -0,0 +1,127 @@
+"""Measure per-prompt overhead of the generated shell hook in bash and zsh.
+
+    python benchmarks/bench_hook.py [--prompts 5000] [--shell bash --shell zsh]
+                                    [--command :] [--block my_hook.sh] [--shared-schedule]
+                                    [--budget-us 100] [--trigger-budget-us 3000]
+
+The hook block from ``_build_hook_block`` is sourced into a non-interactive
+shell, and its prompt function is called ``--prompts`` times in a loop timed
+with ``$EPOCHREALTIME``.  An empty function called the same way is timed
+too and subtracted, so only the hook's own cost is left.
+
+- idle:    the counters never reach the threshold (the common prompt)
+- trigger: every prompt triggers; ``--command`` (default ``:``, a no-op)
+           stands in for dev-tip, so this is the hook's own trigger cost.
+           Pass ``--command dev-tip`` to include a real tip.
+
+``--shared-schedule`` benchmarks the hook that keeps one schedule file for
+all shells; its idle time includes restarting that file every 15 prompts.  ``--block`` benchmarks a hand-edited hook file instead, to compare variants
+(e.g. caching the pause state in a variable).  It must define the same
+function and use ``__EVERY__`` where the command threshold goes.  Exits
+non-zero when a budget is exceeded.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROMPT_FUNCTION = {"bash": "_dev_tip_prompt", "zsh": "_dev_tip_precmd"}
+
+_LOOP = """\
+{preamble}
+{block}
+_bench_empty() {{ :; }}
+_bench_before() {{ {before_prompt}; }}
+_bench_loop() {{
+    local pre=$1 fn=$2 i
+    local t0=$EPOCHREALTIME
+    for (( i = 0; i < {prompts}; i++ )); do
+        $pre
+        $fn
+    done
+    local t1=$EPOCHREALTIME
+    echo "$t0 $t1"
+}}
+_bench_loop _bench_empty _bench_empty
+_bench_loop _bench_before {function}
+"""
+
+_PREAMBLE = {
+    "bash": "set -o history\nhistory -s 'git status'",
+    "zsh": "zmodload zsh/datetime\nsetopt no_nomatch",
+}
+
+# What the shell does between prompts that the hook relies on
+_BEFORE_PROMPT = {"bash": ":", "zsh": "_dev_tip_preexec 'git status'"}
+
+
+def _block(shell: str, command: str, every: int, pause_file: Path, custom: Path | None, shared: bool) -> str:
+    if custom is not None:
+        return custom.read_text().replace("__EVERY__", str(every))
+
+    import dev_tip.hook as hook
+
+    hook.PAUSE_FILE = pause_file
+    hook.SCHEDULE_FILE = pause_file.with_name(".schedule")
+    hook.SCHEDULE_FILE.write_text(f"{int(time.time())}\n")  # Idle: no tip is due by time
+    return hook._build_hook_block(shell, command, every, 10**6, shared)
+
+
+def _per_prompt_us(shell: str, block: str, prompts: int, home: str, before: str = "") -> float:
+    script = _LOOP.format(
+        preamble=_PREAMBLE[shell],
+        block=block,
+        prompts=prompts,
+        before_prompt=_BEFORE_PROMPT[shell] + before,
+        function=PROMPT_FUNCTION[shell],
+    )
+    # EPOCHREALTIME uses the locale's decimal point; a real dev-tip must not touch ~/.dev-tip
+    env = dict(os.environ, LC_ALL="C", HOME=home)
+    out = subprocess.run([shell, "-c", script], capture_output=True, text=True, check=True, env=env)
+    (base0, base1), (hook0, hook1) = (map(float, line.split()) for line in out.stdout.split("\n")[:2])
+    return ((hook1 - hook0) - (base1 - base0)) / prompts * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prompts", type=int, default=5000)
+    parser.add_argument("--shell", action="append", choices=sorted(PROMPT_FUNCTION))
+    parser.add_argument("--command", default=":", help="command the hook runs when triggered")
+    parser.add_argument("--block", type=Path, help="hook file to benchmark instead of the generated one")
+    parser.add_argument("--shared-schedule", action="store_true", help="one schedule file for all shells")
+    parser.add_argument("--budget-us", type=float, default=100.0, help="max idle overhead per prompt")
+    parser.add_argument("--trigger-budget-us", type=float, default=3000.0, help="max trigger overhead")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        pause_file = Path(tmp) / ".paused"
+        for shell in args.shell or sorted(PROMPT_FUNCTION):
+            if not shutil.which(shell):
+                print(f"{shell}: not installed, skipped")
+                continue
+            trigger_prompts = max(args.prompts // 10, 1)  # Triggering is far slower
+            idle_block = _block(shell, args.command, 10**9, pause_file, args.block, args.shared_schedule)
+            trigger_block = _block(shell, args.command, 1, pause_file, args.block, args.shared_schedule)
+            # The shared schedule grows by a byte per command until a tip; restart it as often as
+            # the default every_commands would, so it stays the size it has in real use
+            reset = f"; (( ++_bench_n % 15 )) || echo $EPOCHSECONDS > {tmp}/.schedule" if args.shared_schedule else ""
+            idle = _per_prompt_us(shell, idle_block, args.prompts, tmp, reset)
+            trigger = _per_prompt_us(shell, trigger_block, trigger_prompts, tmp)
+
+            idle_ok = idle <= args.budget_us
+            trigger_ok = trigger <= args.trigger_budget_us
+            failed |= not (idle_ok and trigger_ok)
+            print(f"{shell}: idle {idle:8.1f} us/prompt {'ok' if idle_ok else 'OVER BUDGET'}   "
+                  f"trigger {trigger:8.1f} us/prompt {'ok' if trigger_ok else 'OVER BUDGET'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
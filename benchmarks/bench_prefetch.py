@@ -0,0 +1,98 @@
+"""Measure the cost of a background prefetch: subprocess spawn vs fork.
+
+    python benchmarks/bench_prefetch.py [--runs 10]
+
+"subprocess" is the previous approach (a fresh ``python -m dev_tip.prefetch``
+interpreter); "fork" is prefetch.spawn's approach (a child of the already
+loaded CLI process).  Both run one prefetch against the offline fake
+provider.  Each variant is measured in its own process so RUSAGE_CHILDREN
+only sees that variant's workers.  Reported per prefetch:
+
+- parent: wall time until control returns to the CLI
+- worker: CPU time (user + sys) of the worker and its peak RSS
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _measure(variant: str, runs: int) -> dict:
+    """Run one variant in this process; paths must already point at a temp home."""
+    from dev_tip.ai.cache import clear_cache
+    from dev_tip.config import load_config
+    from dev_tip.prefetch import run
+
+    config = load_config()
+    env = dict(os.environ)
+    parent_s = 0.0
+    for _ in range(runs):
+        clear_cache()
+        start = time.perf_counter()
+        if variant == "subprocess":
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "dev_tip.prefetch", "python", "null"],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            parent_s += time.perf_counter() - start
+            proc.wait()
+        else:
+            # Same work as spawn(), minus the double fork, so the worker can be reaped
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    run("python", None, config)
+                finally:
+                    os._exit(0)
+            parent_s += time.perf_counter() - start
+            os.waitpid(pid, 0)
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "parent_ms": parent_s / runs * 1000,
+        "cpu_ms": (usage.ru_utime + usage.ru_stime) / runs * 1000,
+        "max_rss_mb": usage.ru_maxrss / 1024,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--variant", choices=["subprocess", "fork"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        # Warm the CLI's imports first, as they would be after showing a tip
+        import dev_tip.cli  # noqa: F401
+
+        print(json.dumps(_measure(args.variant, args.runs)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state = Path(tmp) / ".dev-tip"
+        state.mkdir()
+        (state / "config.toml").write_text('ai_provider = "fake"\n')
+        env = dict(os.environ, HOME=tmp)
+        repo_root = str(Path(__file__).resolve().parent.parent)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [repo_root, env.get("PYTHONPATH")]))
+
+        print(f"{'variant':<12} {'parent wait':>12} {'worker CPU':>12} {'worker RSS':>12}")
+        for variant in ("subprocess", "fork"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--variant", variant, "--runs", str(args.runs)],
+                env=env, capture_output=True, text=True, check=True,
+            )
+            m = json.loads(out.stdout)
+            print(f"{variant:<12} {m['parent_ms']:>9.2f} ms {m['cpu_ms']:>9.1f} ms {m['max_rss_mb']:>9.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
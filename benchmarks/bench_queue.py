@@ -0,0 +1,93 @@
+"""Refills that reach the cache when shells ask for several keys at once: lock-only vs queue.
+
+    python benchmarks/bench_queue.py [--keys 8] [--latency-ms 300] [--gap-ms 40]
+
+Shells ask for refills of ``--keys`` different (topic, level) keys, one every
+``--gap-ms``, against the offline fake provider answering in
+``--latency-ms``.  "lock only" is how prefetching used to work: a refill
+asked for while another prefetch held the lock was dropped, and that key
+later cost a blocking fetch in the foreground.  "queue" is prefetch.spawn
+with the job queue.  Reported: keys refilled in the background, blocking
+fetches left for the foreground, and the time until the workers are done.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TOPICS = ["python", "git", "docker", "sql", "linux", "kubernetes", "vim", "javascript", "terraform", "rust"]
+LEVELS = ["beginner", "intermediate", "advanced"]
+
+
+def _lock_only_spawn(topic: str, level: str, config: dict, children: list[int]) -> None:
+    """The spawn() from before the queue, minus the double fork so the bench can reap it."""
+    from dev_tip.ai.cache import is_on_cooldown
+    from dev_tip.prefetch import _lock_file, _lock_is_held, run
+
+    if _lock_is_held(_lock_file()) or is_on_cooldown():
+        return  # Dropped
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run(topic, level, config)
+        finally:
+            os._exit(0)
+    children.append(pid)
+
+
+def _idle() -> bool:
+    from dev_tip.prefetch import _lock_file, _lock_is_held, queue_status
+
+    status = queue_status()
+    return not _lock_is_held(_lock_file()) and not status["queued"] and not status["running"]
+
+
+def _measure(variant: str, keys: list[tuple[str, str]], config: dict, gap: float) -> tuple[int, float]:
+    from dev_tip.ai.cache import load_cache
+    from dev_tip.prefetch import spawn
+
+    children: list[int] = []
+    start = time.perf_counter()
+    for n, (topic, level) in enumerate(keys):
+        if variant == "queue":
+            spawn(topic, level, config, unseen=n % 4)
+        else:
+            _lock_only_spawn(topic, level, config, children)
+        time.sleep(gap)
+    for pid in children:
+        os.waitpid(pid, 0)
+    while not (_idle() and (time.sleep(0.05) or _idle())):
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    return sum(bool(load_cache(topic, level)) for topic, level in keys), elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--gap-ms", type=float, default=40)
+    args = parser.parse_args()
+    if not hasattr(os, "fork"):
+        print("os.fork: not available")
+        return 1
+
+    from dev_tip.state import use_state_dir
+
+    keys = [(TOPICS[n % len(TOPICS)], LEVELS[n // len(TOPICS) % len(LEVELS)]) for n in range(args.keys)]
+    config = {"ai_provider": "fake", "ai_model": f"latency_ms={args.latency_ms}"}
+    print(f"{args.keys} keys, one refill every {args.gap_ms:g} ms, provider latency {args.latency_ms:g} ms")
+    print(f"{'':<12}{'refilled':>10}{'blocking':>10}{'done in':>10}")
+    for variant in ("lock only", "queue"):
+        with tempfile.TemporaryDirectory() as tmp, use_state_dir(Path(tmp)):
+            refilled, elapsed = _measure(variant, keys, config, args.gap_ms / 1000)
+        print(f"{variant:<12}{refilled:>10}{args.keys - refilled:>10}{elapsed:>9.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
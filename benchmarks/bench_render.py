@@ -0,0 +1,78 @@
+"""Compare the raw-ANSI renderer against the previous rich-based one.
+
+    python benchmarks/bench_render.py [--iterations 2000] [--width 120]
+
+"rich" reproduces the old _render_tip: console.width lookups, textwrap and
+one styled console.print per line.  "ansi" is render_tip: wrapping plus
+pygments highlighting of the example.  Import cost is reported separately
+since it is paid once per process.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import subprocess
+import sys
+import textwrap
+import time
+
+
+def _rich_render(console, tip: dict, quiet: bool = False) -> None:
+    from dev_tip.render import TOPIC_EMOJI
+
+    console.print()
+    body = tip["body"].strip()
+    wrap_width = min(console.width, 60)
+    pad = console.width - wrap_width
+    if quiet:
+        for line in textwrap.wrap(body, width=wrap_width):
+            console.print(" " * max(pad, 0) + line, style="dim", highlight=False)
+        return
+    emoji = TOPIC_EMOJI.get(tip["topic"], "\U0001f4a1")
+    header = f"{emoji} {tip['topic']} · {tip['level']} · {tip['title']}"
+    block = textwrap.wrap(header, width=wrap_width) + [""] + textwrap.wrap(body, width=wrap_width)
+    for line in block:
+        console.print(" " * max(pad, 0) + line, style="dim", highlight=False)
+
+
+def _time_per_call(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def _import_ms(statement: str) -> float:
+    code = f"import time; t = time.perf_counter(); {statement}; print((time.perf_counter() - t) * 1000)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--width", type=int, default=120)
+    args = parser.parse_args()
+
+    from rich.console import Console
+
+    import dev_tip.render as render
+    from dev_tip.tips import load_tips
+
+    tips = load_tips()
+    console = Console(file=io.StringIO(), force_terminal=True, width=args.width)
+
+    counter = iter(range(10**9))
+    rich_us = _time_per_call(lambda: _rich_render(console, tips[next(counter) % len(tips)]), args.iterations)
+    ansi_us = _time_per_call(
+        lambda: render.render_tip(tips[next(counter) % len(tips)], args.width, color=True), args.iterations
+    )
+
+    print(f"rich path:      {rich_us:8.1f} us/tip (no example shown)")
+    print(f"ansi:           {ansi_us:8.1f} us/tip (wrap + highlight example)")
+    print(f"import pygments:{_import_ms('import pygments.lexers, pygments.formatters'):8.1f} ms (once per process)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
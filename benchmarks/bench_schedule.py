@@ -0,0 +1,100 @@
+"""dev-tip launches per hour with many shells: per-shell vs shared schedule.
+
+    python benchmarks/bench_schedule.py [--panes 12] [--prompts 400] [--hours 1]
+
+Runs the generated bash hook in ``--panes`` real bash processes against a
+simulated clock (``$SECONDS`` / ``$EPOCHSECONDS`` are swapped for a variable
+the driver sets), with ``dev-tip`` replaced by an echo that is counted.
+Panes open during the first few minutes and see ``--prompts`` prompts per
+hour between them, most in a few busy panes (pane n gets a share
+proportional to 1/n), at random times.  The same timeline is replayed with
+the per-shell hook and with ``--shared-schedule``.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+LAUNCH = "__dev_tip_launch__"
+DONE = "__prompt_done__"
+
+
+def _timeline(panes: int, prompts: int, hours: float, rng: random.Random) -> tuple[list[float], list[tuple[float, int]]]:
+    """Pane opening times and (time, pane) prompts, in seconds."""
+    duration = hours * 3600
+    opened = [rng.uniform(0, 300) for _ in range(panes)]
+    weights = [1 / (n + 1) for n in range(panes)]
+    events = []
+    for _ in range(int(prompts * hours)):
+        pane = rng.choices(range(panes), weights)[0]
+        events.append((rng.uniform(opened[pane], duration), pane))
+    return opened, sorted(events)
+
+
+def _block(shared: bool, every_commands: int, every_minutes: int, state: Path) -> str:
+    import dev_tip.hook as hook
+
+    hook.PAUSE_FILE = state / ".paused"
+    hook.SCHEDULE_FILE = state / ".schedule"
+    block = hook._build_hook_block("bash", f"echo {LAUNCH}", every_commands, every_minutes, shared)
+    if shared:
+        return block.replace("${EPOCHSECONDS:-$(date +%s)}", "$_BENCH_NOW")
+    return block.replace("SECONDS", "_BENCH_NOW")
+
+
+def _launches(shared: bool, args: argparse.Namespace, opened: list[float], events: list[tuple[float, int]]) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        state = Path(tmp)
+        block = _block(shared, args.every_commands, args.every_minutes, state)
+        if shared:
+            (state / ".schedule").write_text("0\n")  # As left by dev-tip enable
+        start = 1_700_000_000  # Epoch-like, so "never shown" (0) is long ago
+        shells = []
+        for at in opened:
+            shell = subprocess.Popen(["bash", "-s"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+            shell.stdin.write(f"set -o history\nhistory -s 'git status'\n_BENCH_NOW={start + int(at)}\n{block}\n")
+            shells.append(shell)
+        launches = 0
+        for at, pane in events:
+            shell = shells[pane]
+            shell.stdin.write(f"_BENCH_NOW={start + int(at)}\n_dev_tip_prompt\necho {DONE}\n")
+            shell.stdin.flush()
+            for line in shell.stdout:
+                if line.startswith(DONE):
+                    break
+                launches += line.startswith(LAUNCH)
+        for shell in shells:
+            shell.stdin.close()
+            shell.wait()
+        return launches
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--panes", type=int, default=12)
+    parser.add_argument("--prompts", type=int, default=400, help="prompts per hour over all panes")
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--every-commands", type=int, default=15)
+    parser.add_argument("--every-minutes", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if not shutil.which("bash"):
+        print("bash: not installed")
+        return 1
+
+    opened, events = _timeline(args.panes, args.prompts, args.hours, random.Random(args.seed))
+    print(f"{args.panes} panes, {len(events)} prompts in {args.hours:g} h, "
+          f"every {args.every_commands} commands or {args.every_minutes} minutes")
+    for name, shared in (("per-shell", False), ("shared", True)):
+        launches = _launches(shared, args, opened, events)
+        print(f"{name:<10}{launches / args.hours:>8.1f} dev-tip launches/hour")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Benchmark `dev-tip search` on a synthetic 50k-tip corpus.
+
+    python benchmarks/bench_search.py [--tips 50000] [--queries 200] [--budget-ms 50]
+
+Builds a corpus in a temporary state directory, then times complete queries
+(open index + delta, score, decode results) the way the CLI runs them.
+Exits non-zero when the p95 latency exceeds the budget.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _vocabulary(size: int, rng: random.Random) -> list[str]:
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(size)]
+
+
+def _corpus(n: int, rng: random.Random) -> tuple[dict, list[str]]:
+    vocab = _vocabulary(20_000, rng)
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]  # Zipf-like term frequencies
+
+    def words(k: int) -> str:
+        return " ".join(rng.choices(vocab, weights=weights, k=k))
+
+    keys: dict = {}
+    for i in range(n):
+        topic = rng.choice(["python", "git", "docker", "sql", "linux"])
+        level = rng.choice(["beginner", "intermediate", "advanced"])
+        tip = {
+            "id": f"ai-{i:06x}", "topic": topic, "level": level,
+            "title": words(6), "body": words(40), "example": words(8), "source": "ai",
+        }
+        keys.setdefault(f"{topic}:{level}", {"generated_at": 0.0, "tips": []})["tips"].append(tip)
+    return {"version": 2, "keys": keys}, vocab
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tips", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    import dev_tip.ai.cache as cache
+    import dev_tip.search as search
+    import dev_tip.store as store
+    import dev_tip.tips as tips
+
+    rng = random.Random(1234)
+    with tempfile.TemporaryDirectory() as tmp:
+        state = Path(tmp)
+        cache.CACHE_DIR = state
+        cache.CACHE_FILE = state / "ai_cache.json"
+        store.STORE_FILE = state / "tips.bin"
+        tips.PACKS_DIR = state / "packs"
+        search.INDEX_FILE = state / "search.idx"
+        search.DELTA_FILE = state / "search_delta.jsonl"
+
+        data, vocab = _corpus(args.tips, rng)
+        cache.CACHE_FILE.write_text(json.dumps(data))
+
+        start = time.perf_counter()
+        search.search(vocab[0])
+        build_s = time.perf_counter() - start
+
+        queries = [" ".join(rng.sample(vocab[:5000], rng.randint(1, 3))) for _ in range(args.queries)]
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            search.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p50 = statistics.median(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"corpus:      {args.tips} tips (+ bundled)")
+    print(f"index build: {build_s * 1000:.0f} ms (one-off)")
+    print(f"query p50:   {p50:.2f} ms")
+    print(f"query p95:   {p95:.2f} ms")
+    print(f"query max:   {timings[-1]:.2f} ms")
+    if p95 > args.budget_ms:
+        print(f"FAIL: p95 {p95:.2f} ms exceeds budget {args.budget_ms:.0f} ms")
+        return 1
+    print(f"OK: p95 within {args.budget_ms:.0f} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
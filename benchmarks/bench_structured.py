@@ -0,0 +1,89 @@
+"""Compare free-form and schema-constrained (structured) tip generation.
+
+    python benchmarks/bench_structured.py [--rounds 20] [--count 10] [--ms-per-token 2]
+    python benchmarks/bench_structured.py --provider gemini --key $GEMINI_API_KEY
+
+By default both modes run against the local stand-in server, whose latency
+scales with the size of the response, so the numbers show the effect of the
+compact wire keys.  With --provider the real API is called instead; token
+counts then come from the provider's reported usage.  Reports prompt and
+output tokens per tip, latency per tip and the share of calls whose response
+could not be parsed.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+
+
+def _run(provider, topic: str, count: int, rounds: int) -> dict:
+    latencies, prompt_tokens, output_tokens = [], [], []
+    tips = failures = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        try:
+            batch = provider.generate_tips(topic, None, count)
+        except ValueError:  # Includes JSONDecodeError: unparseable output
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        tips += len(batch)
+        usage = provider.last_usage or {}
+        prompt_tokens.append(usage.get("prompt_tokens", 0))
+        output_tokens.append(usage.get("output_tokens", 0))
+    per_tip = max(tips, 1) / max(len(latencies), 1)
+    return {
+        "prompt": statistics.mean(prompt_tokens or [0]),
+        "output_per_tip": statistics.mean(output_tokens or [0]) / per_tip,
+        "ms_per_tip": statistics.mean(latencies or [0]) / per_tip * 1000,
+        "failures": failures / rounds,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--count", type=int, default=10, help="tips per request")
+    parser.add_argument("--topic", default="python")
+    parser.add_argument("--ms-per-token", type=float, default=2.0, help="stand-in decode time per output token")
+    parser.add_argument("--provider", help="call a real provider (gemini, openrouter, local)")
+    parser.add_argument("--key", default="")
+    parser.add_argument("--model")
+    parser.add_argument("--base-url")
+    args = parser.parse_args()
+
+    from dev_tip.ai.fake import FaultProfile, StandInServer
+    from dev_tip.ai.gemini import GeminiProvider
+    from dev_tip.ai.local import LocalProvider
+    from dev_tip.ai.openrouter import OpenRouterProvider
+
+    classes = {"gemini": GeminiProvider, "openrouter": OpenRouterProvider, "local": LocalProvider}
+    name = args.provider or "gemini"
+    if name not in classes:
+        parser.error(f"unknown provider {name!r}")
+
+    def measure(base_url: str | None) -> dict[str, dict]:
+        return {
+            mode: _run(
+                classes[name](args.key, model=args.model, base_url=base_url, structured=(mode == "structured")),
+                args.topic, args.count, args.rounds,
+            )
+            for mode in ("free-form", "structured")
+        }
+
+    if args.provider:
+        results = measure(args.base_url)
+    else:
+        with StandInServer(FaultProfile(ms_per_token=args.ms_per_token, seed=1)) as server:
+            results = measure(server.url)
+
+    print(f"{'mode':<12}{'prompt tok':>12}{'out tok/tip':>13}{'ms/tip':>10}{'parse fail':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<12}{r['prompt']:>12.0f}{r['output_per_tip']:>13.1f}{r['ms_per_tip']:>10.1f}{r['failures']:>12.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
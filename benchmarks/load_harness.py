@@ -0,0 +1,133 @@
+"""Load-test the AI pipeline offline with simulated shells.
+
+    python benchmarks/load_harness.py --shells 12 --prompts 20 \\
+        --profile "latency_ms=300,jitter_ms=100,rate_limit_rate=0.05" \\
+        --outage-start 5 --outage-duration 5 --cooldown 3
+
+Starts a StandInServer speaking the Gemini wire format, points a fresh
+~/.dev-tip at it and runs N concurrent "shells", each invoking the real
+dev-tip CLI in a subprocess once per simulated prompt (so background
+prefetches, the cache, history and cooldown all behave as in production).
+
+Reports tip latency, how many tips came from AI versus the static fallback,
+API calls per AI tip, and - when an outage window is configured - the
+recovery time from the end of the outage to the first AI tip served.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from dev_tip.ai.fake import FaultProfile, StandInServer
+
+# Runs the CLI with an overridable cooldown so recovery can be measured
+# without waiting for the production five-minute backoff.
+_BOOT = """\
+import sys
+import dev_tip.ai.cache as cache
+cache.COOLDOWN_SECONDS = float(sys.argv.pop(1))
+from dev_tip.cli import app
+app(prog_name="dev-tip")
+"""
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shells", type=int, default=8)
+    parser.add_argument("--prompts", type=int, default=15, help="tips requested per shell")
+    parser.add_argument("--think-ms", type=float, default=100, help="pause between prompts")
+    parser.add_argument("--profile", default="latency_ms=200,jitter_ms=50", help="FaultProfile spec")
+    parser.add_argument("--topic", default=None)
+    parser.add_argument("--outage-start", type=float, default=None, help="seconds into the run")
+    parser.add_argument("--outage-duration", type=float, default=0.0)
+    parser.add_argument("--cooldown", type=float, default=300.0, help="API failure cooldown (s)")
+    args = parser.parse_args()
+
+    results: list[tuple[float, float, bool]] = []  # (start, latency, ai)
+    lock = threading.Lock()
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp, \
+            StandInServer(FaultProfile.parse(args.profile)) as server:
+        home = Path(tmp)
+        state = home / ".dev-tip"
+        state.mkdir()
+        (state / "config.toml").write_text(
+            'ai_provider = "gemini"\n'
+            'ai_key = "load-test"\n'
+            f'ai_base_url = "{server.url}"\n'
+        )
+        env = dict(os.environ, HOME=str(home), COLUMNS="80")
+        repo_root = str(Path(__file__).resolve().parent.parent)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [repo_root, env.get("PYTHONPATH")]))
+
+        cmd = [sys.executable, "-c", _BOOT, str(args.cooldown)]
+        if args.topic:
+            cmd += ["--topic", args.topic]
+
+        t0 = time.perf_counter()
+
+        def shell() -> None:
+            for _ in range(args.prompts):
+                start = time.perf_counter()
+                proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+                latency = time.perf_counter() - start
+                with lock:
+                    results.append((start - t0, latency, "Stand-in" in proc.stdout))
+                time.sleep(args.think_ms / 1000)
+
+        outage_end = None
+        if args.outage_start is not None:
+            outage_end = args.outage_start + args.outage_duration
+
+            def outage() -> None:
+                time.sleep(args.outage_start)
+                server.outage = True
+                time.sleep(args.outage_duration)
+                server.outage = False
+
+            threading.Thread(target=outage, daemon=True).start()
+
+        threads = [threading.Thread(target=shell) for _ in range(args.shells)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        time.sleep(0.5)  # let detached prefetch workers finish before teardown
+        stats = dict(server.stats)
+
+    latencies = [lat * 1000 for _, lat, _ in results]
+    ai_tips = sum(1 for _, _, ai in results if ai)
+    print(f"shells x prompts: {args.shells} x {args.prompts} in {elapsed:.1f} s")
+    print(f"tips served:      {len(results)} ({ai_tips} AI, {len(results) - ai_tips} static fallback)")
+    print(
+        f"tip latency:      p50 {statistics.median(latencies):.0f} ms, "
+        f"p95 {_percentile(latencies, 0.95):.0f} ms, max {max(latencies):.0f} ms"
+    )
+    print(f"API calls:        {stats.pop('requests')} {stats}")
+    if ai_tips:
+        print(f"API calls/AI tip: {sum(stats.values()) / ai_tips:.3f}")
+
+    if outage_end is not None:
+        recovered = [start + lat for start, lat, ai in results if ai and start >= outage_end]
+        if recovered:
+            print(f"recovery time:    {min(recovered) - outage_end:.2f} s after outage ended")
+        else:
+            print("recovery time:    did not recover before the run ended")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,10 +2,15 @@ from __future__ import annotations
 
 import os
 import random
+import time
+from collections.abc import Callable
 
-from dev_tip.ai.cache import is_on_cooldown, load_cache, mark_failure, save_cache
-from dev_tip.ai.provider import create_provider
+from dev_tip.ai.cache import is_on_cooldown, known_titles, load_cache, mark_failure, save_cache
+from dev_tip.ai.prompt import avoid_digest
+from dev_tip.ai.provider import KEYLESS_PROVIDERS, AIProvider, create_provider
 from dev_tip.history import get_unseen
+from dev_tip.metrics import incr, record_api_call, record_yield
+from dev_tip.record import Tip
 
 _ENV_KEYS = {
     "gemini": "GEMINI_API_KEY",
@@ -15,40 +20,83 @@ _ENV_KEYS = {
 BATCH_SIZE = 10
 
 
+def api_key_for(config: dict) -> str | None:
+    """Return the configured API key, falling back to the provider's env var."""
+    api_key = config.get("ai_key")
+    if not api_key:
+        env_var = _ENV_KEYS.get(config.get("ai_provider") or "")
+        if env_var:
+            api_key = os.environ.get(env_var)
+    return api_key or None
+
+
+def provider_for(config: dict) -> AIProvider | None:
+    """Create the configured provider, or None without a provider or a needed key."""
+    provider_name = config.get("ai_provider")
+    if not provider_name:
+        return None
+    api_key = api_key_for(config)
+    if not api_key and provider_name not in KEYLESS_PROVIDERS:
+        return None
+    return create_provider(
+        provider_name,
+        api_key or "",
+        model=config.get("ai_model"),
+        base_url=config.get("ai_base_url"),
+    )
+
+
 def get_ai_tip(
-    topic: str | None, level: str | None, config: dict
-) -> tuple[dict | None, int]:
-    """Return (tip, unseen_count) or (None, 0) on any failure."""
+    topic: str | None,
+    level: str | None,
+    config: dict,
+    get_provider: Callable[[], AIProvider | None] | None = None,
+) -> tuple[Tip | None, int]:
+    """Return (tip, unseen_count) or (None, 0) on any failure.
+
+    On a cache miss the provider comes from ``get_provider``, if given, so a
+    caller can keep one around; otherwise it is created from ``config``.
+    """
     try:
         provider_name = config.get("ai_provider")
         if not provider_name:
             return None, 0
-
-        api_key = config.get("ai_key")
-        if not api_key:
-            env_var = _ENV_KEYS.get(provider_name)
-            if env_var:
-                api_key = os.environ.get(env_var)
-        if not api_key:
+        if not api_key_for(config) and provider_name not in KEYLESS_PROVIDERS:
             return None, 0
 
-        # Try cache first
-        tips = load_cache(topic, level)
+        # Try cache first (reading through the shared cache, if configured)
+        shared_dir = config.get("shared_cache_dir")
+        tips = load_cache(topic, level, shared_dir=shared_dir)
+        incr("ai_cache_lookups", {"result": "hit" if tips else "miss"})
 
         if not tips:
             if is_on_cooldown():
                 return None, 0
             try:
-                provider = create_provider(
-                    provider_name, api_key, model=config.get("ai_model")
-                )
-                tips = provider.generate_tips(topic, level, BATCH_SIZE)
-                save_cache(tips, topic, level)
+                provider = get_provider() if get_provider else provider_for(config)
+                if provider is None:
+                    return None, 0
+                avoid = avoid_digest(known_titles(topic, level, shared_dir))
+                start = time.monotonic()
+                try:
+                    tips = provider.generate_tips(topic, level, BATCH_SIZE, avoid)
+                except Exception as e:
+                    record_api_call(provider_name, time.monotonic() - start, e)
+                    raise
+                record_api_call(provider_name, time.monotonic() - start)
+                added = save_cache(tips, topic, level, shared_dir=shared_dir)
+                record_yield(provider_name, len(tips), len(added))
             except Exception:
                 mark_failure()
                 return None, 0
+            # Only what was stored under this filter: routing and title dedup may have moved or dropped tips
+            tips = load_cache(topic, level, shared_dir=shared_dir)
 
+        if not tips:
+            return None, 0
         unseen = get_unseen(tips)
+        if not unseen:
+            return None, 0
         return random.choice(unseen), len(unseen)
 
     except Exception:
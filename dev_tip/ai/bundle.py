@@ -0,0 +1,169 @@
+"""Portable AI cache bundles for seeding new machines.
+
+A bundle is gzip-compressed JSON Lines.  The first line is a header::
+
+    {"format": "dev-tip-cache", "version": 1, "created_at": ..., "keys": [...], "tips": N}
+
+followed by one ``{"k": key, "h": hash, "tip": {...}}`` line per tip, grouped
+by key.  ``h`` is a hash of the tip's content, so imports can skip tips that
+another machine generated with a different id and can detect corruption.
+Import reads the bundle line by line and never holds more than the merged
+cache in memory.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import IO
+
+from dev_tip import codec, statefile
+from dev_tip.ai import cache
+from dev_tip.record import Tip
+from dev_tip.state import state_file
+
+BUNDLE_FORMAT = "dev-tip-cache"
+BUNDLE_VERSION = 1
+REQUIRED_FIELDS = ("id", "topic", "title", "body", "level")
+COMPRESS_LEVEL = 6  # gzip's default of 9 is several times slower for ~2% smaller bundles
+
+
+def content_hash(tip: dict) -> str:
+    """Hash the fields that make a tip distinct, ignoring its id."""
+    get = tip.get
+    text = f"{get('topic') or ''}\0{get('level') or ''}\0{get('title') or ''}\0{get('body') or ''}\0{get('example') or ''}"
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def _open_output(path: str | Path) -> IO[bytes]:
+    if str(path) == "-":
+        import sys
+
+        return gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb", compresslevel=COMPRESS_LEVEL)
+    return gzip.open(path, "wb", compresslevel=COMPRESS_LEVEL)
+
+
+def export_bundle(path: str | Path, keys: list[str] | None = None, shared_dir: str | Path | None = None) -> dict:
+    """Write the selected cache keys (default: all) to a bundle; return counts."""
+    data = cache._load_all()
+    entries = dict(data.get("keys", {}))
+    if shared_dir:
+        for key, entry in cache._load_shared(shared_dir).get("keys", {}).items():
+            own = entries.setdefault(key, {"tips": []})
+            own_ids = {t["id"] for t in own["tips"]}
+            own["tips"] = own["tips"] + [t for t in entry.get("tips", []) if t["id"] not in own_ids]
+
+    selected = [key for key in sorted(entries) if keys is None or key in keys]
+    total = sum(len(entries[key].get("tips", [])) for key in selected)
+    header = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "created_at": time.time(),
+        "keys": selected,
+        "tips": total,
+    }
+
+    target = Path(path)
+    tmp = target if str(path) == "-" else target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    with _open_output(tmp) as out:
+        out.write(codec.dumps(header) + b"\n")
+        for key in selected:
+            for tip in entries[key].get("tips", []):
+                line = {"k": key, "h": content_hash(tip), "tip": tip}
+                out.write(codec.dumps(line) + b"\n")
+    if tmp != target:
+        os.replace(tmp, target)
+    return {"keys": len(selected), "tips": total}
+
+
+def _read_header(stream: IO[bytes]) -> dict:
+    try:
+        header = codec.loads(stream.readline())
+    except (ValueError, OSError, EOFError) as e:
+        raise ValueError(f"Not a dev-tip cache bundle: {e}") from None
+    if not isinstance(header, dict) or header.get("format") != BUNDLE_FORMAT:
+        raise ValueError("Not a dev-tip cache bundle")
+    if header.get("version") != BUNDLE_VERSION:
+        raise ValueError(f"Unsupported bundle version {header.get('version')!r}")
+    return header
+
+
+def _merge_stream(data: dict, stream: IO[bytes], keys: list[str] | None) -> tuple[dict, list[Tip]]:
+    """Merge bundle lines into ``data`` in place; return (counts, added tips)."""
+    entries = data.setdefault("keys", {})
+    seen_ids = {t["id"] for entry in entries.values() for t in entry.get("tips", [])}
+    seen_hashes = {content_hash(t) for entry in entries.values() for t in entry.get("tips", [])}
+    counts = {"read": 0, "added": 0, "duplicates": 0, "invalid": 0}
+    added: list[Tip] = []
+    now = time.time()
+
+    try:
+        for raw in stream:
+            if not raw.strip():
+                continue
+            counts["read"] += 1
+            try:
+                line = codec.loads(raw)
+                key, digest, tip = line["k"], line["h"], line["tip"]
+            except (ValueError, KeyError, TypeError):
+                counts["invalid"] += 1
+                continue
+            if not isinstance(tip, dict) or not all(isinstance(tip.get(f), str) for f in REQUIRED_FIELDS):
+                counts["invalid"] += 1
+                continue
+            if content_hash(tip) != digest:
+                counts["invalid"] += 1  # Corrupted in transit
+                continue
+            if keys is not None and key not in keys:
+                continue
+            if tip["id"] in seen_ids or digest in seen_hashes:
+                counts["duplicates"] += 1
+                continue
+            seen_ids.add(tip["id"])
+            seen_hashes.add(digest)
+            entry = entries.setdefault(cache.route_key(tip, key), {"generated_at": now, "tips": []})
+            tip = Tip.from_dict(tip)
+            entry["tips"].append(tip)
+            added.append(tip)
+            counts["added"] += 1
+    except (EOFError, zlib.error) as e:
+        # Nothing has been written yet, so a cut-off download leaves the cache as it was
+        raise ValueError("truncated or corrupt bundle") from e
+
+    data["version"] = cache.CACHE_VERSION
+    return counts, added
+
+
+def import_bundle(path: str | Path, keys: list[str] | None = None, shared_dir: str | Path | None = None) -> dict:
+    """Stream-merge a bundle into the user's (or the shared) cache; return counts."""
+    from dev_tip.search import DELTA_LIMIT, add_to_index, reset_index
+
+    with gzip.open(path, "rb") as stream:
+        header = _read_header(stream)
+        if shared_dir:
+            target = cache.shared_cache_file(shared_dir)
+            with cache._locked(target):
+                data = cache._load_shared(shared_dir)
+                counts, added = _merge_stream(data, stream, keys)
+                if added:
+                    statefile.write(target, data, cache.SHARED_FILE_MODE)
+        else:
+            with cache._locked_personal():
+                data = cache._load_all()
+                counts, added = _merge_stream(data, stream, keys)
+                if added:
+                    statefile.write(state_file(cache.CACHE_FILE), data)
+
+    # Large imports would flood the delta log; let the index rebuild instead
+    try:
+        if len(added) > DELTA_LIMIT:
+            reset_index()
+        elif added:
+            add_to_index(added)
+    except OSError:
+        pass
+    counts["bundle_tips"] = header.get("tips", 0)
+    return counts
@@ -1,30 +1,54 @@
 from __future__ import annotations
 
-import json
+import fcntl
+import os
+import re
 import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
+from functools import lru_cache
 from pathlib import Path
 
+from dev_tip import statefile
+from dev_tip.record import Tip
+from dev_tip.state import state_file
+
 CACHE_DIR = Path.home() / ".dev-tip"
 CACHE_FILE = CACHE_DIR / "ai_cache.json"
+CACHE_VERSION = 3
+_TITLE_WORD_RE = re.compile(r"[a-z0-9]+")
+_TIP_START_RE = re.compile(r'\{\s*"id"\s*:')
 COOLDOWN_SECONDS = 5 * 60  # 5 min backoff after API failure
 
+# Files in a shared cache directory are created group-writable so every
+# member of the directory's group can insert tips.
+SHARED_FILE_MODE = 0o664
+
 
 def _cache_key(topic: str | None, level: str | None) -> str:
     """Build a cache key like 'python:beginner' or 'None:None'."""
     return f"{topic}:{level}"
 
 
-def _load_all() -> dict:
-    """Load full cache, auto-migrating v1 single-key format to v2."""
-    if not CACHE_FILE.exists():
-        return {"version": 2, "keys": {}}
+def _load_all(path: Path | None = None) -> dict:
+    """Load full cache, auto-migrating older formats to v3.
 
-    data = json.loads(CACHE_FILE.read_text())
+    v1 held a single topic/level; v2 stored tips under the key that was
+    requested, whatever topic and level the model actually gave them.
+    Tips stay plain mappings here; only the ones handed out become Tips.
+    """
+    path = path or state_file(CACHE_FILE)
+    try:
+        data = statefile.read(path, _salvage)
+    except FileNotFoundError:
+        data = None
+    if not isinstance(data, dict):
+        return {"version": CACHE_VERSION, "keys": {}}
 
     # v1 migration: old format had top-level topic/level/tips/generated_at
     if "version" not in data and "tips" in data:
         key = _cache_key(data.get("topic"), data.get("level"))
-        migrated = {
+        data = {
             "version": 2,
             "keys": {
                 key: {
@@ -33,53 +57,260 @@ def _load_all() -> dict:
                 }
             },
         }
-        _save_all(migrated)
-        return migrated
+
+    if data.get("version") == 2:
+        old_keys = data.get("keys", {})
+        data["keys"] = {}
+        for key, entry in old_keys.items():
+            _merge(data, key, entry.get("tips", []), entry.get("generated_at", 0.0))
+        # In memory only: readers do not hold the lock, so the next locked write persists it
 
     return data
 
 
 def _save_all(data: dict) -> None:
     """Write full cache to disk."""
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    CACHE_FILE.write_text(json.dumps(data, indent=2))
+    statefile.write(state_file(CACHE_FILE), data)
 
 
-def load_cache(topic: str | None, level: str | None) -> list[dict]:
-    """Return all cached tips for a topic+level combo (never expires)."""
-    data = _load_all()
-    key = _cache_key(topic, level)
-    entry = data.get("keys", {}).get(key)
-    if not entry:
-        return []
-    return entry.get("tips", [])
+def _salvage(raw: bytes) -> tuple[dict, str] | None:
+    """Pick every intact tip out of a damaged cache file."""
+    import json
 
+    text = raw.decode(errors="surrogateescape")
+    decoder = json.JSONDecoder()
+    tips = []
+    for match in _TIP_START_RE.finditer(text):
+        try:
+            tip, end = decoder.raw_decode(text, match.start())
+            text[match.start():end].encode()  # Bytes that are not UTF-8 were damaged
+        except ValueError:
+            continue
+        if isinstance(tip, dict) and all(isinstance(tip.get(f), str) for f in ("id", "title", "body")):
+            tips.append(tip)
+    if not tips:
+        return None
+    data = {"version": CACHE_VERSION, "keys": {}}
+    _merge(data, _cache_key(None, None), tips, generated_at=0.0)
+    return data, f"{len(tips)} tips"
 
-def save_cache(tips: list[dict], topic: str | None, level: str | None) -> None:
-    """Merge tips into the multi-key cache structure."""
-    data = _load_all()
+
+def shared_cache_file(shared_dir: str | Path) -> Path:
+    """Return the cache file inside a system-wide shared cache directory."""
+    return Path(shared_dir) / "ai_cache.json"
+
+
+def _load_shared(shared_dir: str | Path | None) -> dict:
+    """Load the shared cache, treating a missing or unreadable one as empty."""
+    if not shared_dir:
+        return {"version": CACHE_VERSION, "keys": {}}
+    try:
+        return _load_all(shared_cache_file(shared_dir))
+    except (OSError, ValueError):
+        return {"version": CACHE_VERSION, "keys": {}}
+
+
+def route_key(tip: dict, key: str) -> str:
+    """Return the key a tip belongs under: its own topic and level, where it has them.
+
+    ``key`` is the key the tip was requested for; it fills in whatever the
+    tip leaves out, so a mis-tagged tip is still found under its real topic.
+    """
+    from dev_tip.tips import VALID_LEVELS
+
+    requested_topic, _, requested_level = key.rpartition(":")
+    topic = tip.get("topic")
+    topic = topic.strip().lower() if isinstance(topic, str) and topic.strip() else requested_topic
+    level = tip.get("level")
+    return f"{topic}:{level if level in VALID_LEVELS else requested_level}"
+
+
+def _title_key(tip: dict) -> str:
+    """Normalized title: model re-runs of a tip get new ids but (nearly) the same title."""
+    title = tip.get("title")
+    return " ".join(_TITLE_WORD_RE.findall(title.lower())) if isinstance(title, str) else ""
+
+
+def _merge(data: dict, key: str, tips: list[dict], generated_at: float | None = None) -> list[Tip]:
+    """Route tips into their buckets in place and return the ones actually added."""
+    keys = data.setdefault("keys", {})
+    now = time.time() if generated_at is None else generated_at
+    seen: dict[str, set[str]] = {}
+    added = []
+    for tip in map(Tip.from_dict, tips):
+        target = route_key(tip, key)
+        entry = keys.setdefault(target, {"generated_at": now, "tips": []})
+        known = seen.get(target)
+        if known is None:
+            known = seen[target] = {t["id"] for t in entry["tips"]} | {_title_key(t) for t in entry["tips"]}
+            known.discard("")
+        # Deduplicate by id and title; a given tip always routes to the same key
+        title = _title_key(tip)
+        if tip.id in known or title in known:
+            continue
+        known.add(tip.id)
+        if title:
+            known.add(title)
+        entry["tips"].append(tip)
+        entry["generated_at"] = max(entry.get("generated_at", 0.0), now)
+        added.append(tip)
+    data["version"] = CACHE_VERSION
+    return added
+
+
+@lru_cache(maxsize=8)
+def _key_index(keys: tuple[str, ...]) -> dict[tuple[str | None, str | None], tuple[str, ...]]:
+    """Map every (topic, level) query, None meaning any, to the keys it covers."""
+    index: dict[tuple[str | None, str | None], list[str]] = {}
+    for key in keys:
+        topic, _, level = key.rpartition(":")
+        for query in ((topic, level), (topic, None), (None, level), (None, None)):
+            index.setdefault(query, []).append(key)
+    return {query: tuple(matches) for query, matches in index.items()}
+
+
+def _matching_keys(entries: dict, topic: str | None, level: str | None) -> tuple[str, ...]:
+    topic = topic.strip().lower() if topic else None
+    return _key_index(tuple(entries)).get((topic, level or None), ())
+
+
+def _union(entries: dict, topic: str | None, level: str | None, seen_ids: set[str]) -> list[Tip]:
+    tips = []
+    for key in _matching_keys(entries, topic, level):
+        for tip in entries[key].get("tips", []):
+            if tip["id"] not in seen_ids:
+                seen_ids.add(tip["id"])
+                tips.append(Tip.from_dict(tip))
+    return tips
+
+
+@contextmanager
+def _locked(path: Path, mode: int = SHARED_FILE_MODE) -> Iterator[None]:
+    """Hold the exclusive lock that guards read-modify-writes of the cache file ``path``.
+
+    flock excludes other threads as well as other processes, since each
+    caller opens the lock file anew.
+    """
+    lock_fd = os.open(path.with_name(".ai_cache.lock"), os.O_RDWR | os.O_CREAT, mode)
+    try:
+        if os.fstat(lock_fd).st_uid == os.geteuid():
+            os.fchmod(lock_fd, mode)  # umask must not keep other members out of the lock
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(lock_fd)
+
+
+def _locked_personal() -> AbstractContextManager[None]:
+    """The lock for the user's own cache; threads of an embedding app write it too."""
+    path = state_file(CACHE_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return _locked(path, 0o644)
+
+
+def _insert_shared(shared_dir: str | Path, key: str, tips: list[dict]) -> list[Tip]:
+    """Atomically merge tips into the shared cache under an exclusive lock."""
+    path = shared_cache_file(shared_dir)
+    with _locked(path):
+        data = _load_shared(shared_dir)
+        added = _merge(data, key, tips)
+        statefile.write(path, data, SHARED_FILE_MODE)  # umask must not strip group write
+        return added
+
+
+def load_cache(
+    topic: str | None, level: str | None, shared_dir: str | Path | None = None
+) -> list[Tip]:
+    """Return all cached tips matching a topic and level (never expires).
+
+    None matches anything, so ``load_cache("python", None)`` is the union of
+    every python bucket.  With a shared cache directory, tips from the shared
+    cache are read through and merged with the user's own cache.
+    """
+    seen_ids: set[str] = set()
+    tips = _union(_load_all().get("keys", {}), topic, level, seen_ids)
+    if not shared_dir:
+        return tips
+    return tips + _union(_load_shared(shared_dir).get("keys", {}), topic, level, seen_ids)
+
+
+def save_cache(
+    tips: list[dict],
+    topic: str | None,
+    level: str | None,
+    shared_dir: str | Path | None = None,
+) -> list[Tip]:
+    """Merge tips into the cache, each under its own topic and level.
+
+    With a shared cache directory, tips go to the shared cache so other users
+    can reuse them; the user's own cache is the fallback if that fails.
+    Returns the tips that were new, i.e. not duplicates by id or title.
+    """
     key = _cache_key(topic, level)
-    existing = data.get("keys", {}).get(key, {}).get("tips", [])
+    added = None
+    if shared_dir:
+        try:
+            added = _insert_shared(shared_dir, key, tips)
+        except OSError:
+            pass
 
-    # Deduplicate by tip id
-    seen_ids = {t["id"] for t in existing}
-    merged = existing + [t for t in tips if t["id"] not in seen_ids]
+    if added is None:
+        with _locked_personal():
+            data = _load_all()
+            added = _merge(data, key, tips)
+            _save_all(data)
 
-    data.setdefault("keys", {})[key] = {
-        "generated_at": time.time(),
-        "tips": merged,
-    }
-    data["version"] = 2
-    _save_all(data)
+    from dev_tip.search import add_to_index
 
+    try:
+        add_to_index(added)
+    except OSError:
+        pass  # The search index is rebuilt from the cache if it falls behind
+    return added
 
-def cache_needs_refill(topic: str | None, level: str | None, unseen_count: int) -> bool:
-    """Return True when unseen tips are running low and cache entry exists."""
+
+def known_titles(topic: str | None, level: str | None, shared_dir: str | Path | None = None) -> list[str]:
+    """Titles already cached or seen for a topic and level, most recent first.
+
+    Cached AI tips come first, newest batch first, then static tips from
+    the user's history.  Used to tell the model what not to generate again.
+    """
+    from dev_tip.history import _load_history
+
+    entries = [
+        keys[key]
+        for keys in (_load_all().get("keys", {}), _load_shared(shared_dir).get("keys", {}))
+        for key in _matching_keys(keys, topic, level)
+    ]
+    entries.sort(key=lambda entry: entry.get("generated_at", 0.0), reverse=True)
+    titles = [t["title"] for entry in entries for t in reversed(entry.get("tips", [])) if t.get("title")]
+
+    seen = _load_history()
+    if seen:
+        from dev_tip.store import open_store
+
+        try:
+            with open_store() as store:
+                indices = {store.tip_id(i): i for i in store.find(topic, level)}
+                titles += [store.get(indices[tip_id])["title"] for tip_id in reversed(seen) if tip_id in indices]
+        except (OSError, ValueError):
+            pass
+    return titles
+
+
+def cache_needs_refill(
+    topic: str | None,
+    level: str | None,
+    unseen_count: int,
+    shared_dir: str | Path | None = None,
+) -> bool:
+    """Return True when unseen tips are running low and a matching cache entry exists."""
     if unseen_count > 3:
         return False
-    data = _load_all()
-    key = _cache_key(topic, level)
-    return key in data.get("keys", {})
+    return bool(
+        _matching_keys(_load_all().get("keys", {}), topic, level)
+        or _matching_keys(_load_shared(shared_dir).get("keys", {}), topic, level)
+    )
 
 
 def is_on_cooldown() -> bool:
@@ -91,24 +322,37 @@ def is_on_cooldown() -> bool:
 
 def mark_failure() -> None:
     """Record an API failure timestamp for cooldown backoff."""
-    data = _load_all()
-    data["last_failure"] = time.time()
-    _save_all(data)
+    from dev_tip.metrics import incr
+
+    with _locked_personal():
+        data = _load_all()
+        data["last_failure"] = time.time()
+        _save_all(data)
+    incr("cooldown_activations")
 
 
 def clear_cache() -> None:
     """Delete the AI cache file."""
-    if CACHE_FILE.exists():
-        CACHE_FILE.unlink()
+    from dev_tip.search import reset_index
+
+    path = state_file(CACHE_FILE)
+    path.unlink(missing_ok=True)
+    statefile.backup_path(path).unlink(missing_ok=True)
+    reset_index()
 
 
-def get_cache_stats() -> dict:
+def get_cache_stats(shared_dir: str | Path | None = None) -> dict:
     """Return cache statistics for the status command."""
     data = _load_all()
     keys = data.get("keys", {})
     total_tips = sum(len(entry.get("tips", [])) for entry in keys.values())
-    return {
+    stats = {
         "keys": len(keys),
         "total_tips": total_tips,
         "cooldown_active": is_on_cooldown(),
     }
+    if shared_dir:
+        shared_keys = _load_shared(shared_dir).get("keys", {})
+        stats["shared_keys"] = len(shared_keys)
+        stats["shared_tips"] = sum(len(entry.get("tips", [])) for entry in shared_keys.values())
+    return stats
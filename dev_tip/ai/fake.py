@@ -0,0 +1,349 @@
+"""Offline stand-ins for the AI providers.
+
+FakeProvider generates tips in-process; StandInServer is a local HTTP server
+that speaks the Gemini and OpenAI/OpenRouter chat-completions wire formats,
+so the real providers can be pointed at it with ``ai_base_url``.  Both
+inject latency and faults according to a FaultProfile, which is written as
+a comma-separated spec, e.g. ``"latency_ms=200,jitter_ms=50,rate_limit_rate=0.1"``.
+With ``title_pool=N`` titles come from N fixed tips per topic, skewed towards
+the first few like a real model's favourites, minus any the prompt asks to avoid.
+
+The server answers requests carrying a response schema (Gemini
+``responseSchema`` or chat-completions ``response_format``) with compact
+wire keys, and reports estimated token usage so free-form and structured
+generation can be compared offline.
+"""
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+from dataclasses import dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingUnixStreamServer
+from urllib.parse import parse_qs, urlsplit
+
+from dev_tip.ai.prompt import WIRE_KEYS, parse_response
+from dev_tip.ai.provider import AIProvider
+from dev_tip.record import Tip
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+
+@dataclass
+class FaultProfile:
+    """Latency distribution and fault rates for simulated generation calls."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    distribution: str = "uniform"
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    malformed_rate: float = 0.0
+    truncated_rate: float = 0.0
+    ms_per_token: float = 0.0
+    title_pool: int = 0
+    seed: int | None = None
+
+    @classmethod
+    def parse(cls, spec: str | None) -> FaultProfile:
+        """Build a profile from a ``key=value,...`` spec; empty means no faults."""
+        names = {f.name for f in fields(cls)}
+        values: dict = {}
+        for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+            key, sep, value = item.partition("=")
+            if not sep or key not in names:
+                raise ValueError(f"Unknown fault profile setting: {item!r}")
+            if key == "distribution":
+                if value not in LATENCY_DISTRIBUTIONS:
+                    raise ValueError(f"Unknown latency distribution: {value!r}")
+                values[key] = value
+            elif key in ("seed", "title_pool"):
+                values[key] = int(value)
+            else:
+                values[key] = float(value)
+        return cls(**values)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Return a simulated latency in seconds."""
+        if self.latency_ms <= 0:
+            return 0.0
+        if self.distribution == "fixed":
+            ms = self.latency_ms
+        elif self.distribution == "lognormal":
+            sigma = self.jitter_ms / self.latency_ms if self.jitter_ms else 0.5
+            ms = self.latency_ms * rng.lognormvariate(0, sigma)
+        else:
+            ms = rng.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+        return max(ms, 0.0) / 1000
+
+    def sample_fault(self, rng: random.Random) -> str | None:
+        """Return "error", "rate_limit", "malformed", "truncated" or None."""
+        roll = rng.random()
+        for fault, rate in (
+            ("error", self.error_rate),
+            ("rate_limit", self.rate_limit_rate),
+            ("malformed", self.malformed_rate),
+            ("truncated", self.truncated_rate),
+        ):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+
+def _pick_number(rng: random.Random, title_pool: int, avoid: set[int]) -> int:
+    if title_pool <= 0:
+        return rng.randrange(1_000_000)
+    choices = [n for n in range(title_pool) if n not in avoid] or list(range(title_pool))
+    return rng.choices(choices, weights=[(n + 1) ** -1.5 for n in choices])[0]  # Zipf-like favourites
+
+
+def fake_tips(
+    topic: str | None,
+    level: str | None,
+    count: int,
+    rng: random.Random,
+    title_pool: int = 0,
+    avoid: list[str] | None = None,
+) -> list[dict]:
+    """Return plausible tip dicts in the shape a model is asked to produce."""
+    tips = []
+    avoided = set(avoid or ())
+    for _ in range(count):
+        tip_topic = topic or rng.choice(["python", "git", "docker", "sql", "linux"])
+        taken = {n for n in range(title_pool) if f"Stand-in {tip_topic} tip {n}" in avoided}
+        n = _pick_number(rng, title_pool, taken)
+        tips.append({
+            "topic": tip_topic,
+            "title": f"Stand-in {tip_topic} tip {n}",
+            "body": f"Generated offline for testing ({tip_topic}, #{n}).",
+            "example": f"echo {n}",
+            "level": level or rng.choice(["beginner", "intermediate", "advanced"]),
+            "source": "ai",
+        })
+    return tips
+
+
+class FakeProvider(AIProvider):
+    """In-process provider; the model name is a FaultProfile spec."""
+
+    def __init__(self, api_key: str = "", model: str | None = None) -> None:
+        self._profile = FaultProfile.parse(model)
+        self._rng = random.Random(self._profile.seed)
+
+    def generate_tips(
+        self, topic: str | None, level: str | None, count: int, avoid: list[str] | None = None
+    ) -> list[Tip]:
+        text = json.dumps(fake_tips(topic, level, count, self._rng, self._profile.title_pool, avoid))
+        output_tokens = _estimate_tokens(text)
+        time.sleep(self._profile.sample_latency(self._rng) + output_tokens * self._profile.ms_per_token / 1000)
+        self.last_usage = {"prompt_tokens": 0, "output_tokens": output_tokens}
+
+        fault = self._profile.sample_fault(self._rng)
+        if fault == "error":
+            raise urllib.error.URLError("fake provider: simulated network error")
+        if fault == "rate_limit":
+            raise urllib.error.HTTPError("fake://", 429, "Too Many Requests", {}, None)  # type: ignore[arg-type]
+        if fault == "malformed":
+            text = "Sorry, I can't help with that."
+        elif fault == "truncated":
+            text = text[: len(text) // 2]
+        return parse_response(text)
+
+
+_COUNT_RE = re.compile(r"Generate (\d+)")
+_TOPIC_RE = re.compile(r'Topic must be "([^"]+)"')
+_LEVEL_RE = re.compile(r'Level must be "([^"]+)"')
+_AVOID_RE = re.compile(r"Already known[^\n]*\n((?:- [^\n]*\n?)+)")
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    server: _StandInMixin
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.count_connection()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+        except json.JSONDecodeError:
+            self._reply(400, b'{"error": "invalid JSON"}')
+            return
+
+        if self.path.split("?")[0].endswith(":generateContent"):
+            prompt = request["contents"][0]["parts"][0]["text"]
+            structured = "responseSchema" in request.get("generationConfig", {})
+            wrap = _gemini_body
+        elif self.path.endswith("/chat/completions"):
+            prompt = request["messages"][-1]["content"]
+            structured = "response_format" in request
+            wrap = _openai_body
+        else:
+            self._reply(404, b'{"error": "not found"}')
+            return
+        if self.server.api_key is not None and not self._key_matches():
+            # Gemini answers a bad key with 400 too, which must not read as "no schema support"
+            self._reply(400, b'{"error": {"code": 400, "message": "API key not valid. Please pass a valid API key."}}')
+            return
+        if structured and not self.server.schema_support:
+            self._reply(400, b'{"error": {"code": 400, "message": "response schema not supported"}}')
+            return
+
+        status, body = self.server.respond(prompt, wrap, structured)
+        self._reply(status, body)
+
+    def _key_matches(self) -> bool:
+        query = parse_qs(urlsplit(self.path).query)
+        bearer = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        return self.server.api_key in (query.get("key", [""])[0], bearer)
+
+    def _reply(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _avoided_titles(prompt: str) -> list[str]:
+    match = _AVOID_RE.search(prompt)
+    return [line[2:] for line in match.group(1).splitlines()] if match else []
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _gemini_body(text: str, prompt_tokens: int, output_tokens: int) -> dict:
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}],
+        "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens},
+    }
+
+
+def _openai_body(text: str, prompt_tokens: int, output_tokens: int) -> dict:
+    return {
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": output_tokens},
+    }
+
+
+def _structured_text(tips: list[dict], wrap) -> str:
+    """Serialize tips the way a schema-constrained model would."""
+    compact = [{short: tip[long] for short, long in WIRE_KEYS.items()} for tip in tips]
+    return json.dumps({"tips": compact} if wrap is _openai_body else compact)
+
+
+class _StandInMixin:
+    """Request handling and bookkeeping shared by the TCP and Unix servers."""
+
+    daemon_threads = True
+
+    def _init_stand_in(self, profile: FaultProfile | None) -> None:
+        self.profile = profile or FaultProfile()
+        self.outage = False
+        self.schema_support = True
+        self.api_key: str | None = None
+        self.stats: dict[str, int] = {"requests": 0}
+        self.connections = 0
+        self._rng = random.Random(self.profile.seed)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def count_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats[outcome] = self.stats.get(outcome, 0) + 1
+
+    def respond(self, prompt: str, wrap, structured: bool = False) -> tuple[int, bytes]:
+        """Produce (status, body) for one generation request."""
+        with self._lock:
+            latency = self.profile.sample_latency(self._rng)
+            fault = "outage" if self.outage else self.profile.sample_fault(self._rng)
+            count_match = _COUNT_RE.search(prompt)
+            topic_match = _TOPIC_RE.search(prompt)
+            level_match = _LEVEL_RE.search(prompt)
+            tips = fake_tips(
+                topic_match.group(1) if topic_match else None,
+                level_match.group(1) if level_match else None,
+                int(count_match.group(1)) if count_match else 10,
+                self._rng,
+                self.profile.title_pool,
+                _avoided_titles(prompt),
+            )
+        text = _structured_text(tips, wrap) if structured else json.dumps(tips)
+        output_tokens = _estimate_tokens(text)
+        time.sleep(latency + output_tokens * self.profile.ms_per_token / 1000)
+        self._count(fault or "ok")
+
+        if fault == "outage":
+            return 503, b'{"error": {"code": 503, "message": "stand-in outage"}}'
+        if fault == "error":
+            return 500, b'{"error": {"code": 500, "message": "stand-in error"}}'
+        if fault == "rate_limit":
+            return 429, b'{"error": {"code": 429, "message": "quota exceeded"}}'
+        if fault == "malformed":
+            return 200, json.dumps(wrap("I'm sorry, here are some tips: ...", _estimate_tokens(prompt), 8)).encode()
+
+        body = json.dumps(wrap(text, _estimate_tokens(prompt), output_tokens)).encode()
+        if fault == "truncated":
+            body = body[: len(body) // 2]
+        return 200, body
+
+
+class StandInServer(_StandInMixin, ThreadingHTTPServer):
+    """Local HTTP server answering Gemini and chat-completions requests.
+
+    Use as a context manager; ``url`` is the base URL to configure as
+    ``ai_base_url``.  ``stats`` counts requests and responses by outcome and
+    ``connections`` counts accepted connections.  Setting ``outage`` to True
+    makes every request fail with 503; setting ``schema_support`` to False
+    rejects structured-output requests with 400, like an older model;
+    setting ``api_key`` rejects requests carrying any other key with 400.
+    """
+
+    def __init__(self, profile: FaultProfile | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), _StandInHandler)
+        self._init_stand_in(profile)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class UnixStandInServer(_StandInMixin, ThreadingUnixStreamServer):
+    """StandInServer listening on a Unix socket (``url`` is ``unix://<path>``)."""
+
+    def __init__(self, path: str, profile: FaultProfile | None = None) -> None:
+        super().__init__(path, _StandInHandler)
+        self._init_stand_in(profile)
+
+    @property
+    def url(self) -> str:
+        return f"unix://{self.server_address}"
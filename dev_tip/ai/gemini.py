@@ -1,28 +1,72 @@
 from __future__ import annotations
 
-import json
+import urllib.error
 import urllib.request
 
-from dev_tip.ai.prompt import build_prompt, parse_response
-from dev_tip.ai.provider import AIProvider
+from dev_tip import codec
+from dev_tip.ai.prompt import (
+    build_prompt,
+    build_structured_prompt,
+    gemini_response_schema,
+    parse_response,
+)
+from dev_tip.ai.provider import AIProvider, mark_schema_unsupported, rejects_schema, schema_unsupported
+from dev_tip.record import Tip
 
 DEFAULT_MODEL = "gemini-2.0-flash"
-_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+_ENDPOINT = "{base_url}/models/{model}:generateContent?key={api_key}"
 
 
 class GeminiProvider(AIProvider):
-    def __init__(self, api_key: str, model: str | None = None) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        model: str | None = None,
+        base_url: str | None = None,
+        structured: bool = True,
+    ) -> None:
         self._api_key = api_key
         self._model = model or DEFAULT_MODEL
+        self._base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self._structured = structured and not schema_unsupported("gemini", self._model)
 
-    def generate_tips(self, topic: str | None, level: str | None, count: int) -> list[dict]:
-        prompt = build_prompt(topic, level, count)
-        url = _ENDPOINT.format(model=self._model, api_key=self._api_key)
-        body = json.dumps({
-            "contents": [{"parts": [{"text": prompt}]}],
-        }).encode()
+    def generate_tips(
+        self, topic: str | None, level: str | None, count: int, avoid: list[str] | None = None
+    ) -> list[Tip]:
+        if self._structured:
+            try:
+                return self._generate(topic, level, count, avoid, structured=True)
+            except urllib.error.HTTPError as e:
+                if not rejects_schema(e):
+                    raise
+                self._structured = False  # Model rejects response schemas
+                mark_schema_unsupported("gemini", self._model)
+        return self._generate(topic, level, count, avoid, structured=False)
+
+    def _generate(
+        self, topic: str | None, level: str | None, count: int, avoid: list[str] | None, structured: bool
+    ) -> list[Tip]:
+        url = _ENDPOINT.format(base_url=self._base_url, model=self._model, api_key=self._api_key)
+        if structured:
+            payload = {
+                "contents": [{"parts": [{"text": build_structured_prompt(topic, level, count, avoid)}]}],
+                "generationConfig": {
+                    "responseMimeType": "application/json",
+                    "responseSchema": gemini_response_schema(),
+                },
+            }
+        else:
+            payload = {"contents": [{"parts": [{"text": build_prompt(topic, level, count, avoid)}]}]}
+        body = codec.dumps(payload)
         req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
         with urllib.request.urlopen(req, timeout=30) as resp:
-            data = json.loads(resp.read())
+            data = codec.loads(resp.read())
+
+        usage = data.get("usageMetadata") or {}
+        self.last_usage = {
+            "prompt_tokens": usage.get("promptTokenCount", 0),
+            "output_tokens": usage.get("candidatesTokenCount", 0),
+        }
         text = data["candidates"][0]["content"]["parts"][0]["text"]
         return parse_response(text)
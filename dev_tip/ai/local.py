@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import http.client
+import io
+import math
+import queue
+import socket
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from dev_tip import codec
+from dev_tip.ai.prompt import (
+    build_prompt,
+    build_structured_prompt,
+    openai_response_format,
+    parse_response,
+)
+from dev_tip.ai.provider import AIProvider, mark_schema_unsupported, rejects_schema, schema_unsupported
+from dev_tip.record import Tip
+
+DEFAULT_MODEL = "local"
+DEFAULT_BASE_URL = "http://127.0.0.1:8080/v1"  # llama.cpp server; Ollama uses :11434/v1
+UNIX_API_PREFIX = "/v1"
+MAX_IN_FLIGHT = 4
+MIN_CHUNK = 5  # smallest per-request batch when a generation is split
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that talks to a Unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._socket_path)
+        self.sock = sock
+
+
+class LocalProvider(AIProvider):
+    """OpenAI chat-completions provider for local servers (llama.cpp, Ollama, vLLM).
+
+    ``base_url`` is either an HTTP URL such as ``http://127.0.0.1:11434/v1``
+    or ``unix:///path/to/server.sock``.  Connections are kept alive and
+    reused, and a generation is split into up to ``max_in_flight`` smaller
+    requests that run concurrently.
+    """
+
+    def __init__(
+        self,
+        api_key: str = "",
+        model: str | None = None,
+        base_url: str | None = None,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        timeout: float = 120,
+        structured: bool = True,
+    ) -> None:
+        self._api_key = api_key
+        self._model = model or DEFAULT_MODEL
+        self._max_in_flight = max(1, max_in_flight)
+        self._timeout = timeout
+        self._structured = structured and not schema_unsupported("local", self._model)
+
+        url = base_url or DEFAULT_BASE_URL
+        if url.startswith("unix://"):
+            self._socket_path = url[len("unix://"):]
+            self._path = UNIX_API_PREFIX + "/chat/completions"
+        else:
+            parts = urlsplit(url)
+            if parts.scheme not in ("http", "https"):
+                raise ValueError(f"Unsupported local provider URL: {url!r}")
+            self._socket_path = None
+            self._scheme, self._netloc = parts.scheme, parts.netloc
+            self._path = parts.path.rstrip("/") + "/chat/completions"
+
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self._socket_path is not None:
+            return _UnixHTTPConnection(self._socket_path, self._timeout)
+        if self._scheme == "https":
+            return http.client.HTTPSConnection(self._netloc, timeout=self._timeout)
+        return http.client.HTTPConnection(self._netloc, timeout=self._timeout)
+
+    def _post(self, payload: dict) -> dict:
+        """POST over a pooled keep-alive connection, reconnecting once if it went stale."""
+        body = codec.dumps(payload)
+        headers = {"Content-Type": "application/json"}
+        if self._api_key:
+            headers["Authorization"] = f"Bearer {self._api_key}"
+
+        try:
+            conn = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            conn = self._new_connection()
+            reused = False
+
+        try:
+            conn.request("POST", self._path, body=body, headers=headers)
+            resp = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            conn = self._new_connection()
+            conn.request("POST", self._path, body=body, headers=headers)
+            resp = conn.getresponse()
+
+        data = resp.read()
+        if resp.status != 200:
+            conn.close()
+            raise urllib.error.HTTPError(self._path, resp.status, resp.reason, resp.headers, io.BytesIO(data))
+        if resp.will_close:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        return codec.loads(data)
+
+    def _generate_chunk(
+        self, topic: str | None, level: str | None, count: int, seed: int, avoid: list[str] | None = None
+    ) -> tuple[list[Tip], dict[str, int]]:
+        if self._structured:
+            try:
+                data = self._post({
+                    "model": self._model,
+                    "messages": [{"role": "user", "content": build_structured_prompt(topic, level, count, avoid)}],
+                    "response_format": openai_response_format(),
+                    "stream": False,
+                    "seed": seed,
+                })
+                return self._parse(data)
+            except urllib.error.HTTPError as e:
+                if not rejects_schema(e):
+                    raise
+                self._structured = False  # Server has no json_schema support
+                mark_schema_unsupported("local", self._model)
+        data = self._post({
+            "model": self._model,
+            "messages": [{"role": "user", "content": build_prompt(topic, level, count, avoid)}],
+            "stream": False,
+            "seed": seed,
+        })
+        return self._parse(data)
+
+    def _parse(self, data: dict) -> tuple[list[Tip], dict[str, int]]:
+        usage = data.get("usage") or {}
+        tips = parse_response(data["choices"][0]["message"]["content"])
+        return tips, {"prompt_tokens": usage.get("prompt_tokens", 0), "output_tokens": usage.get("completion_tokens", 0)}
+
+    def generate_many(
+        self, requests: list[tuple[str | None, str | None, int]], avoid: list[str] | None = None
+    ) -> list[list[Tip] | Exception]:
+        """Run several (topic, level, count) generations concurrently.
+
+        Returns one entry per request: the tips, or the exception it raised.
+        ``last_usage`` is the total over every request that succeeded.
+        """
+        def run(
+            item: tuple[int, tuple[str | None, str | None, int]]
+        ) -> tuple[list[Tip], dict[str, int]] | Exception:
+            seed, (topic, level, count) = item
+            try:
+                return self._generate_chunk(topic, level, count, seed, avoid)
+            except Exception as e:
+                return e
+
+        workers = min(self._max_in_flight, len(requests)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(run, enumerate(requests)))
+        done = [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+        self.last_usage = {key: sum(usage[key] for _, usage in done) for key in ("prompt_tokens", "output_tokens")}
+        return [outcome if isinstance(outcome, Exception) else outcome[0] for outcome in outcomes]
+
+    def generate_tips(
+        self, topic: str | None, level: str | None, count: int, avoid: list[str] | None = None
+    ) -> list[Tip]:
+        chunks = max(1, min(self._max_in_flight, count // MIN_CHUNK))
+        size = math.ceil(count / chunks)
+        sizes = [min(size, count - i * size) for i in range(chunks)]
+
+        requests = [(topic, level, n) for n in sizes if n > 0]
+        if not requests:
+            return []
+        results = self.generate_many(requests, avoid)
+        tips = [tip for result in results if not isinstance(result, Exception) for tip in result]
+        errors = [result for result in results if isinstance(result, Exception)]
+        if not tips and errors:
+            raise errors[0]  # Chunks that answered with no tips are not an error
+        return tips
+
+    def close(self) -> None:
+        """Close all idle pooled connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -1,28 +1,65 @@
 from __future__ import annotations
 
-import json
+import urllib.error
 import urllib.request
 
-from dev_tip.ai.prompt import build_prompt, parse_response
-from dev_tip.ai.provider import AIProvider
+from dev_tip import codec
+from dev_tip.ai.prompt import (
+    build_prompt,
+    build_structured_prompt,
+    openai_response_format,
+    parse_response,
+)
+from dev_tip.ai.provider import AIProvider, mark_schema_unsupported, rejects_schema, schema_unsupported
+from dev_tip.record import Tip
 
 DEFAULT_MODEL = "google/gemini-2.0-flash-exp:free"
-_ENDPOINT = "https://openrouter.ai/api/v1/chat/completions"
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
 
 
 class OpenRouterProvider(AIProvider):
-    def __init__(self, api_key: str, model: str | None = None) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        model: str | None = None,
+        base_url: str | None = None,
+        structured: bool = True,
+    ) -> None:
         self._api_key = api_key
         self._model = model or DEFAULT_MODEL
+        self._endpoint = (base_url or DEFAULT_BASE_URL).rstrip("/") + "/chat/completions"
+        self._structured = structured and not schema_unsupported("openrouter", self._model)
 
-    def generate_tips(self, topic: str | None, level: str | None, count: int) -> list[dict]:
-        prompt = build_prompt(topic, level, count)
-        body = json.dumps({
-            "model": self._model,
-            "messages": [{"role": "user", "content": prompt}],
-        }).encode()
+    def generate_tips(
+        self, topic: str | None, level: str | None, count: int, avoid: list[str] | None = None
+    ) -> list[Tip]:
+        if self._structured:
+            try:
+                return self._generate(topic, level, count, avoid, structured=True)
+            except urllib.error.HTTPError as e:
+                if not rejects_schema(e):
+                    raise
+                self._structured = False  # Model rejects response_format
+                mark_schema_unsupported("openrouter", self._model)
+        return self._generate(topic, level, count, avoid, structured=False)
+
+    def _generate(
+        self, topic: str | None, level: str | None, count: int, avoid: list[str] | None, structured: bool
+    ) -> list[Tip]:
+        if structured:
+            payload = {
+                "model": self._model,
+                "messages": [{"role": "user", "content": build_structured_prompt(topic, level, count, avoid)}],
+                "response_format": openai_response_format(),
+            }
+        else:
+            payload = {
+                "model": self._model,
+                "messages": [{"role": "user", "content": build_prompt(topic, level, count, avoid)}],
+            }
+        body = codec.dumps(payload)
         req = urllib.request.Request(
-            _ENDPOINT,
+            self._endpoint,
             data=body,
             headers={
                 "Content-Type": "application/json",
@@ -32,6 +69,12 @@ class OpenRouterProvider(AIProvider):
             },
         )
         with urllib.request.urlopen(req, timeout=30) as resp:
-            data = json.loads(resp.read())
+            data = codec.loads(resp.read())
+
+        usage = data.get("usage") or {}
+        self.last_usage = {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "output_tokens": usage.get("completion_tokens", 0),
+        }
         text = data["choices"][0]["message"]["content"]
         return parse_response(text)
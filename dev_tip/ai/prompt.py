@@ -1,19 +1,75 @@
 from __future__ import annotations
 
-import json
 import re
 import secrets
 
+from dev_tip import codec
+from dev_tip.record import Tip
 
-def build_prompt(topic: str | None, level: str | None, count: int) -> str:
-    """Build a prompt requesting a JSON array of developer tips."""
+# Compact wire schema for structured output: the model fills short keys and
+# parse_response expands them, so no output tokens go to long key names or
+# to fields we set locally (id, source).
+WIRE_KEYS = {"t": "topic", "l": "level", "h": "title", "b": "body", "x": "example"}
+LEVELS = ["beginner", "intermediate", "advanced"]
+
+# Titles listed in the prompt so the model does not repeat what we already have
+AVOID_TOKEN_BUDGET = 250
+AVOID_MAX_TITLES = 40
+AVOID_SIMILARITY = 0.75  # Word-set Jaccard at or above which two titles count as the same tip
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _constraint_block(topic: str | None, level: str | None) -> str:
     constraints = []
     if topic:
         constraints.append(f'- Topic must be "{topic}"')
     if level:
         constraints.append(f'- Level must be "{level}" (beginner, intermediate, or advanced)')
+    return "\n".join(constraints) if constraints else "- Any topic and level"
+
+
+def title_words(title: str) -> frozenset[str]:
+    """Lowercase words of a title, for comparing titles."""
+    return frozenset(_WORD_RE.findall(title.lower()))
+
 
-    constraint_block = "\n".join(constraints) if constraints else "- Any topic and level"
+def avoid_digest(
+    titles: list[str], budget: int = AVOID_TOKEN_BUDGET, limit: int = AVOID_MAX_TITLES
+) -> list[str]:
+    """Pick titles for the prompt's avoid list from candidates given most recent first.
+
+    A title too similar to one already picked is skipped; naming one of
+    them keeps the model off both, so the token budget covers more tips.
+    """
+    picked: list[str] = []
+    picked_words: list[frozenset[str]] = []
+    used = 0
+    for title in titles:
+        words = title_words(title)
+        if not words or any(len(words & other) / len(words | other) >= AVOID_SIMILARITY for other in picked_words):
+            continue
+        cost = len(title) // 4 + 2  # Rough tokens for the line and its "- " marker
+        if used + cost > budget:
+            break
+        picked.append(title)
+        picked_words.append(words)
+        used += cost
+        if len(picked) >= limit:
+            break
+    return picked
+
+
+def _avoid_block(avoid: list[str] | None) -> str:
+    if not avoid:
+        return ""
+    lines = "\n".join(f"- {' '.join(title.split())}" for title in avoid)
+    return f"\n\nAlready known, do not repeat these or close variants:\n{lines}"
+
+
+def build_prompt(topic: str | None, level: str | None, count: int, avoid: list[str] | None = None) -> str:
+    """Build a prompt requesting a JSON array of developer tips."""
+    constraint_block = _constraint_block(topic, level) + _avoid_block(avoid)
 
     return f"""\
 Generate {count} concise, practical developer tips as a JSON array.
@@ -32,13 +88,90 @@ Each tip must be a JSON object with exactly these keys:
 Respond with ONLY a JSON array, no markdown fencing or extra text."""
 
 
-def parse_response(text: str) -> list[dict]:
-    """Parse an AI response into a list of validated tip dicts."""
+def build_structured_prompt(
+    topic: str | None, level: str | None, count: int, avoid: list[str] | None = None
+) -> str:
+    """Build the shorter prompt used with a response schema.
+
+    The schema already fixes the output format, so only the content is described.
+    """
+    return f"""\
+Generate {count} concise, practical developer tips.
+
+Constraints:
+{_constraint_block(topic, level)}{_avoid_block(avoid)}
+
+Fields: t = lowercase topic name, l = level, h = short title (under 60 chars), \
+b = 1-3 sentence explanation, x = short code or command example (may be empty)."""
+
+
+def _tip_properties() -> dict:
+    return {
+        "t": {"type": "string"},
+        "l": {"type": "string", "enum": LEVELS},
+        "h": {"type": "string"},
+        "b": {"type": "string"},
+        "x": {"type": "string"},
+    }
+
+
+def gemini_response_schema() -> dict:
+    """Gemini responseSchema (OpenAPI subset) for an array of compact tips."""
+    properties = {
+        key: {"type": "STRING", **({"enum": spec["enum"]} if "enum" in spec else {})}
+        for key, spec in _tip_properties().items()
+    }
+    return {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": properties,
+            "required": list(WIRE_KEYS),
+            "propertyOrdering": list(WIRE_KEYS),
+        },
+    }
+
+
+def openai_response_format() -> dict:
+    """Chat-completions response_format with a strict JSON schema.
+
+    Strict schemas must have an object at the root, so tips are wrapped in
+    ``{"tips": [...]}``.
+    """
+    tip = {
+        "type": "object",
+        "properties": _tip_properties(),
+        "required": list(WIRE_KEYS),
+        "additionalProperties": False,
+    }
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "tips",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {"tips": {"type": "array", "items": tip}},
+                "required": ["tips"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def parse_response(text: str) -> list[Tip]:
+    """Parse an AI response into a list of validated tips.
+
+    Accepts free-form output (optionally fenced) as well as structured
+    output using the compact wire keys, bare or wrapped in ``{"tips": ...}``.
+    """
     # Strip markdown code fencing if present
     cleaned = re.sub(r"^```(?:json)?\s*\n?", "", text.strip())
     cleaned = re.sub(r"\n?```\s*$", "", cleaned)
 
-    tips = json.loads(cleaned)
+    tips = codec.loads(cleaned)
+    if isinstance(tips, dict) and isinstance(tips.get("tips"), list):
+        tips = tips["tips"]
     if not isinstance(tips, list):
         raise ValueError("Expected a JSON array of tips")
 
@@ -47,12 +180,14 @@ def parse_response(text: str) -> list[dict]:
     for tip in tips:
         if not isinstance(tip, dict):
             continue
+        if "h" in tip or "b" in tip:
+            tip = {WIRE_KEYS.get(key, key): value for key, value in tip.items()}
         if not required_keys.issubset(tip.keys()):
             continue
         tip["id"] = f"ai-{secrets.token_hex(4)}"
         tip["source"] = "ai"
         tip.setdefault("example", "")
-        validated.append(tip)
+        validated.append(Tip.from_dict(tip))
 
     if not validated:
         raise ValueError("No valid tips found in response")
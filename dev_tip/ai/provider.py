@@ -1,26 +1,102 @@
 from __future__ import annotations
 
+import re
+import time
+import urllib.error
 from abc import ABC, abstractmethod
+from pathlib import Path
+
+from dev_tip.record import Tip
+from dev_tip.state import state_file
+
+# Providers that work without an API key
+KEYLESS_PROVIDERS = {"fake", "local"}
+
+# Models that rejected structured output, so the next run starts free-form
+MODEL_CAPS_FILE = Path.home() / ".dev-tip" / "model_caps.json"
+SCHEMA_RECHECK_SECONDS = 7 * 24 * 3600  # Models gain schema support; ask again after a week
+_SCHEMA_ERROR_RE = re.compile(rb"schema|response_?format|json_object|response_?mime_?type", re.IGNORECASE)
 
 
 class AIProvider(ABC):
     """Abstract base for AI tip providers."""
 
+    # Token usage of the most recent call, when the API reports it:
+    # {"prompt_tokens": n, "output_tokens": n}
+    last_usage: dict | None = None
+
     @abstractmethod
-    def generate_tips(self, topic: str | None, level: str | None, count: int) -> list[dict]:
-        """Generate a batch of tips via an AI API."""
+    def generate_tips(
+        self, topic: str | None, level: str | None, count: int, avoid: list[str] | None = None
+    ) -> list[Tip]:
+        """Generate a batch of tips via an AI API, steering clear of the ``avoid`` titles."""
+
+
+def rejects_schema(error: urllib.error.HTTPError) -> bool:
+    """Whether an HTTP error says the model cannot do structured output.
+
+    Only a 400 whose body names the schema counts; Gemini also answers a bad
+    API key with 400, and that must not cost a second request.
+    """
+    if error.code != 400:
+        return False
+    try:
+        body = error.read() or b""
+    except Exception:
+        return False
+    return bool(_SCHEMA_ERROR_RE.search(body))
+
+
+def _model_caps() -> dict:
+    from dev_tip import statefile
+
+    try:
+        caps = statefile.read(state_file(MODEL_CAPS_FILE))
+    except (OSError, ValueError):
+        return {}
+    return caps if isinstance(caps, dict) else {}
 
 
-def create_provider(name: str, api_key: str, model: str | None = None) -> AIProvider:
+def schema_unsupported(provider: str, model: str) -> bool:
+    """Whether ``model`` rejected structured output recently."""
+    marked = _model_caps().get(f"{provider}:{model}")
+    return isinstance(marked, (int, float)) and time.time() - marked < SCHEMA_RECHECK_SECONDS
+
+
+def mark_schema_unsupported(provider: str, model: str) -> None:
+    """Remember that ``model`` rejects structured output, across runs."""
+    from dev_tip import statefile
+
+    caps = _model_caps()
+    caps[f"{provider}:{model}"] = time.time()
+    try:
+        statefile.write(state_file(MODEL_CAPS_FILE), caps)
+    except OSError:
+        pass  # Costs one rejected request per run, as before
+
+
+def create_provider(
+    name: str, api_key: str, model: str | None = None, base_url: str | None = None
+) -> AIProvider:
     """Factory: create a provider by name with lazy SDK imports."""
     if name == "gemini":
         from dev_tip.ai.gemini import GeminiProvider
 
-        return GeminiProvider(api_key, model=model)
+        return GeminiProvider(api_key, model=model, base_url=base_url)
 
     if name == "openrouter":
         from dev_tip.ai.openrouter import OpenRouterProvider
 
-        return OpenRouterProvider(api_key, model=model)
+        return OpenRouterProvider(api_key, model=model, base_url=base_url)
+
+    if name == "local":
+        from dev_tip.ai.local import LocalProvider
+
+        return LocalProvider(api_key, model=model, base_url=base_url)
+
+    if name == "fake":
+        from dev_tip.ai.fake import FakeProvider
+
+        return FakeProvider(api_key, model=model)
 
     raise ValueError(f"Unknown AI provider: {name!r}")
@@ -1,9 +1,7 @@
 from __future__ import annotations
 
-import random
-import subprocess
+import shutil
 import sys
-import textwrap
 from pathlib import Path
 from typing import Optional
 
@@ -11,158 +9,102 @@ import typer
 from rich.console import Console
 
 from dev_tip.config import CONFIG_DIR, load_config
-from dev_tip.history import all_seen, get_unseen, mark_seen
+from dev_tip.engine import TipEngine
+from dev_tip.history import _load_history
 from dev_tip.hook import disable as hook_disable
 from dev_tip.hook import enable as hook_enable
-from dev_tip.tips import filter_tips, load_tips
+from dev_tip.mix import mix_names, parse_mix
+from dev_tip.render import TOPIC_EMOJI, render_tip, use_color
 
 app = typer.Typer(invoke_without_command=True, add_completion=False)
 console = Console()
 
 PAUSE_FILE = CONFIG_DIR / ".paused"
 
-TOPIC_EMOJI = {
-    "python": "\U0001f40d",
-    "git": "\U0001f500",
-    "docker": "\U0001f433",
-    "sql": "\U0001f4be",
-    "linux": "\U0001f427",
-    "kubernetes": "\u2638\ufe0f",
-    "vim": "\U0001f4dd",
-    "javascript": "\U0001f7e8",
-    "terraform": "\U0001f3d7\ufe0f",
-    "rust": "\U0001f980",
-}
-
 
 def _render_tip(tip: dict, quiet: bool = False) -> None:
     """Display a tip as a compact, dim, right-floated block."""
-    console.print()  # breathing room between shell output and tip
-
-    body = tip["body"].strip()
-    wrap_width = min(console.width, 60)
-    term_w = console.width
-    pad = term_w - wrap_width
-
-    if quiet:
-        body_lines = textwrap.wrap(body, width=wrap_width)
-        for line in body_lines:
-            console.print(" " * max(pad, 0) + line, style="dim", highlight=False)
-        return
-
-    topic = tip["topic"]
-    emoji = TOPIC_EMOJI.get(topic, "\U0001f4a1")
-    header = f"{emoji} {topic} \u00b7 {tip['level']} \u00b7 {tip['title']}"
-
-    header_lines = textwrap.wrap(header, width=wrap_width)
-    body_lines = textwrap.wrap(body, width=wrap_width)
-
-    block = header_lines + [""] + body_lines
-    for line in block:
-        console.print(" " * max(pad, 0) + line, style="dim", highlight=False)
-
-
-def _maybe_prefetch(topic: str | None, level: str | None, unseen_count: int) -> None:
-    """Spawn a background prefetch if the cache is running low."""
-    from dev_tip.ai.cache import cache_needs_refill
-
-    if not cache_needs_refill(topic, level, unseen_count):
-        return
-
-    topic_arg = str(topic) if topic is not None else "null"
-    level_arg = str(level) if level is not None else "null"
-    try:
-        subprocess.Popen(
-            [sys.executable, "-m", "dev_tip.prefetch", topic_arg, level_arg],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            stdin=subprocess.DEVNULL,
-            start_new_session=True,
-        )
-    except OSError:
-        pass
+    width = shutil.get_terminal_size().columns
+    sys.stdout.write(render_tip(tip, width, quiet=quiet, color=use_color()))
+    sys.stdout.flush()
 
 
 @app.callback()
 def main(
     ctx: typer.Context,
-    topic: Optional[str] = typer.Option(None, "--topic", "-t", help="Filter by topic"),
-    level: Optional[str] = typer.Option(None, "--level", "-l", help="Filter by level"),
-    provider: Optional[str] = typer.Option(None, "--provider", "-p", help="AI provider (gemini, openrouter)"),
+    topic: Optional[str] = typer.Option(None, "--topic", "-t", help="Topic or weighted mix, e.g. python:60,git:30,*:10"),
+    level: Optional[str] = typer.Option(None, "--level", "-l", help="Level or weighted mix, e.g. beginner,intermediate"),
+    provider: Optional[str] = typer.Option(None, "--provider", "-p", help="AI provider (gemini, openrouter, local)"),
     key: Optional[str] = typer.Option(None, "--key", "-k", help="API key for the AI provider"),
     quiet: Optional[bool] = typer.Option(False, "--quiet", "-q", help="Show tip body only, no header"),
+    context: Optional[str] = typer.Option(None, "--context", help="Last shell command; favours tips on its topic"),
 ) -> None:
     """Show a random developer tip."""
     if ctx.invoked_subcommand is not None:
         return
 
-    config = load_config()
+    engine = TipEngine(config={"ai_provider": provider, "ai_key": key})
+    config = engine.config
     topic = topic or config.get("topic")
     level = level or config.get("level")
     quiet = quiet or config.get("quiet", False)
-    if provider:
-        config["ai_provider"] = provider
-    if key:
-        config["ai_key"] = key
 
-    ai_provider = config.get("ai_provider")
+    for name, spec in (("topic", topic), ("level", level)):
+        try:
+            parse_mix(spec)
+        except ValueError as e:
+            console.print(f"[red]Invalid {name}: {e}[/red]")
+            raise typer.Exit(1)
 
     # Validate topic/level
-    from dev_tip.tips import VALID_LEVELS, VALID_TOPICS
-
-    if topic and topic not in VALID_TOPICS and not ai_provider:
-        console.print(
-            f"[yellow]Unknown topic '{topic}'. "
-            f"Available: {', '.join(sorted(VALID_TOPICS))}[/yellow]"
-        )
-    if level and level not in VALID_LEVELS:
-        console.print(
-            f"[yellow]Unknown level '{level}'. "
-            f"Available: {', '.join(sorted(VALID_LEVELS))}[/yellow]"
-        )
-
-    if ai_provider:
-        from dev_tip.ai import get_ai_tip
+    from dev_tip.tips import VALID_LEVELS
 
-        tip, unseen_count = get_ai_tip(topic=topic, level=level, config=config)
-        if tip is not None:
-            mark_seen(tip["id"])
-            _render_tip(tip, quiet=quiet)
-            _maybe_prefetch(topic, level, unseen_count)
-            return
-
-    tips = load_tips()
-    filtered = filter_tips(tips, topic=topic, level=level)
-
-    if not filtered:
-        # Topic may only exist for AI — drop topic filter, keep level
-        filtered = filter_tips(tips, level=level)
-
-    if not filtered:
+    ai_provider = config.get("ai_provider")
+    if not ai_provider:
+        # With AI the store is only opened if no AI tip is available
+        topics = engine.topics()
+        for name in mix_names(topic):
+            if name not in topics:
+                console.print(
+                    f"[yellow]Unknown topic '{name}'. "
+                    f"Available: {', '.join(sorted(topics))}[/yellow]"
+                )
+    for name in mix_names(level):
+        if name not in VALID_LEVELS:
+            console.print(
+                f"[yellow]Unknown level '{name}'. "
+                f"Available: {', '.join(sorted(VALID_LEVELS))}[/yellow]"
+            )
+
+    pick = engine.next_tip(topic, level, context)
+    if pick is None:
         console.print("[red]No tips found for the given filters.[/red]")
         raise typer.Exit(1)
 
-    if not ai_provider and all_seen(filtered):
+    if not ai_provider and pick.everything_seen:
         console.print(
             "[dim]You've seen all tips! For unlimited fresh tips, set up free AI generation:"
             "\nhttps://aistudio.google.com[/dim]\n"
         )
+    _render_tip(pick.tip, quiet=quiet)
+    if pick.refill:
+        from dev_tip.prefetch import spawn
 
-    unseen = get_unseen(filtered)
-    tip = random.choice(unseen)
-    mark_seen(tip["id"])
-    _render_tip(tip, quiet=quiet)
+        spawn(pick.topic, pick.level, config, pick.unseen, provider=engine.provider)
 
 
 @app.command()
 def enable(
-    provider: Optional[str] = typer.Option(None, "--provider", "-p", help="AI provider (gemini, openrouter)"),
+    provider: Optional[str] = typer.Option(None, "--provider", "-p", help="AI provider (gemini, openrouter, local)"),
     key: Optional[str] = typer.Option(None, "--key", "-k", help="API key for the AI provider"),
     topic: Optional[str] = typer.Option(None, "--topic", "-t", help="Default topic filter"),
     level: Optional[str] = typer.Option(None, "--level", "-l", help="Default level filter"),
     every_commands: Optional[int] = typer.Option(None, "--every-commands", help="Show tip every N commands (default: 15)"),
     every_minutes: Optional[int] = typer.Option(None, "--every-minutes", help="Show tip every N minutes (default: 30)"),
     quiet: Optional[bool] = typer.Option(False, "--quiet", "-q", help="Show tip body only, no header"),
+    shared_schedule: Optional[bool] = typer.Option(
+        None, "--shared-schedule/--per-shell", help="Count commands and minutes across all shells (default: per shell)"
+    ),
 ) -> None:
     """Enable the shell hook (show a tip on every new terminal)."""
     hook_enable(
@@ -173,6 +115,7 @@ def enable(
         every_commands=every_commands,
         every_minutes=every_minutes,
         quiet=quiet or False,
+        shared_schedule=shared_schedule,
     )
 
 
@@ -206,12 +149,219 @@ def clear_cache() -> None:
     console.print("[green]AI cache cleared.[/green]")
 
 
+cache_app = typer.Typer(help="Export and import the AI tip cache.", no_args_is_help=True)
+app.add_typer(cache_app, name="cache")
+
+
+@cache_app.command("export")
+def cache_export(
+    output: str = typer.Argument(..., help="Bundle to write (e.g. tips.jsonl.gz), or - for stdout"),
+    key: Optional[list[str]] = typer.Option(None, "--key", help="Cache key to include, e.g. python:beginner (repeatable)"),
+    shared: bool = typer.Option(False, "--shared", help="Also include the shared cache"),
+) -> None:
+    """Write cached AI tips to a compressed bundle."""
+    from dev_tip.ai.bundle import export_bundle
+
+    shared_dir = load_config().get("shared_cache_dir") if shared else None
+    counts = export_bundle(output, keys=key or None, shared_dir=shared_dir)
+    if output != "-":
+        console.print(f"[green]Exported {counts['tips']} tips ({counts['keys']} keys) to {output}[/green]")
+
+
+@cache_app.command("import")
+def cache_import(
+    bundle: Path = typer.Argument(..., help="Bundle written by dev-tip cache export"),
+    key: Optional[list[str]] = typer.Option(None, "--key", help="Only import this cache key (repeatable)"),
+    shared: bool = typer.Option(False, "--shared", help="Import into the shared cache instead of your own"),
+) -> None:
+    """Merge a bundle into the AI cache, skipping tips already present."""
+    from dev_tip.ai.bundle import import_bundle
+
+    shared_dir = load_config().get("shared_cache_dir") if shared else None
+    if shared and not shared_dir:
+        console.print("[red]No shared_cache_dir configured.[/red]")
+        raise typer.Exit(1)
+    try:
+        counts = import_bundle(bundle, keys=key or None, shared_dir=shared_dir)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]Import failed: {e}[/red]")
+        raise typer.Exit(1)
+    console.print(
+        f"[green]Imported {counts['added']} tips[/green] "
+        f"({counts['duplicates']} already cached, {counts['invalid']} invalid)"
+    )
+
+
+packs_app = typer.Typer(help="Validate and compile tip packs.", no_args_is_help=True)
+app.add_typer(packs_app, name="packs")
+
+
+@packs_app.command("build")
+def packs_build(
+    jobs: Optional[int] = typer.Option(None, "--jobs", "-j", min=1, help="Worker processes (default: one per CPU)"),
+) -> None:
+    """Validate every pack and rebuild the tip store, reusing unchanged packs."""
+    import time
+
+    from rich.markup import escape
+
+    from dev_tip.packs import build
+
+    start = time.perf_counter()
+    results = build(jobs=jobs)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        kept = len(result.tips) - len(result.duplicates)
+        timing = "cached" if result.cached else f"{result.seconds * 1000:.1f} ms"
+        color = "red" if result.errors else "yellow" if result.duplicates else "green"
+        console.print(
+            f"[{color}]{escape(result.path.name)}[/{color}]: {kept} tips, "
+            f"{len(result.errors)} errors, {len(result.duplicates)} duplicate ids [dim]({timing})[/dim]"
+        )
+        for error in result.errors:
+            console.print(f"  [red]{escape(error)}[/red]")
+        for tip_id, first in result.duplicates:
+            console.print(f"  [yellow]{escape(tip_id)}: already defined in {escape(first)}, skipped[/yellow]")
+
+    total = sum(len(r.tips) - len(r.duplicates) for r in results)
+    console.print(f"Compiled {total} tips from {len(results)} files in {elapsed:.2f}s")
+    if any(r.errors for r in results):
+        raise typer.Exit(1)
+
+
+@app.command()
+def digest(
+    count: int = typer.Option(1, "--count", "-n", min=1, help="Tips per target"),
+    state_dir: Optional[list[Path]] = typer.Option(
+        None, "--state-dir", exists=True, file_okay=False, help="Target state directory, e.g. ~alice/.dev-tip (repeatable)"
+    ),
+    targets_from: Optional[str] = typer.Option(None, "--targets-from", help="File listing state directories, - for stdin"),
+    topic: Optional[str] = typer.Option(None, "--topic", "-t", help="Topic or weighted mix"),
+    level: Optional[str] = typer.Option(None, "--level", "-l", help="Level or weighted mix"),
+    output: str = typer.Option("text", "--format", help="text or json (one JSON object per tip)"),
+    mark: bool = typer.Option(True, "--mark/--no-mark", help="Record the tips in each target's history"),
+) -> None:
+    """Pick N unseen tips for each of many users or sessions in one pass."""
+    import json
+
+    from dev_tip.digest import digest as run_digest
+    from dev_tip.digest import load_corpus
+
+    if output not in ("text", "json"):
+        console.print(f"[red]Unknown format {output!r}: use text or json.[/red]")
+        raise typer.Exit(1)
+    for name, spec in (("topic", topic), ("level", level)):
+        try:
+            parse_mix(spec)
+        except ValueError as e:
+            console.print(f"[red]Invalid {name}: {e}[/red]")
+            raise typer.Exit(1)
+
+    targets: list[Path | None] = list(state_dir or [])
+    if targets_from:
+        try:
+            lines = sys.stdin.read() if targets_from == "-" else Path(targets_from).read_text()
+        except OSError as e:
+            console.print(f"[red]Cannot read {targets_from}: {e.strerror}[/red]")
+            raise typer.Exit(1)
+        targets += [Path(line.strip()).expanduser() for line in lines.splitlines() if line.strip()]
+    if not targets:
+        targets = [None]  # Just the caller
+
+    config = load_config()
+    corpus = load_corpus(config.get("shared_cache_dir"))
+    width = shutil.get_terminal_size().columns
+    color = use_color()
+    failed = False
+    for result in run_digest(corpus, targets, count, topic or config.get("topic"), level or config.get("level"), mark):
+        target = str(result.target) if result.target is not None else None
+        if result.error:
+            failed = True
+            if output == "json":
+                sys.stdout.write(json.dumps({"target": target, "error": result.error}) + "\n")
+            else:
+                sys.stderr.write(f"{target}: {result.error}\n")
+            continue
+        if output == "json":
+            sys.stdout.write("".join(json.dumps({"target": target, **tip}) + "\n" for tip in result.tips))
+        else:
+            if target is not None:
+                sys.stdout.write(f"==> {target} <==\n")
+            sys.stdout.write("".join(render_tip(tip, width, color=color) for tip in result.tips))
+        sys.stdout.flush()
+    if failed:
+        raise typer.Exit(1)
+
+
+@app.command("update")
+def update_tips(
+    url: Optional[str] = typer.Option(None, "--url", help="Feed manifest to use instead of update_url"),
+    full: bool = typer.Option(False, "--full", help="Download the full snapshot instead of deltas"),
+) -> None:
+    """Fetch new and changed tips from the tip feed."""
+    from dev_tip.update import update
+
+    feed = url or load_config().get("update_url")
+    if not feed:
+        console.print("[red]No update_url configured.[/red] Set it in ~/.dev-tip/config.toml or pass --url.")
+        raise typer.Exit(1)
+    try:
+        summary = update(feed, full=full)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]Update failed: {e}[/red]")
+        raise typer.Exit(1)
+    if summary["status"] == "unchanged":
+        console.print(f"Tips are up to date (serial {summary['serial']}).")
+        return
+    console.print(
+        f"[green]Updated to serial {summary['serial']}[/green] from {summary['status']}: "
+        f"{summary['added']} new, {summary['changed']} changed, {summary['removed']} removed"
+        + (f", {summary['invalid']} invalid skipped" if summary["invalid"] else "")
+        + f" [dim]({summary['requests']} requests, {summary['bytes']} bytes)[/dim]"
+    )
+
+
 @app.command()
-def status() -> None:
+def search(
+    query: list[str] = typer.Argument(..., help="Words to search for"),
+    limit: int = typer.Option(10, "--limit", "-n", help="Maximum number of results"),
+) -> None:
+    """Search bundled, pack and cached AI tips."""
+    from rich.markup import escape
+
+    from dev_tip.search import search as do_search
+
+    results = do_search(" ".join(query), limit=limit)
+    if not results:
+        console.print("[yellow]No matching tips.[/yellow]")
+        return
+
+    for _, tip in results:
+        emoji = TOPIC_EMOJI.get(tip["topic"], "\U0001f4a1")
+        console.print(
+            f"  {emoji} {escape(tip['topic'])} \u00b7 {escape(tip['level'])} \u00b7 "
+            f"[bold]{escape(tip['title'])}[/bold] [dim]({escape(tip['id'])})[/dim]"
+        )
+
+
+def _mask_key(ai_key: str) -> str:
+    return ai_key[:4] + "..." + ai_key[-4:] if len(ai_key) > 8 else "***"
+
+
+@app.command()
+def status(
+    as_json: bool = typer.Option(False, "--json", help="Print status and metrics as JSON"),
+    textfile: Optional[Path] = typer.Option(
+        None, "--textfile", help="Write metrics to an OpenMetrics file (node_exporter textfile collector)"
+    ),
+) -> None:
     """Show current dev-tip configuration and status."""
     from dev_tip.ai.cache import get_cache_stats
-    from dev_tip.history import _load_history
     from dev_tip.hook import HOOK_MARKER_START, PAUSE_FILE, _get_rc_file
+    from dev_tip.metrics import collect
+    from dev_tip.prefetch import queue_status
+    from dev_tip.statefile import recoveries
 
     config = load_config()
     rc_file = _get_rc_file()
@@ -222,6 +372,43 @@ def status() -> None:
         hook_installed = HOOK_MARKER_START in rc_file.read_text()
 
     paused = PAUSE_FILE.exists()
+    shared_dir = config.get("shared_cache_dir")
+    stats = get_cache_stats(shared_dir=shared_dir)
+    history = _load_history()
+    recovered = recoveries()
+    queue = queue_status(shared_dir)
+
+    if as_json or textfile:
+        import json
+
+        from dev_tip.config import CONFIG_DIR as state_dir
+        from dev_tip.metrics import state_bytes, write_textfile
+
+        data = collect({
+            "state_bytes": state_bytes(state_dir),
+            "tips_seen": len(history),
+            "ai_cache_tips": stats["total_tips"],
+            "cooldown_active": int(stats["cooldown_active"]),
+            "paused": int(paused),
+            "prefetch_queue_depth": queue["queued"],
+        })
+        if textfile:
+            write_textfile(textfile, data)
+        if as_json:
+            public_config = dict(config)
+            if public_config.get("ai_key"):
+                public_config["ai_key"] = _mask_key(public_config["ai_key"])
+            sys.stdout.write(json.dumps({
+                "hook": {"installed": hook_installed, "rc_file": str(rc_file)},
+                "paused": paused,
+                "config": public_config,
+                "cache": stats,
+                "history": {"tips_seen": len(history)},
+                "prefetch": queue,
+                "recoveries": recovered,
+                "metrics": data,
+            }, indent=2) + "\n")
+        return
 
     console.print("[bold]dev-tip status[/bold]\n")
 
@@ -236,8 +423,10 @@ def status() -> None:
     # Config
     console.print()
     console.print("[bold]  Config[/bold]")
-    console.print(f"    topic:          {config.get('topic') or '[dim]any[/dim]'}")
-    console.print(f"    level:          {config.get('level') or '[dim]any[/dim]'}")
+    for name in ("topic", "level"):
+        value = config.get(name)
+        value = ",".join(value) if isinstance(value, list) else value
+        console.print(f"    {name + ':':<16}{value or '[dim]any[/dim]'}")
     console.print(f"    every_commands: {config.get('every_commands')}")
     console.print(f"    every_minutes:  {config.get('every_minutes')}")
     console.print(f"    quiet:          {config.get('quiet', False)}")
@@ -251,24 +440,50 @@ def status() -> None:
         console.print(f"    model:    {config.get('ai_model') or '[dim]default[/dim]'}")
         ai_key = config.get("ai_key")
         if ai_key:
-            masked = ai_key[:4] + "..." + ai_key[-4:] if len(ai_key) > 8 else "***"
-            console.print(f"    key:      {masked}")
+            console.print(f"    key:      {_mask_key(ai_key)}")
         else:
             console.print("    key:      [dim]from env var[/dim]")
     else:
         console.print("    [dim]not configured (using static tips)[/dim]")
 
     # Cache
-    stats = get_cache_stats()
     console.print()
     console.print("[bold]  Cache[/bold]")
     console.print(f"    cached keys:  {stats['keys']}")
     console.print(f"    total tips:   {stats['total_tips']}")
+    if shared_dir:
+        console.print(f"    shared cache: {shared_dir}")
+        console.print(f"    shared keys:  {stats['shared_keys']}")
+        console.print(f"    shared tips:  {stats['shared_tips']}")
     cooldown = "[yellow]yes[/yellow]" if stats["cooldown_active"] else "no"
     console.print(f"    cooldown:     {cooldown}")
 
+    # Prefetch queue
+    waits = collect()["histograms"].get("prefetch_wait_seconds", {}).get("", {})
+    console.print()
+    console.print("[bold]  Prefetch queue[/bold]")
+    queued = f"{queue['queued']}"
+    if queue["queued"]:
+        queued += f" [dim](oldest waiting {queue['oldest_wait_seconds']:.0f}s)[/dim]"
+    console.print(f"    queued:       {queued}")
+    console.print(f"    running:      {queue['running']}")
+    if waits.get("count"):
+        console.print(f"    average wait: {waits['sum'] / waits['count']:.1f}s over {waits['count']} refills")
+
     # History
-    history = _load_history()
     console.print()
     console.print("[bold]  History[/bold]")
     console.print(f"    tips seen: {len(history)}")
+
+    # Recovery
+    if recovered:
+        import time
+
+        console.print()
+        console.print("[bold]  Recovered state files[/bold]")
+        for entry in recovered:
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.get("time", 0)))
+            name = Path(entry.get("file", "?")).name
+            console.print(f"    {when}  {name}: {entry.get('reason')}, [yellow]{entry.get('action')}[/yellow]")
+            if entry.get("quarantined"):
+                console.print(f"      [dim]corrupt copy: {entry['quarantined']}[/dim]")
@@ -0,0 +1,65 @@
+"""JSON for state files and provider responses.
+
+Uses orjson or msgspec when one is installed (``pip install
+'cli-dev-tip[fast]'``) and the standard library otherwise.  Output is always
+compact UTF-8 with no indentation; every backend reads what the others
+wrote.  Decoding errors are ValueError whichever backend is in use.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from dev_tip.record import Tip
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Tip):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+
+    def loads(data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default)
+
+else:
+    try:
+        import msgspec
+    except ImportError:
+        msgspec = None
+
+    if msgspec is not None:
+        BACKEND = "msgspec"
+        _decoder = msgspec.json.Decoder()
+        _encoder = msgspec.json.Encoder(enc_hook=_default)
+
+        def loads(data: bytes | str) -> Any:
+            try:
+                return _decoder.decode(data)
+            except msgspec.DecodeError as e:
+                raise ValueError(str(e)) from None
+
+        def dumps(obj: Any) -> bytes:
+            return _encoder.encode(obj)
+
+    else:
+        BACKEND = "json"
+        _decode = json.JSONDecoder().decode
+        _encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default).encode
+
+        def loads(data: bytes | str) -> Any:
+            return _decode(data.decode() if isinstance(data, bytes) else data)
+
+        def dumps(obj: Any) -> bytes:
+            return _encode(obj).encode()
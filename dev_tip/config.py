@@ -1,11 +1,25 @@
+"""User configuration in ~/.dev-tip/config.toml.
+
+The parsed and validated config is also kept as a marshal snapshot stamped
+with the file's mtime, size and inode, so the per-prompt path reads one small
+binary file instead of importing tomllib and parsing TOML.  Any change to
+config.toml, by ``save_config`` or by hand, changes the stamp and the
+snapshot is simply rebuilt on the next load.
+"""
 from __future__ import annotations
 
-import tomllib
+import marshal
+import os
+import re
 from pathlib import Path
 from typing import Any
 
+from dev_tip.state import state_file
+
 CONFIG_DIR = Path.home() / ".dev-tip"
 CONFIG_FILE = CONFIG_DIR / "config.toml"
+SNAPSHOT_FILE = CONFIG_DIR / ".config.snapshot"
+SNAPSHOT_VERSION = 1
 
 DEFAULT_CONFIG = {
     "topic": None,
@@ -13,56 +27,139 @@ DEFAULT_CONFIG = {
     "ai_provider": None,
     "ai_model": None,
     "ai_key": None,
+    "ai_base_url": None,
+    "shared_cache_dir": None,
+    "update_url": None,
+    "context_commands": None,
     "every_commands": 15,
     "every_minutes": 30,
+    "shared_schedule": False,
     "quiet": False,
 }
 
 _TEMPLATE = """\
 # dev-tip configuration
 
-# Default topic filter (python, git, docker, sql, linux)
+# Default topic filter (python, git, docker, sql, linux), or a weighted
+# mix where "*" means any other topic: "python:60,kubernetes:30,*:10"
 # topic = "python"
 
-# Default level filter (beginner, intermediate, advanced)
+# Default level filter (beginner, intermediate, advanced), or a mix
 # level = "beginner"
 
 # AI-powered tip generation (free, requires API key in env var)
 # ai_provider = "gemini"        # or "openrouter"
 # ai_model = "gemini-2.0-flash"
+# ai_base_url = "http://127.0.0.1:8080"   # override the provider endpoint
+
+# System-wide AI tip cache shared by all users of this host (group-writable)
+# shared_cache_dir = "/var/cache/dev-tip"
+
+# Feed that `dev-tip update` pulls new and changed tips from
+# update_url = "https://example.com/dev-tip/feed/index.json"
+
+# Extra command -> topic rules for picking tips related to the last command
+# ("*" matches a prefix); built-in rules cover git, kubectl, docker, psql, ...
+# context_commands = "k9s:kubernetes,mytool*:python"
 
 # Periodic tip frequency
 # every_commands = 15    # show a tip every N commands
 # every_minutes = 30     # or every M minutes, whichever comes first
+# shared_schedule = false  # count commands and minutes across all shells, not per shell
 
 # Quiet mode — show tip body only, no header
 # quiet = false
 """
 
 
-def load_config() -> dict[str, Any]:
-    """Load config from ~/.dev-tip/config.toml, creating it if missing."""
-    if not CONFIG_FILE.exists():
-        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        CONFIG_FILE.write_text(_TEMPLATE)
-        return dict(DEFAULT_CONFIG)
+_INT_KEYS = {"every_commands", "every_minutes"}
+_BOOL_KEYS = {"quiet", "shared_schedule"}
+_MIX_KEYS = {"topic", "level"}  # A name, a "name:weight,..." mix, or a list of either
+_KEY_LINE = re.compile(r"^[#\s]*([A-Za-z_]+)\s*=")
 
-    with open(CONFIG_FILE, "rb") as f:
-        raw = tomllib.load(f)
 
+def _validate(raw: dict[str, Any]) -> dict[str, Any]:
+    """Merge known keys over the defaults, ignoring values of the wrong type."""
     config = dict(DEFAULT_CONFIG)
     for key in DEFAULT_CONFIG:
-        if key in raw:
-            config[key] = raw[key]
+        value = raw.get(key)
+        if key in _INT_KEYS:
+            valid = isinstance(value, int) and not isinstance(value, bool) and value > 0
+        elif key in _BOOL_KEYS:
+            valid = isinstance(value, bool)
+        elif key in _MIX_KEYS and isinstance(value, list):
+            valid = bool(value) and all(isinstance(item, str) and item != "" for item in value)
+        else:
+            valid = isinstance(value, str) and value != ""
+        if valid:
+            config[key] = value
     return config
 
 
+def _stamp(st: os.stat_result) -> tuple[int, int, int]:
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _read_snapshot(stamp: tuple[int, int, int]) -> dict[str, Any] | None:
+    """Return the snapshot config if it was compiled from this exact file."""
+    try:
+        version, snap_stamp, config = marshal.loads(state_file(SNAPSHOT_FILE).read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != SNAPSHOT_VERSION or tuple(snap_stamp) != stamp or not isinstance(config, dict):
+        return None
+    return config
+
+
+def _write_snapshot(stamp: tuple[int, int, int], config: dict[str, Any]) -> None:
+    path = state_file(SNAPSHOT_FILE)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_bytes(marshal.dumps((SNAPSHOT_VERSION, stamp, config)))
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)  # The snapshot is an optimisation only
+
+
+def _write_config_file(text: str) -> tuple[int, int, int]:
+    """Atomically replace config.toml and return its new stamp."""
+    path = state_file(CONFIG_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+    return _stamp(path.stat())
+
+
+def load_config() -> dict[str, Any]:
+    """Load config from ~/.dev-tip/config.toml, creating it if missing."""
+    path = state_file(CONFIG_FILE)
+    try:
+        stamp = _stamp(path.stat())
+    except FileNotFoundError:
+        config = dict(DEFAULT_CONFIG)
+        _write_snapshot(_write_config_file(_TEMPLATE), config)
+        return dict(config)
+
+    config = _read_snapshot(stamp)
+    if config is None:
+        import tomllib
+
+        with open(path, "rb") as f:
+            config = _validate(tomllib.load(f))
+        _write_snapshot(stamp, config)
+    return dict(config)
+
+
 def _format_value(key: str, value: Any) -> str:
     """Format a config key-value pair for TOML output."""
     if isinstance(value, bool):
         return f'{key} = {"true" if value else "false"}'
     if isinstance(value, int):
         return f"{key} = {value}"
+    if isinstance(value, list):
+        items = ", ".join(f'"{item}"' for item in value)
+        return f"{key} = [{items}]"
     return f'{key} = "{value}"'
 
 
@@ -71,28 +168,27 @@ def save_config(updates: dict[str, Any]) -> None:
     config = load_config()
     config.update(updates)
 
-    if CONFIG_FILE.exists():
-        lines = CONFIG_FILE.read_text().splitlines()
+    path = state_file(CONFIG_FILE)
+    if path.exists():
+        lines = path.read_text().splitlines()
     else:
-        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
         lines = _TEMPLATE.splitlines()
 
     # Update existing keys or uncomment commented keys
     written_keys: set[str] = set()
     for i, line in enumerate(lines):
-        stripped = line.lstrip("# ").strip()
-        for key, value in config.items():
-            if value is None:
-                continue
-            if stripped.startswith(f"{key} =") or stripped.startswith(f"{key}="):
-                lines[i] = _format_value(key, value)
-                written_keys.add(key)
-                break
+        match = _KEY_LINE.match(line)
+        if match is None:
+            continue
+        key = match.group(1)
+        if config.get(key) is not None:
+            lines[i] = _format_value(key, config[key])
+            written_keys.add(key)
 
     # Append any keys not found in existing lines
     for key, value in config.items():
         if value is not None and key not in written_keys:
             lines.append(_format_value(key, value))
 
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    CONFIG_FILE.write_text("\n".join(lines) + "\n")
+    stamp = _write_config_file("\n".join(lines) + "\n")
+    _write_snapshot(stamp, _validate(config))
@@ -0,0 +1,118 @@
+"""Map the last shell command to a tip topic.
+
+The shell hook passes the first words of the command the user just ran
+(``--context "sudo docker"``).  Command names are looked up in a character
+trie compiled once per process from the built-in rules plus the user's
+``context_commands`` setting, written like a mix: ``"k9s:kubernetes,tf*:terraform"``.
+A trailing ``*`` makes a rule match any command starting with that prefix;
+exact rules win over prefixes and longer prefixes over shorter ones.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+# Weight the detected topic gets in the topic mix; the rest keeps its proportions.
+CONTEXT_SHARE = 0.6
+
+# Words skipped to reach the actual command
+WRAPPERS = {"sudo", "doas", "time", "env", "nohup", "nice", "command", "exec", "builtin", "watch"}
+
+COMMAND_TOPICS = {
+    "git": "git", "gh": "git", "tig": "git", "lazygit": "git",
+    "kubectl": "kubernetes", "k": "kubernetes", "helm": "kubernetes", "k9s": "kubernetes",
+    "kubectx": "kubernetes", "kubens": "kubernetes", "minikube": "kubernetes", "kind": "kubernetes",
+    "kustomize": "kubernetes", "kubectl-*": "kubernetes",
+    "docker": "docker", "docker-*": "docker", "podman": "docker", "nerdctl": "docker",
+    "psql": "sql", "mysql": "sql", "sqlite3": "sql", "pg_*": "sql", "mariadb": "sql",
+    "python*": "python", "pip*": "python", "pytest": "python", "uv": "python", "poetry": "python",
+    "ipython": "python", "pyenv": "python", "mypy": "python", "ruff": "python",
+    "vim": "vim", "nvim": "vim", "vi": "vim", "gvim": "vim",
+    "node": "javascript", "npm": "javascript", "npx": "javascript", "yarn": "javascript",
+    "pnpm": "javascript", "bun": "javascript", "deno": "javascript", "tsc": "javascript",
+    "terraform": "terraform", "tf": "terraform", "tofu": "terraform", "terragrunt": "terraform",
+    "cargo": "rust", "rustc": "rust", "rustup": "rust",
+    "systemctl": "linux", "journalctl": "linux", "apt": "linux", "apt-get": "linux", "dnf": "linux",
+    "yum": "linux", "chmod": "linux", "chown": "linux", "grep": "linux", "find": "linux",
+    "awk": "linux", "sed": "linux", "ssh": "linux", "ps": "linux", "top": "linux", "htop": "linux",
+}
+
+_END = ""  # Trie key holding (topic, is_prefix_rule) for the word ending at that node
+
+
+def parse_rules(spec: str | None) -> dict[str, str]:
+    """Parse a ``command:topic,...`` spec into rules."""
+    rules = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        command, sep, topic = item.partition(":")
+        if not sep or not command.strip() or not topic.strip():
+            raise ValueError(f"Invalid context rule {item!r}")
+        rules[command.strip()] = topic.strip()
+    return rules
+
+
+def compile_trie(rules: dict[str, str]) -> dict:
+    """Compile command rules into a nested-dict character trie."""
+    root: dict = {}
+    for command, topic in rules.items():
+        prefix = command.endswith("*")
+        node = root
+        for char in command.rstrip("*"):
+            node = node.setdefault(char, {})
+        # A node can end both an exact and a prefix rule; keep both
+        node.setdefault(_END, {})[prefix] = topic
+    return root
+
+
+@lru_cache(maxsize=4)
+def _trie(user_spec: str | None) -> dict:
+    return compile_trie({**COMMAND_TOPICS, **parse_rules(user_spec)})
+
+
+def _command_name(context: str) -> str | None:
+    for word in context.split():
+        if "=" in word and not word.startswith("="):
+            continue  # FOO=bar assignment
+        if word in WRAPPERS or word.startswith("-"):
+            continue
+        return word.rsplit("/", 1)[-1]
+    return None
+
+
+def classify(context: str | None, user_spec: str | None = None) -> str | None:
+    """Return the topic for the last command, or None if it is not recognised."""
+    name = _command_name(context or "")
+    if not name:
+        return None
+    node = _trie(user_spec)
+    best = None
+    for char in name:
+        ends = node.get(_END)
+        if ends and True in ends:
+            best = ends[True]  # Longest prefix rule so far
+        node = node.get(char)
+        if node is None:
+            return best
+    ends = node.get(_END) or {}
+    return ends.get(False) or ends.get(True) or best
+
+
+def bias_mix(spec: str | None, topic: str | None, share: float = CONTEXT_SHARE) -> str | list[str] | None:
+    """Give ``topic`` ``share`` of a topic mix, keeping the rest in proportion.
+
+    The mix is returned unchanged if the topic is excluded by it, so an
+    explicit filter such as ``--topic python`` is never overridden.
+    """
+    from dev_tip.mix import WILDCARD, parse_mix
+
+    if not topic:
+        return spec
+    mix = dict(parse_mix(spec)) or {WILDCARD: 1.0}
+    if topic not in mix and WILDCARD not in mix:
+        return spec
+    others = {name: weight for name, weight in mix.items() if name != topic}
+    if not others:
+        return spec
+    total = sum(others.values())
+    entries = [f"{topic}:{share}"]
+    entries += [f"{name}:{weight / total * (1 - share)}" for name, weight in others.items()]
+    return entries
@@ -0,0 +1,166 @@
+"""Tips for many users or sessions in one pass (``dev-tip digest``).
+
+The tip store and the AI cache are loaded once.  After that, each target
+costs one history read and one append per tip.  A target is a state
+directory, such as a user's ~/.dev-tip, and None means the caller's own.
+Every target gets up to N tips it has not seen yet, drawn following the
+topic/level mixes the same way ``dev-tip`` does.  Once a target has seen
+every matching tip, its history starts over, as it would in the CLI.
+"""
+from __future__ import annotations
+
+import os
+import random
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from dev_tip.history import HISTORY_SEGMENTS, RESET, SEEN, _append_events, _load_history, _storable
+from dev_tip.mix import bucket_sampler
+from dev_tip.record import Tip
+from dev_tip.state import state_file, use_state_dir
+from dev_tip.statefile import RECOVERY_LOG
+from dev_tip.store import TipStore
+
+MAX_DRAWS = 8  # Weighted bucket draws per tip before scanning every matching bucket
+MAX_PROBES = 8  # Random probes inside a bucket before scanning it for an unseen tip
+
+
+@dataclass
+class Digest:
+    """The tips picked for one target."""
+
+    target: Path | None
+    tips: list[Tip] = field(default_factory=list)
+    error: str | None = None
+
+
+class Corpus:
+    """Static tips and cached AI tips, grouped by (topic, level) bucket.
+
+    Static tips stay in the memory-mapped store as indices; only the tips
+    that are picked get decoded.
+    """
+
+    def __init__(self, store: TipStore, ai_tips: Iterable[Tip] = ()) -> None:
+        self.store = store
+        self.buckets: dict[tuple[str, str], list[tuple[str, int | Tip]]] = {}
+        for topic, level, _ in store.buckets():
+            self.buckets[(topic, level)] = [(store.tip_id(i), i) for i in store.find(topic, level)]
+        known = {tip_id for refs in self.buckets.values() for tip_id, _ in refs}
+        for tip in ai_tips:
+            if tip.id not in known:
+                known.add(tip.id)
+                self.buckets.setdefault((str(tip.topic), str(tip.level)), []).append((tip.id, tip))
+        self.sizes = [(topic, level, len(refs)) for (topic, level), refs in self.buckets.items()]
+
+    def tip(self, ref: int | Tip) -> Tip:
+        return ref if isinstance(ref, Tip) else self.store.get(ref)
+
+
+def load_corpus(shared_dir: str | None = None) -> Corpus:
+    """Open the caller's tip store and read every cached AI tip."""
+    from dev_tip.ai.cache import load_cache
+    from dev_tip.store import open_store
+
+    return Corpus(open_store(), load_cache(None, None, shared_dir=shared_dir))
+
+
+def _unseen_in(refs: list, seen: set[str], rng: random.Random) -> tuple[str, int | Tip] | None:
+    for _ in range(min(MAX_PROBES, len(refs))):
+        ref = refs[rng.randrange(len(refs))]
+        if ref[0] not in seen:
+            return ref
+    unseen = [ref for ref in refs if ref[0] not in seen]
+    return rng.choice(unseen) if unseen else None
+
+
+def pick(
+    corpus: Corpus,
+    seen: list[str],
+    count: int,
+    topic: str | list[str] | None = None,
+    level: str | list[str] | None = None,
+    rng: random.Random | None = None,
+) -> tuple[list[tuple[str, int | Tip]], bool]:
+    """Pick up to ``count`` refs unseen in ``seen``; return (refs, history_was_reset)."""
+    rng = rng or random.Random()
+    sampler = bucket_sampler(corpus.sizes, topic, level)
+    if not sampler:
+        # Topic may only exist for AI: drop the topic filter, keep level
+        sampler = bucket_sampler(corpus.sizes, None, level)
+    if not sampler:
+        return [], False
+
+    excluded = set(seen)
+    picked: list[tuple[str, int | Tip]] = []
+    reset = False
+    while len(picked) < count:
+        ref = None
+        for _ in range(MAX_DRAWS):
+            ref = _unseen_in(corpus.buckets[sampler.sample(rng)], excluded, rng)
+            if ref is not None:
+                break
+        if ref is None:
+            everything = [r for bucket in sampler.buckets for r in corpus.buckets[bucket]]
+            ref = _unseen_in(everything, excluded, rng)
+        if ref is None:
+            if reset or not seen:
+                break  # Fewer matching tips than asked for
+            # Seen everything: start over, but not with the tips just picked
+            reset = True
+            excluded = {tip_id for tip_id, _ in picked} | ({seen[-1]} if seen else set())
+            continue
+        picked.append(ref)
+        excluded.add(ref[0])
+    return picked, reset
+
+
+def _hand_over(target: Path | None) -> None:
+    """Give history files created while running as root back to the target's owner."""
+    if target is None or os.geteuid() != 0:
+        return
+    owner = os.stat(target)
+    segments = state_file(HISTORY_SEGMENTS)
+    paths = [state_file(RECOVERY_LOG)]
+    if segments.is_dir():
+        paths += [segments, *segments.iterdir()]
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if (st.st_uid, st.st_gid) != (owner.st_uid, owner.st_gid):
+            os.chown(path, owner.st_uid, owner.st_gid)
+
+
+def digest(
+    corpus: Corpus,
+    targets: Iterable[Path | None],
+    count: int,
+    topic: str | list[str] | None = None,
+    level: str | list[str] | None = None,
+    mark: bool = True,
+    rng: random.Random | None = None,
+) -> Iterator[Digest]:
+    """Pick ``count`` tips for each target in turn, recording them as seen with ``mark``.
+
+    Results are yielded target by target so output can be streamed.  A
+    target whose state cannot be read or written yields an error instead.
+    Run as root, files created in a target are handed to the target's owner.
+    """
+    for target in targets:
+        try:
+            with use_state_dir(target):
+                seen = _load_history()
+                refs, reset = pick(corpus, seen, count, topic, level, rng)
+                if mark and refs:
+                    events = [(RESET, seen[-1])] if reset else []
+                    events += [(SEEN, tip_id) for tip_id, _ in refs if _storable(tip_id)]
+                    _append_events(events)
+                # Reading writes too: the legacy migration and the cached view
+                _hand_over(target)
+        except OSError as e:
+            yield Digest(target, error=f"{e.strerror or e}: {e.filename or target}")
+            continue
+        yield Digest(target, [corpus.tip(ref) for _, ref in refs])
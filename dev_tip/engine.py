@@ -0,0 +1,249 @@
+"""Embeddable tip engine for long-running processes.
+
+``TipEngine`` serves tips from one state directory (default ~/.dev-tip)
+without starting ``dev-tip`` for every tip, e.g. inside an editor plugin or
+a chat bot.  It keeps the config, the memory-mapped tip store and the AI
+provider between calls and reloads each only when its files change.
+Methods are thread-safe; to serve several users from one process, give each
+user an engine with its own state directory::
+
+    engine = TipEngine("/var/lib/tipbot/alice")
+    pick = engine.next_tip(topic="git")
+    if pick is not None and pick.refill:
+        engine.prefetch(pick.topic, pick.level, pick.unseen)  # e.g. from a worker thread
+
+The ``dev-tip`` command itself is a thin wrapper around a default engine.
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from dev_tip.config import CONFIG_FILE, load_config
+from dev_tip.history import _load_history, get_unseen
+from dev_tip.history import mark_seen as _mark_seen
+from dev_tip.metrics import incr
+from dev_tip.mix import bucket_sampler, choose
+from dev_tip.record import Tip
+from dev_tip.state import state_file, use_state_dir
+from dev_tip.store import TipStore, _fingerprint, _source_files, open_store
+
+MAX_DRAWS = 8  # Weighted draws before giving up on finding an unseen bucket
+
+
+@dataclass
+class Pick:
+    """A tip chosen by ``TipEngine.next_tip`` and how it was chosen."""
+
+    tip: Tip
+    source: str  # "ai" or "static"
+    topic: str | None  # The bucket the tip was drawn from
+    level: str | None
+    unseen: int = 0  # Unseen tips left in that bucket
+    everything_seen: bool = False  # Every matching static tip was seen; history was reset
+    refill: bool = False  # The AI cache for the bucket is running low: prefetch(topic, level)
+
+
+class TipEngine:
+    """Tips, history and AI cache of one state directory, kept warm in memory."""
+
+    def __init__(self, state_dir: str | Path | None = None, config: dict[str, Any] | None = None) -> None:
+        """``state_dir`` defaults to ~/.dev-tip; ``config`` overrides keys of its config.toml."""
+        self.state_dir = Path(state_dir).expanduser() if state_dir is not None else None
+        self._overrides = {k: v for k, v in (config or {}).items() if v is not None}
+        self._lock = threading.Lock()  # Guards the cached config, store and provider
+        self._pick_lock = threading.Lock()  # Held from choosing a tip until it is marked seen
+        self._config: dict[str, Any] | None = None
+        self._config_stamp: tuple[int, int] | None = None
+        self._store: TipStore | None = None
+        self._provider = None
+        self._provider_config: tuple | None = None
+
+    @contextmanager
+    def _active(self) -> Iterator[None]:
+        # Per thread: other engines' threads keep their own state directory
+        with use_state_dir(self.state_dir):
+            yield
+
+    @property
+    def config(self) -> dict[str, Any]:
+        """The merged config, re-read when config.toml changes."""
+        with self._active(), self._lock:
+            try:
+                st = os.stat(state_file(CONFIG_FILE))
+                stamp = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stamp = None
+            if self._config is None or stamp != self._config_stamp:
+                self._config = {**load_config(), **self._overrides}
+                self._config_stamp = stamp
+            return dict(self._config)
+
+    @property
+    def store(self) -> TipStore:
+        """The compiled tip store, reopened when the bundled tips or a pack changes."""
+        with self._active(), self._lock:
+            if self._store is not None and self._store.fingerprint != _fingerprint(_source_files()):
+                self._store = None  # Not closed: other threads may still be reading it
+            if self._store is None:
+                self._store = open_store()
+            return self._store
+
+    @property
+    def provider(self):
+        """The AI provider for the current config, or None without one."""
+        config = self.config
+        with self._active():
+            return self._provider_for(config)
+
+    def _provider_for(self, config: dict[str, Any]):
+        from dev_tip.ai import provider_for
+
+        key = tuple(config.get(k) for k in ("ai_provider", "ai_key", "ai_model", "ai_base_url"))
+        with self._lock:
+            if self._provider is None or key != self._provider_config:
+                self._provider = provider_for(config)
+                self._provider_config = key
+            return self._provider
+
+    def topics(self) -> set[str]:
+        """Topics of the static tips."""
+        return set(self.store.topics())
+
+    def _static_refs(
+        self, store: TipStore, topic: str | list[str] | None, level: str | None
+    ) -> tuple[list[dict], bool]:
+        """Draw a bucket following the topic/level mixes; return (refs, everything_seen).
+
+        Buckets whose tips have all been seen are redrawn a few times.  If that
+        fails, every matching tip is returned so history resets as usual.
+        """
+        sampler = bucket_sampler(store.buckets(), topic, level)
+        if not sampler:
+            return [], False
+
+        seen = set(_load_history())
+        for _ in range(MAX_DRAWS):
+            refs = [{"id": store.tip_id(i), "index": i} for i in store.find(*sampler.sample())]
+            if any(ref["id"] not in seen for ref in refs):
+                return refs, False
+
+        indices = [i for b_topic, b_level in sampler.buckets for i in store.find(b_topic, b_level)]
+        refs = [{"id": store.tip_id(i), "index": i} for i in indices]
+        return refs, all(ref["id"] in seen for ref in refs)
+
+    def next_tip(
+        self,
+        topic: str | None = None,
+        level: str | None = None,
+        context: str | None = None,
+        mark: bool = True,
+    ) -> Pick | None:
+        """Choose a tip the user has not seen yet; None if nothing matches.
+
+        ``topic`` and ``level`` are names or weighted mixes and default to
+        the config; ``context`` is the last shell command, which favours
+        tips on its topic.  With ``mark`` the tip is recorded as seen.
+        Raises ValueError for an invalid mix.
+        """
+        from dev_tip.mix import parse_mix
+
+        config = self.config
+        with self._active():
+            topic = topic or config.get("topic")
+            level = level or config.get("level")
+            parse_mix(topic)
+            parse_mix(level)
+
+            mix_topic = topic
+            if context:
+                from dev_tip.context import bias_mix, classify
+
+                try:
+                    mix_topic = bias_mix(topic, classify(context, config.get("context_commands")))
+                except ValueError:
+                    pass  # A broken context_commands rule must not break the prompt
+
+            # Two threads must not both pick, then both mark, the same unseen tip
+            with self._pick_lock:
+                pick = None
+                if config.get("ai_provider"):
+                    pick = self._ai_pick(mix_topic, level, config)
+                if pick is None:
+                    pick = self._static_pick(mix_topic, level)
+                if pick is not None and mark:
+                    _mark_seen(pick.tip["id"])
+            return pick
+
+    def _ai_pick(self, topic: str | list[str] | None, level: str | None, config: dict) -> Pick | None:
+        from dev_tip.ai import get_ai_tip
+        from dev_tip.ai.cache import cache_needs_refill
+
+        # AI tips are cached per (topic, level), so draw one bucket from the mixes
+        ai_topic, ai_level = choose(topic), choose(level)
+        # The provider is only needed (and created) when the cache has nothing unseen
+        tip, unseen = get_ai_tip(ai_topic, ai_level, config, get_provider=lambda: self._provider_for(config))
+        if tip is None:
+            return None
+        incr("tips_served", {"source": "ai"})
+        refill = cache_needs_refill(ai_topic, ai_level, unseen, shared_dir=config.get("shared_cache_dir"))
+        return Pick(tip, "ai", ai_topic, ai_level, unseen=unseen - 1, refill=refill)
+
+    def _static_pick(self, topic: str | list[str] | None, level: str | None) -> Pick | None:
+        store = self.store
+        # Only ids are decoded for history filtering; the chosen tip is decoded in full.
+        refs, everything_seen = self._static_refs(store, topic, level)
+        if not refs:
+            # Topic may only exist for AI — drop topic filter, keep level
+            refs, everything_seen = self._static_refs(store, None, level)
+        if not refs:
+            return None
+
+        unseen = get_unseen(refs)
+        tip = store.get(random.choice(unseen)["index"])
+        incr("tips_served", {"source": "static"})
+        return Pick(tip, "static", tip["topic"], tip["level"], unseen=len(unseen) - 1, everything_seen=everything_seen)
+
+    def mark_seen(self, tip_id: str) -> None:
+        """Record a tip as seen (``next_tip`` does this unless ``mark=False``)."""
+        with self._active(), self._pick_lock:
+            _mark_seen(tip_id)
+
+    def prefetch(self, topic: str | None = None, level: str | None = None, unseen: int = 0) -> int:
+        """Queue a refill of the AI cache and work through the queue now; return how many tips were new.
+
+        Goes through the same queue as ``dev-tip``, so a key already queued
+        is not fetched twice.  ``unseen`` is how many unseen tips the key has
+        left (``Pick.unseen``).  Runs in the calling thread, so call it from a
+        worker thread to keep serving tips meanwhile.  Does nothing without an
+        AI provider or during the failure cooldown, and leaves the refill to
+        the worker that holds the lock, if another does.
+        """
+        from dev_tip.prefetch import drain, enqueue
+
+        config = self.config
+        with self._active():
+            provider = self._provider_for(config)
+            if provider is None:
+                return 0
+            enqueue(topic, level, unseen, config.get("shared_cache_dir"))
+            return drain(config, provider=provider)
+
+    def close(self) -> None:
+        """Release the memory-mapped store."""
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+
+    def __enter__(self) -> TipEngine:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
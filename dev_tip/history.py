@@ -1,23 +1,328 @@
+"""Seen-tip history, stored as per-host append-only segments.
+
+Home directories shared over NFS are written by many hosts at once, so each
+host appends to its own ``history.d/<host>.log`` and no shared file is ever
+rewritten by ``mark_seen``.  A line is ``<time_ns>\\t<op>\\t<tip id>``: ``+``
+marks a tip seen, ``!`` resets the history keeping only the given tip.
+
+Readers replay every segment in time order.  The merged result is cached per
+host in ``history.d/.<host>.view`` and, while segments only grow, extended
+from their new tails instead of re-read; a tail event stamped before the
+newest one in the view is replayed from scratch.  Once this host's segment passes
+COMPACT_BYTES it is folded, together with segments idle for STALE_SECONDS,
+into ``_base.log``, dropping lines that a later reset made irrelevant.
+"""
 from __future__ import annotations
 
-import json
+import fcntl
+import marshal
+import os
+import re
+import socket
+import threading
+import time
 from pathlib import Path
 
+from dev_tip.state import state_file
+
 HISTORY_DIR = Path.home() / ".dev-tip"
-HISTORY_FILE = HISTORY_DIR / "history.json"
+HISTORY_FILE = HISTORY_DIR / "history.json"  # Single-file format, migrated on first use
+HISTORY_SEGMENTS = HISTORY_DIR / "history.d"
+HOST = re.sub(r"[^A-Za-z0-9.-]", "_", socket.gethostname()) or "localhost"
+
+BASE_SEGMENT = "_base.log"
+COMPACT_BYTES = 32 * 1024
+STALE_SECONDS = 7 * 24 * 3600
+VIEW_SLACK = 4096  # Unsaved tail bytes a reader re-reads rather than rewrite the view
+VIEW_VERSION = 2
+_QUOTED_RE = re.compile(r'"([^"\\\t\n]*)"')  # Tip ids in a damaged history.json
+
+SEEN = "+"
+RESET = "!"
+
+
+def _segments() -> Path:
+    return state_file(HISTORY_SEGMENTS)
+
+
+def _segment_path() -> Path:
+    return _segments() / f"{HOST}.log"
+
+
+def _view_path() -> Path:
+    return _segments() / f".{HOST}.view"
+
+
+def _stamps() -> dict[str, tuple[int, int, int]] | None:
+    """(inode, size, mtime_ns) of every segment, or None without a segment directory."""
+    stamps = {}
+    try:
+        entries = list(os.scandir(_segments()))
+    except OSError:
+        return None
+    for entry in entries:
+        if entry.name.endswith(".log") and not entry.name.startswith("."):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            stamps[entry.name] = (st.st_ino, st.st_size, st.st_mtime_ns)
+    return stamps
+
+
+def _parse(data: bytes) -> tuple[list[tuple[int, str, str]], int]:
+    """Parse complete lines; return (events, bytes consumed)."""
+    end = data.rfind(b"\n") + 1  # A torn last line is read again once it is complete
+    events = []
+    for line in data[:end].decode(errors="replace").split("\n"):
+        parts = line.split("\t")
+        if len(parts) == 3 and parts[1] in (SEEN, RESET) and parts[0].isdigit():
+            events.append((int(parts[0]), parts[1], parts[2]))
+    return events, end
+
+
+def _replay(seen: list[str], events: list[tuple[int, str, str]]) -> list[str]:
+    present = set(seen)
+    for _, op, tip_id in sorted(events, key=lambda event: event[0]):
+        if op == SEEN:
+            if tip_id not in present:
+                present.add(tip_id)
+                seen.append(tip_id)
+        else:
+            seen = [tip_id] if tip_id else []
+            present = set(seen)
+    return seen
+
+
+def _read_from(name: str, offset: int) -> tuple[list[tuple[int, str, str]], int]:
+    try:
+        with open(_segments() / name, "rb") as f:
+            f.seek(offset)
+            events, consumed = _parse(f.read())
+    except OSError:
+        return [], offset
+    return events, offset + consumed
+
+
+def _read_tails(stamps: dict, offsets: dict) -> tuple[list[tuple[int, str, str]], dict[str, int]]:
+    """Events appended to the segments since ``offsets``, and the new read offsets."""
+    events = []
+    read = dict(offsets["read"])
+    for name in stamps:
+        if stamps[name] == offsets["stamps"].get(name):
+            continue
+        new_events, read[name] = _read_from(name, read.get(name, 0))
+        events.extend(new_events)
+    return events, read
+
+
+def _read_view() -> tuple[dict, list[str]] | None:
+    try:
+        version, offsets, seen = marshal.loads(_view_path().read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != VIEW_VERSION or not isinstance(offsets, dict) or not isinstance(seen, list):
+        return None
+    if not isinstance(offsets.get("stamps"), dict) or not isinstance(offsets.get("read"), dict):
+        return None  # A damaged view is rebuilt from the segments
+    if not isinstance(offsets.get("newest"), int):
+        return None
+    return offsets, seen
+
+
+def _write_view(offsets: dict, seen: list[str]) -> None:
+    try:
+        path = _view_path()
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(marshal.dumps((VIEW_VERSION, offsets, seen)))
+        os.replace(tmp, path)
+    except OSError:
+        pass  # Only a cache
+
+
+def _migrate_legacy() -> None:
+    """Turn a history.json from before segments into the base segment.
+
+    A damaged file keeps the ids still readable in it and is moved aside as
+    ``history.json.corrupt-<time>``.
+    """
+    from dev_tip import codec
+
+    legacy = state_file(HISTORY_FILE)
+    try:
+        data = legacy.read_bytes()
+    except FileNotFoundError:
+        return
+    except OSError:
+        data = b""
+    damage = None
+    try:
+        seen = codec.loads(data)
+        if not isinstance(seen, list):
+            raise ValueError("not a list")
+    except ValueError as e:
+        damage = f"invalid JSON ({e})"
+        seen = _QUOTED_RE.findall(data.decode(errors="replace"))
+    segments = _segments()
+    segments.mkdir(parents=True, exist_ok=True)
+    with open(segments / ".compact.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not legacy.exists():
+            return  # Another host migrated it meanwhile
+        # Timestamps 1..n keep the order and sort before anything recorded since
+        lines = "".join(f"{n}\t{SEEN}\t{tip_id}\n" for n, tip_id in enumerate(seen, 1) if _storable(tip_id))
+        with open(segments / BASE_SEGMENT, "a") as base:
+            base.write(lines)
+        if damage is None:
+            legacy.unlink()
+            return
+        from dev_tip import statefile
+
+        quarantined = statefile.quarantine_path(legacy)
+        os.replace(legacy, quarantined)
+    statefile.log_recovery(legacy, damage, f"salvaged {len(seen)} tips", quarantined)
 
 
 def _load_history() -> list[str]:
-    """Load the list of seen tip IDs from disk."""
-    if not HISTORY_FILE.exists():
-        return []
-    return json.loads(HISTORY_FILE.read_text())
+    """Return seen tip IDs, oldest first, merged from every host's segment."""
+    stamps = _stamps()
+    if stamps is None:
+        _migrate_legacy()
+        stamps = _stamps() or {}
+    view = _read_view()
+    if view is not None:
+        offsets, seen = view
+        cached = offsets.get("stamps", {})
+        if cached == stamps:
+            return seen
+        # Reuse the view only if every known segment is still there and merely grew
+        if not all(
+            name in stamps and stamps[name][0] == ino and stamps[name][1] >= size
+            for name, (ino, size, _) in cached.items()
+        ):
+            view = None
+    if view is None:
+        offsets, seen = {"stamps": {}, "read": {}, "newest": 0}, []
+
+    events, read = _read_tails(stamps, offsets)
+    if view is not None and any(event[0] < offsets["newest"] for event in events):
+        # Written late or stamped by a skewed clock: it must replay in time order, not after the view
+        view, offsets, seen = None, {"stamps": {}, "read": {}, "newest": 0}, []
+        events, read = _read_tails(stamps, offsets)
+    merged = _replay(list(seen), events)
+    newest = max([offsets["newest"]] + [event[0] for event in events])
+    # Saving the view costs two round trips on NFS; small tails are cheaper to re-read
+    if view is None or sum(read.values()) - sum(offsets["read"].values()) > VIEW_SLACK:
+        _write_view({"stamps": stamps, "read": read, "newest": newest}, merged)
+    return merged
+
+
+def _storable(tip_id: object) -> bool:
+    return isinstance(tip_id, str) and "\t" not in tip_id and "\n" not in tip_id
+
 
+def _open_segment() -> int:
+    try:
+        return os.open(_segment_path(), os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+    except FileNotFoundError:
+        if state_file(HISTORY_FILE).exists():
+            _migrate_legacy()  # Keep the old history ahead of the first new mark
+        _segments().mkdir(parents=True, exist_ok=True)
+        return os.open(_segment_path(), os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
 
-def _save_history(seen: list[str]) -> None:
-    """Save the list of seen tip IDs to disk."""
-    HISTORY_DIR.mkdir(parents=True, exist_ok=True)
-    HISTORY_FILE.write_text(json.dumps(seen))
+
+def _append(op: str, tip_id: str) -> None:
+    _append_events([(op, tip_id)])
+
+
+def _append_events(events: list[tuple[str, str]]) -> None:
+    """Append events to this host's segment in one write, compacting it when it gets big."""
+    now = time.time_ns()  # Consecutive stamps keep the events in order when replayed
+    line = "".join(f"{now + n}\t{op}\t{tip_id}\n" for n, (op, tip_id) in enumerate(events)).encode()
+    for _ in range(3):
+        fd = _open_segment()
+        try:
+            # Shared lock: compaction holds it exclusively while folding the segment
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            st = os.fstat(fd)
+            if st.st_nlink == 0:
+                continue  # Folded away between open and lock; use a fresh segment
+            # End a line torn by a crash or a full disk, so it does not swallow ours
+            torn = st.st_size and os.pread(fd, 1, st.st_size - 1) != b"\n"
+            os.write(fd, b"\n" + line if torn else line)
+            size = os.lseek(fd, 0, os.SEEK_CUR)
+            break
+        finally:
+            os.close(fd)
+    else:
+        return
+    if size > COMPACT_BYTES:
+        try:
+            compact()
+        except OSError:
+            pass  # Compaction is housekeeping; the next append tries again
+
+
+def compact(stale_seconds: float = STALE_SECONDS) -> int:
+    """Fold this host's segment and idle ones into the base; return segments folded.
+
+    Everything before the last reset (across all segments) is dropped, as are
+    repeated marks of the same tip.  Skipped if another host is compacting.
+    """
+    segments = _segments()
+    segments.mkdir(parents=True, exist_ok=True)
+    with open(segments / ".compact.lock", "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+
+        now = time.time_ns()
+        stamps = _stamps() or {}
+        own = _segment_path().name
+        fold = [
+            name for name, (_, _, mtime) in stamps.items()
+            if name in (BASE_SEGMENT, own) or now - mtime > stale_seconds * 1e9
+        ]
+        if not any(name != BASE_SEGMENT for name in fold):
+            return 0
+
+        held = []
+        try:
+            folded: list[tuple[int, str, str]] = []
+            for name in fold:
+                try:
+                    f = open(segments / name, "rb")
+                except FileNotFoundError:
+                    continue
+                held.append((name, f))
+                fcntl.flock(f, fcntl.LOCK_EX)  # Wait for appends already in flight
+                folded.extend(_parse(f.read())[0])
+            others = [event for name in stamps if name not in fold for event in _read_from(name, 0)[0]]
+
+            resets = [event[0] for event in folded + others if event[1] == RESET]
+            cutoff = max(resets, default=0)
+            kept, marked = [], set()
+            for event in sorted(folded, key=lambda event: event[0]):
+                if event[0] < cutoff:
+                    continue
+                if event[1] == SEEN:
+                    if event[2] in marked:
+                        continue
+                    marked.add(event[2])
+                kept.append(event)
+
+            base = segments / BASE_SEGMENT
+            tmp = base.with_name(f".{base.name}.{os.getpid()}.tmp")
+            tmp.write_text("".join(f"{ts}\t{op}\t{tip_id}\n" for ts, op, tip_id in kept))
+            os.replace(tmp, base)
+            for name, _ in held:
+                if name != BASE_SEGMENT:
+                    (segments / name).unlink(missing_ok=True)
+        finally:
+            for _, f in held:
+                f.close()
+        return sum(1 for name, _ in held if name != BASE_SEGMENT)
 
 
 def get_unseen(tips: list[dict]) -> list[dict]:
@@ -27,7 +332,7 @@ def get_unseen(tips: list[dict]) -> list[dict]:
     unseen = [t for t in tips if t["id"] not in seen_set]
     if not unseen:
         # Keep only the most recent tip so it won't repeat immediately.
-        _save_history(seen[-1:])
+        _append(RESET, seen[-1] if seen else "")
         return [t for t in tips if t["id"] != seen[-1]] if seen else tips
     return unseen
 
@@ -39,8 +344,6 @@ def all_seen(tips: list[dict]) -> bool:
 
 
 def mark_seen(tip_id: str) -> None:
-    """Append a tip ID to the history file."""
-    seen = _load_history()
-    if tip_id not in seen:
-        seen.append(tip_id)
-        _save_history(seen)
+    """Record a tip ID as seen; repeats are ignored when the history is read."""
+    if _storable(tip_id):
+        _append(SEEN, tip_id)
@@ -1,9 +1,8 @@
 from __future__ import annotations
 
-import subprocess
-import sys
+import shlex
 from pathlib import Path
-from textwrap import dedent
+from textwrap import dedent, indent
 
 from rich.console import Console
 
@@ -12,6 +11,7 @@ from dev_tip.config import CONFIG_DIR, DEFAULT_CONFIG
 HOOK_MARKER_START = "# >>> dev-tip hook >>>"
 HOOK_MARKER_END = "# <<< dev-tip hook <<<"
 PAUSE_FILE = CONFIG_DIR / ".paused"
+SCHEDULE_FILE = CONFIG_DIR / ".schedule"  # Last tip and commands since, shared by all shells
 
 console = Console()
 
@@ -43,39 +43,113 @@ def _build_hook_command(
     """Build the dev-tip command for the shell hook."""
     parts = ["dev-tip"]
     if provider:
-        parts.append(f"--provider {provider}")
+        parts.append(f"--provider {shlex.quote(provider)}")
     if topic:
-        parts.append(f"--topic {topic}")
+        parts.append(f"--topic {shlex.quote(topic)}")  # Mixes such as "python:60,*:40" contain globs
     if level:
-        parts.append(f"--level {level}")
+        parts.append(f"--level {shlex.quote(level)}")
     if quiet:
         parts.append("--quiet")
     return " ".join(parts)
 
 
+def _shared_schedule_check(every_commands: int, every_minutes: int) -> str:
+    """Shell code that counts a command in the user-wide schedule and returns unless a tip is due.
+
+    The file holds the epoch of the last tip on its first line and then one
+    "x" per command since.  Appending a byte is atomic and about five times
+    cheaper than rewriting the file, and an idle prompt forks nothing.  A
+    missing, garbled or half-written file restarts the schedule instead of
+    triggering, so racing shells can skip a tip but not add one.
+    """
+    path = shlex.quote(str(SCHEDULE_FILE))
+    return dedent(f"""\
+        local _dt_s= _dt_now=${{EPOCHSECONDS:-$(date +%s)}}
+        IFS= read -r -d '' _dt_s 2>/dev/null < {path}
+        local _dt_last=${{_dt_s%%$'\\n'*}} _dt_count=${{_dt_s#*$'\\n'}}
+        if [[ -z $_dt_last || $_dt_last == *[!0-9]* || $_dt_last == "$_dt_s" ]]; then
+            echo "$_dt_now" 2>/dev/null > {path}
+            return
+        fi
+        if (( ${{#_dt_count}} + 1 < {every_commands} && _dt_now - _dt_last < {every_minutes * 60} )); then
+            echo -n x 2>/dev/null >> {path}
+            return
+        fi
+        echo "$_dt_now" 2>/dev/null > {path}""")
+
+
 def _build_hook_block(
     shell: str,
     cmd: str,
     every_commands: int,
     every_minutes: int,
+    shared_schedule: bool = False,
 ) -> str:
-    """Wrap the dev-tip command in a periodic shell function."""
+    """Wrap the dev-tip command in a periodic shell function.
+
+    Only the first two words of the last command are passed on, as
+    ``--context``, so tips can follow what the user is working on.  With
+    ``shared_schedule`` the counts and the timer are kept in SCHEDULE_FILE
+    for all of the user's shells together instead of per shell.
+    """
     pause_path = PAUSE_FILE
+    if shared_schedule:
+        # Spliced in after dedent(), which a multi-line f-string value would defeat
+        check = indent(_shared_schedule_check(every_commands, every_minutes), " " * 4)
+        if shell == "zsh":
+            return dedent(f"""\
+                {HOOK_MARKER_START}
+                zmodload zsh/datetime 2>/dev/null
+                _DEV_TIP_LAST_CMD=
+                _dev_tip_preexec() {{
+                    _DEV_TIP_LAST_CMD=$1
+                }}
+                _dev_tip_precmd() {{
+                    [ -f {pause_path} ] && return
+                {{check}}
+                    local _dt_w1= _dt_w2=
+                    read -r _dt_w1 _dt_w2 _ <<< "$_DEV_TIP_LAST_CMD"
+                    {cmd} --context "$_dt_w1 $_dt_w2" 2>/dev/null
+                }}
+                autoload -Uz add-zsh-hook
+                add-zsh-hook preexec _dev_tip_preexec
+                add-zsh-hook precmd _dev_tip_precmd
+                {HOOK_MARKER_END}
+            """).replace("{check}\n", check + "\n")
+        return dedent(f"""\
+            {HOOK_MARKER_START}
+            _dev_tip_prompt() {{
+                [ -f {pause_path} ] && return
+            {{check}}
+                local _dt_w1= _dt_w2=
+                read -r _dt_w1 _dt_w2 _ <<< "$(fc -ln -1 2>/dev/null)"
+                {cmd} --context "$_dt_w1 $_dt_w2" 2>/dev/null
+            }}
+            PROMPT_COMMAND="_dev_tip_prompt${{PROMPT_COMMAND:+;$PROMPT_COMMAND}}"
+            {HOOK_MARKER_END}
+        """).replace("{check}\n", check + "\n")
     if shell == "zsh":
         return dedent(f"""\
             {HOOK_MARKER_START}
             _DEV_TIP_CMD_COUNT={every_commands}
             _DEV_TIP_LAST_SEC=$SECONDS
+            _DEV_TIP_LAST_CMD=
+            _dev_tip_preexec() {{
+                _DEV_TIP_LAST_CMD=$1
+            }}
             _dev_tip_precmd() {{
                 [ -f {pause_path} ] && return
                 _DEV_TIP_CMD_COUNT=$((_DEV_TIP_CMD_COUNT + 1))
                 if (( _DEV_TIP_CMD_COUNT >= {every_commands} || (SECONDS - _DEV_TIP_LAST_SEC) / 60 >= {every_minutes} )); then
-                    {cmd} 2>/dev/null
+                    local _dt_w1= _dt_w2=
+                    read -r _dt_w1 _dt_w2 _ <<< "$_DEV_TIP_LAST_CMD"
+                    {cmd} --context "$_dt_w1 $_dt_w2" 2>/dev/null
                     _DEV_TIP_CMD_COUNT=0
                     _DEV_TIP_LAST_SEC=$SECONDS
                 fi
             }}
             autoload -Uz add-zsh-hook
+            add-zsh-hook preexec _dev_tip_preexec
             add-zsh-hook precmd _dev_tip_precmd
             {HOOK_MARKER_END}
         """)
@@ -88,7 +162,9 @@ def _build_hook_block(
             [ -f {pause_path} ] && return
             _DEV_TIP_CMD_COUNT=$((_DEV_TIP_CMD_COUNT + 1))
             if (( _DEV_TIP_CMD_COUNT >= {every_commands} || (SECONDS - _DEV_TIP_LAST_SEC) / 60 >= {every_minutes} )); then
-                {cmd} 2>/dev/null
+                local _dt_w1= _dt_w2=
+                read -r _dt_w1 _dt_w2 _ <<< "$(fc -ln -1 2>/dev/null)"
+                {cmd} --context "$_dt_w1 $_dt_w2" 2>/dev/null
                 _DEV_TIP_CMD_COUNT=0
                 _DEV_TIP_LAST_SEC=$SECONDS
             fi
@@ -106,12 +182,20 @@ def enable(
     every_commands: int | None = None,
     every_minutes: int | None = None,
     quiet: bool = False,
+    shared_schedule: bool | None = None,
 ) -> None:
-    """Install the shell hook into the user's rc file."""
-    from dev_tip.config import save_config
+    """Install the shell hook into the user's rc file.
+
+    ``shared_schedule`` None keeps the schedule mode saved in the config.
+    """
+    from dev_tip.ai import provider_for
+    from dev_tip.config import load_config, save_config
+    from dev_tip.prefetch import spawn
 
     every_commands = every_commands or DEFAULT_CONFIG["every_commands"]
     every_minutes = every_minutes or DEFAULT_CONFIG["every_minutes"]
+    if shared_schedule is None:
+        shared_schedule = load_config()["shared_schedule"]
 
     # Save config if anything provided
     updates: dict = {}
@@ -127,23 +211,17 @@ def enable(
     updates["every_minutes"] = every_minutes
     if quiet:
         updates["quiet"] = True
+    updates["shared_schedule"] = shared_schedule
     save_config(updates)
+    if shared_schedule:
+        SCHEDULE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        SCHEDULE_FILE.write_text("0\n")  # Due at once: the next prompt in any shell shows a tip
 
-    # Pre-cache AI tips so the first shell prompt is instant
-    if provider and key:
-        topic_arg = str(topic) if topic is not None else "null"
-        level_arg = str(level) if level is not None else "null"
-        try:
-            subprocess.Popen(
-                [sys.executable, "-m", "dev_tip.prefetch", topic_arg, level_arg],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                stdin=subprocess.DEVNULL,
-                start_new_session=True,
-            )
-            console.print("[dim]Pre-caching AI tips in the background...[/dim]")
-        except OSError:
-            pass
+    # Pre-cache AI tips so the first shell prompt is instant; keyless providers need no key
+    config = load_config()
+    ai_provider = provider_for(config)
+    if ai_provider is not None and spawn(topic, level, config, provider=ai_provider):
+        console.print("[dim]Pre-caching AI tips in the background...[/dim]")
 
     rc_file = _get_rc_file()
     shell = _detect_shell()
@@ -159,14 +237,14 @@ def enable(
         content = ""
 
     cmd = _build_hook_command(provider, topic, level, quiet=quiet)
-    hook_block = _build_hook_block(shell, cmd, every_commands, every_minutes)
+    hook_block = _build_hook_block(shell, cmd, every_commands, every_minutes, shared_schedule)
     content = content.rstrip() + "\n\n" + hook_block
     rc_file.write_text(content)
 
     console.print(f"[green]Hook installed in {rc_file}[/green]")
     console.print(
         f"Tips will appear every {every_commands} commands "
-        f"or {every_minutes} minutes."
+        f"or {every_minutes} minutes{' across all your shells' if shared_schedule else ''}."
     )
     console.print(f"Reload your shell: [bold]exec {shell}[/bold]")
 
@@ -188,5 +266,6 @@ def disable() -> None:
     end = content.index(HOOK_MARKER_END) + len(HOOK_MARKER_END)
     cleaned = content[:start].rstrip() + content[end:].lstrip("\n")
     rc_file.write_text(cleaned)
+    SCHEDULE_FILE.unlink(missing_ok=True)
 
     console.print(f"[green]Hook removed from {rc_file}[/green]")
@@ -0,0 +1,266 @@
+"""Persistent usage counters, exported as JSON or an OpenMetrics textfile.
+
+Recording is one O_APPEND write of a short line to ~/.dev-tip/metrics.log,
+so it stays on permanently.  The log is folded into the metrics.json
+snapshot when it grows past FOLD_BYTES and whenever metrics are read.
+Folding renames the log and drains it under an exclusive flock; writers
+hold a shared one and retry on the new log if theirs was folded away.
+"""
+from __future__ import annotations
+
+import fcntl
+import math
+import os
+import re
+from pathlib import Path
+
+from dev_tip.state import state_file
+
+METRICS_LOG = Path.home() / ".dev-tip" / "metrics.log"
+METRICS_FILE = Path.home() / ".dev-tip" / "metrics.json"
+FOLD_BYTES = 64 * 1024
+
+# Upper bounds (seconds) of the API latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Refills wait behind a running worker or a cooldown for minutes, not seconds
+QUEUE_WAIT_BUCKETS = (1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0, 14400.0)
+# Histograms with buckets of their own; the rest use LATENCY_BUCKETS
+BUCKETS = {"prefetch_wait_seconds": QUEUE_WAIT_BUCKETS}
+
+HELP = {
+    "tips_served": "Tips shown, by source.",
+    "ai_cache_lookups": "AI cache lookups, by result.",
+    "api_calls": "AI provider calls, by provider and outcome.",
+    "api_latency_seconds": "AI provider call latency.",
+    "parse_failures": "AI responses that could not be parsed.",
+    "ai_tips_generated": "AI tips generated, by provider and whether they were new or duplicates.",
+    "cooldown_activations": "Times the AI cooldown was started after a failure.",
+    "prefetch_spawns": "Background prefetches started.",
+    "prefetch_wait_seconds": "Time refills waited in the prefetch queue before their fetch started.",
+    "state_recoveries": "Corrupt state files recovered, by file.",
+    "state_bytes": "Bytes of dev-tip state on disk.",
+    "tips_seen": "Tips in the seen history.",
+    "ai_cache_tips": "Tips in the personal AI cache.",
+    "cooldown_active": "1 while the AI cooldown is active.",
+    "paused": "1 while tips are paused.",
+    "prefetch_queue_depth": "Refills waiting in the prefetch queue.",
+}
+
+
+# Label values are backslash-escaped in the log, where tab, newline, "," and "=" are separators
+_LOG_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", ",": "\\,", "=": "\\="})
+_LOG_LABEL_RE = re.compile(r"([^=,]+)=((?:\\.|[^\\,])*)")
+_LOG_ESCAPE_RE = re.compile(r"\\(.)")
+_LOG_UNESCAPES = {"t": "\t", "n": "\n"}
+_OPENMETRICS_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})
+
+
+def _labels(labels: dict[str, str] | None) -> str:
+    return ",".join(f"{k}={str(v).translate(_LOG_ESCAPES)}" for k, v in sorted((labels or {}).items()))
+
+
+def _parse_labels(labels: str) -> list[tuple[str, str]]:
+    """Label pairs of a log or snapshot key, unescaped."""
+    return [
+        (k, _LOG_ESCAPE_RE.sub(lambda m: _LOG_UNESCAPES.get(m[1], m[1]), v))
+        for k, v in _LOG_LABEL_RE.findall(labels)
+    ]
+
+
+def _append(line: str) -> None:
+    try:
+        log = state_file(METRICS_LOG)
+        log.parent.mkdir(parents=True, exist_ok=True)
+        for _ in range(3):
+            fd = os.open(log, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                # Shared lock: a fold holds it exclusively while draining the log
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                if os.fstat(fd).st_nlink == 0:
+                    continue  # Folded away between open and lock; use the new log
+                os.write(fd, line.encode())
+                size = os.lseek(fd, 0, os.SEEK_CUR)
+                break
+            finally:
+                os.close(fd)
+        else:
+            return
+        if size > FOLD_BYTES:
+            fold()
+    except OSError:
+        pass  # Metrics must never break showing a tip
+
+
+def incr(name: str, labels: dict[str, str] | None = None, value: float = 1) -> None:
+    """Add to a counter."""
+    _append(f"c\t{name}\t{_labels(labels)}\t{value}\n")
+
+
+def observe(name: str, value: float, labels: dict[str, str] | None = None) -> None:
+    """Record one histogram observation."""
+    _append(f"h\t{name}\t{_labels(labels)}\t{value}\n")
+
+
+def record_api_call(provider: str, seconds: float, error: BaseException | None = None) -> None:
+    """Count a provider call by outcome and record its latency."""
+    import urllib.error
+
+    if error is None:
+        outcome = "ok"
+    elif isinstance(error, ValueError):  # includes JSONDecodeError
+        outcome = "parse_error"
+        incr("parse_failures", {"provider": provider})
+    elif isinstance(error, urllib.error.HTTPError) and error.code == 429:
+        outcome = "rate_limited"
+    else:
+        outcome = "error"
+    incr("api_calls", {"provider": provider, "outcome": outcome})
+    observe("api_latency_seconds", seconds, {"provider": provider})
+
+
+def record_yield(provider: str, generated: int, new: int) -> None:
+    """Count the tips one provider call returned and how many were new."""
+    incr("ai_tips_generated", {"provider": provider, "result": "new"}, new)
+    incr("ai_tips_generated", {"provider": provider, "result": "duplicate"}, generated - new)
+
+
+def _empty() -> dict:
+    return {"counters": {}, "histograms": {}}
+
+
+def _load_snapshot() -> dict:
+    from dev_tip import statefile
+
+    try:
+        data = statefile.read(state_file(METRICS_FILE))
+    except (OSError, ValueError):
+        return _empty()
+    return data if isinstance(data, dict) and "counters" in data else _empty()
+
+
+def _apply(data: dict, line: str) -> None:
+    try:
+        kind, name, labels, raw = line.split("\t")
+        value = float(raw)
+    except ValueError:
+        return  # Torn or foreign line
+    if not math.isfinite(value):
+        return
+    if kind == "c":
+        series = data["counters"].setdefault(name, {})
+        series[labels] = series.get(labels, 0) + value
+    elif kind == "h":
+        bounds = list(BUCKETS.get(name, LATENCY_BUCKETS))
+        series = data["histograms"].setdefault(name, {})
+        hist = series.get(labels)
+        if hist is not None:
+            hist.setdefault("le", list(LATENCY_BUCKETS))  # Snapshots from before per-metric buckets
+        if hist is None or hist["le"] != bounds:
+            # New, or counted with other buckets, which cannot be re-bucketed
+            hist = series[labels] = {"le": bounds, "buckets": [0] * len(bounds), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+def fold() -> dict:
+    """Merge the append log into the snapshot and return the snapshot."""
+    snapshot, log_path = state_file(METRICS_FILE), state_file(METRICS_LOG)
+    snapshot.parent.mkdir(parents=True, exist_ok=True)
+    lock_path = snapshot.with_name(".metrics.lock")
+    with open(lock_path, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        data = _load_snapshot()
+        pending = log_path.with_name(f"{log_path.name}.{os.getpid()}.folding")
+        try:
+            os.replace(log_path, pending)
+        except FileNotFoundError:
+            return data
+        with open(pending, "rb") as log:
+            # Wait for writers that opened the log before the rename
+            fcntl.flock(log, fcntl.LOCK_EX)
+            for line in log.read().decode(errors="replace").splitlines():
+                _apply(data, line)
+
+            from dev_tip import statefile
+
+            statefile.write(snapshot, data)
+            pending.unlink()
+    return data
+
+
+def state_bytes(directory: Path) -> int:
+    """Total size of regular files directly inside the state directory."""
+    total = 0
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file(follow_symlinks=False):
+                total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    return total
+
+
+def collect(gauges: dict[str, float] | None = None) -> dict:
+    """Return every metric: folded counters and histograms plus the given gauges."""
+    try:
+        data = fold()
+    except OSError:
+        data = _load_snapshot()
+    data["gauges"] = dict(gauges or {})
+    data["latency_buckets"] = list(LATENCY_BUCKETS)
+    return data
+
+
+def _series(name: str, labels: str, le: str | None = None) -> str:
+    pairs = [f'{k}="{v.translate(_OPENMETRICS_ESCAPES)}"' for k, v in _parse_labels(labels)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return f"dev_tip_{name}{{{','.join(pairs)}}}" if pairs else f"dev_tip_{name}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def to_openmetrics(data: dict) -> str:
+    """Render collected metrics in the OpenMetrics text format."""
+    lines = []
+    for name, series in sorted(data["counters"].items()):
+        lines.append(f"# TYPE dev_tip_{name} counter")
+        if name in HELP:
+            lines.append(f"# HELP dev_tip_{name} {HELP[name]}")
+        for labels, value in sorted(series.items()):
+            lines.append(f"{_series(name + '_total', labels)} {_number(value)}")
+    for name, series in sorted(data["histograms"].items()):
+        lines.append(f"# TYPE dev_tip_{name} histogram")
+        if name in HELP:
+            lines.append(f"# HELP dev_tip_{name} {HELP[name]}")
+        for labels, hist in sorted(series.items()):
+            bucket = name + "_bucket"
+            for bound, count in zip(hist["le"], hist["buckets"]):
+                lines.append(f"{_series(bucket, labels, str(bound))} {count}")
+            lines.append(f"{_series(bucket, labels, '+Inf')} {hist['count']}")
+            lines.append(f"{_series(name + '_sum', labels)} {_number(hist['sum'])}")
+            lines.append(f"{_series(name + '_count', labels)} {hist['count']}")
+    for name, value in sorted(data.get("gauges", {}).items()):
+        lines.append(f"# TYPE dev_tip_{name} gauge")
+        if name in HELP:
+            lines.append(f"# HELP dev_tip_{name} {HELP[name]}")
+        lines.append(f"dev_tip_{name} {_number(value)}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str | Path, data: dict) -> None:
+    """Atomically write an OpenMetrics file for node_exporter's textfile collector."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(to_openmetrics(data))
+    os.replace(tmp, path)
@@ -0,0 +1,158 @@
+"""Weighted topic and level mixes, sampled in O(1) with Vose alias tables.
+
+A mix is written as comma-separated ``name[:weight]`` entries, e.g.
+``"python:60,kubernetes:30,*:10"``.  ``*`` stands for every name not listed
+explicitly and an entry without a weight counts 1, so a plain ``"python"``
+is a one-entry mix and ``"git,docker"`` is an even split.
+
+Selection happens per (topic, level) bucket: a bucket is drawn from an
+alias table and a tip is then picked uniformly inside it.  AI tips are
+generated and cached per bucket as before.  Tables depend only on the
+bucket sizes and the mix specs and are memoized on exactly those.
+"""
+from __future__ import annotations
+
+import math
+import random
+from functools import lru_cache
+
+WILDCARD = "*"
+
+Mix = tuple[tuple[str, float], ...]
+
+
+def parse_mix(spec: str | list[str] | None) -> Mix:
+    """Parse a mix spec into (name, weight) entries; empty means anything."""
+    if spec is None:
+        return ()
+    items = spec if isinstance(spec, list) else spec.split(",")
+    entries: dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in items)):
+        name, sep, weight_str = item.partition(":")
+        name = name.strip()
+        try:
+            weight = float(weight_str) if sep else 1.0
+        except ValueError:
+            raise ValueError(f"Invalid weight in mix entry {item!r}") from None
+        if not name or not math.isfinite(weight) or weight <= 0:
+            raise ValueError(f"Invalid mix entry {item!r}")
+        if name in entries:
+            raise ValueError(f"Duplicate mix entry {name!r}")
+        entries[name] = weight
+    return tuple(entries.items())
+
+
+def mix_names(spec: str | list[str] | None) -> list[str]:
+    """Return the names a mix lists explicitly (without the wildcard)."""
+    return [name for name, _ in parse_mix(spec) if name != WILDCARD]
+
+
+class AliasTable:
+    """Vose alias table: O(n) to build, O(1) to draw an index by weight."""
+
+    __slots__ = ("prob", "alias")
+
+    def __init__(self, weights: list[float]) -> None:
+        n = len(weights)
+        total = sum(weights)
+        if n == 0 or total <= 0:
+            raise ValueError("Alias table needs at least one positive weight")
+
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = g
+            scaled[g] -= 1.0 - scaled[s]
+            (small if scaled[g] < 1.0 else large).append(g)
+        for i in small + large:  # Leftovers are 1.0 up to rounding
+            self.prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.prob)
+
+    def sample(self, rng: random.Random | None = None) -> int:
+        source = rng or random  # The module functions share the global generator
+        i = source.randrange(len(self.prob))
+        return i if source.random() < self.prob[i] else self.alias[i]
+
+
+def _entry_for(name: str, mix: Mix) -> str | None:
+    """Return the mix entry covering a name, or None if it is excluded."""
+    if not mix:
+        return WILDCARD
+    names = dict(mix)
+    if name in names:
+        return name
+    return WILDCARD if WILDCARD in names else None
+
+
+class BucketSampler:
+    """Draw (topic, level) buckets so tips follow the topic and level mixes.
+
+    Each topic entry gets its share of the draws, split over levels by the
+    level mix; within one (topic entry, level entry) cell, buckets are
+    weighted by size so every tip in the cell is equally likely.  Cells
+    with no tips drop out and the remaining shares are renormalized.
+    """
+
+    def __init__(self, buckets: tuple[tuple[str, str, int], ...], topic_mix: Mix, level_mix: Mix) -> None:
+        topic_weights = dict(topic_mix) or {WILDCARD: 1.0}
+        level_weights = dict(level_mix) or {WILDCARD: 1.0}
+
+        cells: dict[tuple[str, str], int] = {}
+        covered = []
+        for topic, level, count in buckets:
+            cell = (_entry_for(topic, topic_mix), _entry_for(level, level_mix))
+            if None in cell or count <= 0:
+                continue
+            cells[cell] = cells.get(cell, 0) + count
+            covered.append((topic, level, count, cell))
+
+        self.buckets = [(topic, level) for topic, level, _, _ in covered]
+        self.sizes = [count for _, _, count, _ in covered]
+        weights = [
+            topic_weights[cell[0]] * level_weights[cell[1]] * count / cells[cell]
+            for _, _, count, cell in covered
+        ]
+        self.table = AliasTable(weights) if weights else None
+
+    def __bool__(self) -> bool:
+        return self.table is not None
+
+    def sample(self, rng: random.Random | None = None) -> tuple[str, str]:
+        if self.table is None:
+            raise ValueError("No tips match the mix")
+        return self.buckets[self.table.sample(rng)]
+
+
+@lru_cache(maxsize=16)
+def _bucket_sampler(buckets: tuple[tuple[str, str, int], ...], topic_mix: Mix, level_mix: Mix) -> BucketSampler:
+    return BucketSampler(buckets, topic_mix, level_mix)
+
+
+def bucket_sampler(
+    buckets: list[tuple[str, str, int]],
+    topic: str | list[str] | None,
+    level: str | list[str] | None,
+) -> BucketSampler:
+    """Return the (memoized) sampler for a corpus's buckets and the given mixes."""
+    return _bucket_sampler(tuple(buckets), parse_mix(topic), parse_mix(level))
+
+
+@lru_cache(maxsize=16)
+def _entry_table(mix: Mix) -> AliasTable:
+    return AliasTable([weight for _, weight in mix])
+
+
+def choose(spec: str | list[str] | None, rng: random.Random | None = None) -> str | None:
+    """Draw one entry of a mix by weight; None stands for "any" (wildcard or empty)."""
+    mix = parse_mix(spec)
+    if not mix:
+        return None
+    name = mix[_entry_table(mix).sample(rng)][0]
+    return None if name == WILDCARD else name
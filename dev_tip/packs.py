@@ -0,0 +1,186 @@
+"""Incremental, parallel compiler for the bundled tips and tip packs.
+
+Every source file (the feed overlay written by ``dev-tip update``, the bundled
+tips.yaml, then each pack in ~/.dev-tip/packs/) is parsed and validated on
+its own.  The result is cached in
+~/.dev-tip/packs.cache/ under a hash of the file's bytes, so after editing
+one pack only that pack is parsed again.  ``dev-tip packs build`` parses
+changed packs in a process pool; the compiled packs are merged in order
+(the first tip with a given id wins) into the memory-mapped store.
+
+A source is either a list of tips or a mapping ``{"tips": [...], "delete":
+[ids]}``; deleted ids are dropped from every source.
+"""
+from __future__ import annotations
+
+import hashlib
+import marshal
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from dev_tip.state import state_file
+
+PACK_CACHE_DIR = Path.home() / ".dev-tip" / "packs.cache"
+CACHE_VERSION = 2
+
+
+@dataclass
+class PackResult:
+    """Validated tips of one source file plus what was wrong with it."""
+
+    path: Path
+    tips: list[dict]
+    errors: list[str]
+    seconds: float = 0.0
+    cached: bool = False
+    # (id, file that already defines it) for tips dropped while merging
+    duplicates: list[tuple[str, str]] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+
+
+def _compile(data: bytes, bundled: bool) -> tuple[list[dict], list[str], list[str], float]:
+    """Parse and validate one source; runs in a worker process."""
+    import json
+
+    import yaml
+
+    from dev_tip.tips import VALID_TOPICS, validate_tips
+
+    start = time.perf_counter()
+    try:
+        raw = json.loads(data) if data.lstrip()[:1] == b"{" else None
+    except ValueError:
+        raw = None
+    if raw is None:
+        try:
+            # libyaml's loader is an order of magnitude faster when PyYAML was built with it
+            raw = yaml.load(data.decode(), Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+        except (yaml.YAMLError, UnicodeDecodeError) as e:
+            return [], [f"invalid YAML: {' '.join(str(e).split())}"], [], time.perf_counter() - start
+    deleted: list[str] = []
+    if isinstance(raw, dict) and "tips" in raw:
+        deleted = [tip_id for tip_id in raw.get("delete") or [] if isinstance(tip_id, str)]
+        raw = raw["tips"] or []
+    # New topics are fine in packs, but the bundled file must stick to the known ones
+    tips, errors = validate_tips(raw, VALID_TOPICS if bundled else None)
+    return tips, errors, deleted, time.perf_counter() - start
+
+
+def _digest(data: bytes, bundled: bool) -> str:
+    seed = f"v{CACHE_VERSION}:{int(bundled)}:".encode()
+    return hashlib.blake2b(seed + data, digest_size=16).hexdigest()
+
+
+def _read_cached(digest: str) -> tuple[list[dict], list[str], list[str]] | None:
+    try:
+        version, tips, errors, deleted = marshal.loads((state_file(PACK_CACHE_DIR) / f"{digest}.bin").read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return (tips, errors, deleted) if version == CACHE_VERSION else None
+
+
+def _write_cached(digest: str, tips: list[dict], errors: list[str], deleted: list[str]) -> None:
+    try:
+        cache_dir = state_file(PACK_CACHE_DIR)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        path = cache_dir / f"{digest}.bin"
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(marshal.dumps((CACHE_VERSION, tips, errors, deleted)))
+        os.replace(tmp, path)
+    except OSError:
+        pass  # The cache only saves time
+
+
+def _prune_cache(keep: set[str]) -> None:
+    """Remove compiled packs whose source no longer exists in that form."""
+    try:
+        entries = list(os.scandir(state_file(PACK_CACHE_DIR)))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.endswith(".bin") and entry.name[:-4] not in keep:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+
+def compile_packs(sources: list[Path], jobs: int | None = 1) -> list[PackResult]:
+    """Compile every source, reusing cached results for unchanged files.
+
+    Only the bundled tips file is held to the known topics.  ``jobs`` is the
+    number of worker processes for changed files (None: one per CPU, 1: no pool).
+    """
+    from dev_tip.tips import bundled_tips_path
+
+    bundled_path = bundled_tips_path()
+    results: list[PackResult] = []
+    pending: dict[int, tuple[str, bytes, bool]] = {}
+    digests: set[str] = set()
+    for n, path in enumerate(sources):
+        start = time.perf_counter()
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            results.append(PackResult(path, [], [f"unreadable: {e.strerror}"]))
+            continue
+        bundled = path == bundled_path
+        digest = _digest(data, bundled)
+        digests.add(digest)
+        cached = _read_cached(digest)
+        if cached is not None:
+            tips, errors, deleted = cached
+            results.append(PackResult(path, tips, errors, time.perf_counter() - start, cached=True, deleted=deleted))
+        else:
+            results.append(PackResult(path, [], []))
+            pending[n] = (digest, data, bundled)
+
+    if len(pending) > 1 and jobs != 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {n: pool.submit(_compile, data, bundled) for n, (_, data, bundled) in pending.items()}
+            compiled = {n: future.result() for n, future in futures.items()}
+    else:
+        compiled = {n: _compile(data, bundled) for n, (_, data, bundled) in pending.items()}
+
+    for n, (tips, errors, deleted, seconds) in compiled.items():
+        result = results[n]
+        result.tips, result.errors, result.deleted, result.seconds = tips, errors, deleted, seconds
+        _write_cached(pending[n][0], tips, errors, deleted)
+
+    _prune_cache(digests)
+    return results
+
+
+def merge_packs(results: list[PackResult]) -> list[dict]:
+    """Merge compiled sources in order; later tips reusing an id are dropped."""
+    deleted = {tip_id for result in results for tip_id in result.deleted}
+    owner: dict[str, str] = {}
+    merged = []
+    for result in results:
+        result.duplicates = []
+        for tip in result.tips:
+            if tip["id"] in deleted:
+                continue
+            first = owner.get(tip["id"])
+            if first is not None:
+                result.duplicates.append((tip["id"], first))
+                continue
+            owner[tip["id"]] = result.path.name
+            merged.append(tip)
+    return merged
+
+
+def build(jobs: int | None = None) -> list[PackResult]:
+    """Validate and compile every source into the tip store; return per-file results."""
+    from dev_tip.store import _fingerprint, _source_files, compile_store
+
+    sources = _source_files()
+    # Taken before reading, so a pack edited mid-build triggers another rebuild
+    fingerprint = _fingerprint(sources)
+    results = compile_packs(sources, jobs)
+    compile_store(merge_packs(results), fingerprint)
+    return results
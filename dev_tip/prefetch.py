@@ -1,97 +1,485 @@
-"""Background prefetch worker: python -m dev_tip.prefetch <topic> <level>
+"""Background prefetch worker and its job queue.
 
-Fetches a fresh batch of AI tips and appends them to the cache.
-Uses a lock file to prevent concurrent prefetch processes.
+Fetches fresh batches of AI tips and appends them to the cache.  Refills
+are queued in a spool directory, ``prefetch.d``, one ``<key>.job`` file per
+cache key, so a key asked for twice is queued once.  A worker drains the
+spool, most depleted key first, with up to CONCURRENCY provider calls in
+flight.  It claims a job by renaming it to ``<key>.running`` and deletes it
+once the batch is cached.
+
+An flock on a lock file makes sure at most one worker runs.  With a shared cache
+directory the lock and the spool live there, so one worker serves every
+user.  A refill asked for while a worker runs is queued for that worker
+instead of being dropped.
+
+spawn() queues a refill and runs the worker in a detached, double-forked
+child of the current process, reusing the modules and config it has
+already loaded.  Where os.fork is unavailable it falls back to
+``python -m dev_tip.prefetch``, which is also kept as an entry point.
 """
 from __future__ import annotations
 
-import json
+import fcntl
 import os
+import subprocess
 import sys
 import time
+import urllib.parse
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+from dev_tip.state import active_state_dir, state_file, use_state_dir
+
+if TYPE_CHECKING:
+    from dev_tip.ai.provider import AIProvider
 
 LOCK_FILE = Path.home() / ".dev-tip" / ".prefetch.lock"
-LOCK_MAX_AGE = 120  # seconds
+QUEUE_DIR = Path.home() / ".dev-tip" / "prefetch.d"
+LOCK_MAX_AGE = 120  # seconds a claimed job may run before it counts as abandoned
+BATCH_SIZE = 10
+CONCURRENCY = 2  # Provider calls a worker has in flight at once
+STATE_DIR_ENV = "DEV_TIP_STATE_DIR"  # Hands use_state_dir() to the python -m fallback worker
 
+_held: dict[Path, int] = {}  # Locks this process holds, by lock file
 
-def _acquire_lock() -> bool:
-    """Try to acquire the lock file. Return True on success."""
-    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
 
-    if LOCK_FILE.exists():
-        try:
-            info = json.loads(LOCK_FILE.read_text())
-            pid = info.get("pid", 0)
-            ts = info.get("time", 0)
-
-            # Check if lock is stale
-            if time.time() - ts < LOCK_MAX_AGE:
-                # Check if process is still alive
-                try:
-                    os.kill(pid, 0)
-                    return False  # Process alive, lock held
-                except OSError:
-                    pass  # Process dead, stale lock
-        except (json.JSONDecodeError, KeyError):
-            pass  # Corrupt lock file, take over
-
-    LOCK_FILE.write_text(json.dumps({"pid": os.getpid(), "time": time.time()}))
+def _lock_file(shared_dir: str | None = None) -> Path:
+    """Return the prefetch lock path (host-wide when the cache is shared)."""
+    return Path(shared_dir) / ".prefetch.lock" if shared_dir else state_file(LOCK_FILE)
+
+
+def _lock_is_held(lock_file: Path) -> bool:
+    """Return True if a worker, in this or another process, holds the lock."""
+    if lock_file in _held:
+        return True
+    try:
+        fd = os.open(lock_file, os.O_RDONLY)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        return True  # Not ours to open, so not ours to take either
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def _acquire_lock(lock_file: Path | None = None) -> bool:
+    """Try to take the lock without waiting. Return True on success.
+
+    flock makes taking it atomic, and the kernel drops it when the holder
+    exits, so a crashed worker never leaves a stale lock behind.
+    """
+    lock_file = lock_file or state_file(LOCK_FILE)
+    if lock_file in _held:
+        return False
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o664)
+    except OSError:
+        return False
+    try:
+        if os.fstat(fd).st_uid == os.geteuid():
+            os.fchmod(fd, 0o664)  # Other users of a shared cache must be able to open it
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _held[lock_file] = fd
     return True
 
 
-def _release_lock() -> None:
-    """Remove the lock file."""
+def _release_lock(lock_file: Path | None = None) -> None:
+    """Release the lock.
+
+    The file stays: unlinking it would let the next two workers lock two
+    different files.
+    """
+    fd = _held.pop(lock_file or state_file(LOCK_FILE), None)
+    if fd is not None:
+        os.close(fd)
+
+
+def _queue_dir(shared_dir: str | None = None) -> Path:
+    """Return the spool directory (host-wide when the cache is shared)."""
+    return Path(shared_dir) / "prefetch.d" if shared_dir else state_file(QUEUE_DIR)
+
+
+def _job_name(topic: str | None, level: str | None) -> str:
+    from dev_tip.ai.cache import _cache_key
+
+    return urllib.parse.quote(_cache_key(topic, level), safe=":")
+
+
+def _read_job(path: Path) -> dict | None:
+    from dev_tip import codec
+
     try:
-        LOCK_FILE.unlink(missing_ok=True)
+        job = codec.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(job, dict) or not all(isinstance(job.get(f), (int, float)) for f in ("unseen", "queued_at")):
+        return None
+    return job
+
+
+def _write_job(path: Path, job: dict, mode: int) -> None:
+    from dev_tip import codec
+
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            os.fchmod(fd, mode)
+            f.write(codec.dumps(job))
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def enqueue(topic: str | None, level: str | None, unseen: int = 0, shared_dir: str | None = None) -> None:
+    """Queue a refill of one cache key, unless it is being refilled right now.
+
+    A key that is already queued keeps its place in line and the lowest
+    unseen count it was queued with.
+    """
+    from dev_tip.ai.cache import SHARED_FILE_MODE
+
+    queue = _queue_dir(shared_dir)
+    name = _job_name(topic, level)
+    if (queue / f"{name}.running").exists():
+        return
+    path = queue / f"{name}.job"
+    job = {"topic": topic, "level": level, "unseen": unseen, "queued_at": time.time()}
+    queued = _read_job(path)
+    if queued is not None:
+        job["unseen"] = min(unseen, queued["unseen"])
+        job["queued_at"] = queued["queued_at"]
+        if job == queued:
+            return  # Nothing new to say
+    if not queue.is_dir():
+        queue.mkdir(parents=True, exist_ok=True)
+        if shared_dir:
+            try:
+                os.chmod(queue, os.stat(queue).st_mode & 0o7777 | 0o775)  # umask must not keep other users out
+            except OSError:
+                pass  # Created by another user meanwhile
+    _write_job(path, job, SHARED_FILE_MODE if shared_dir else 0o644)
+
+
+def _queued(queue: Path) -> list[tuple[Path, dict]]:
+    """Queued jobs, most urgent first: fewest unseen tips, then longest waiting."""
+    jobs = []
+    try:
+        paths = list(queue.glob("*.job"))
     except OSError:
+        return []
+    for path in paths:
+        job = _read_job(path)
+        if job is not None:
+            jobs.append((path, job))
+    jobs.sort(key=lambda item: (item[1]["unseen"], item[1]["queued_at"]))
+    return jobs
+
+
+def _claim(queue: Path, count: int) -> list[tuple[Path, dict]]:
+    """Take up to ``count`` of the most urgent jobs by renaming them to .running."""
+    claimed = []
+    for path, _ in _queued(queue):
+        running = path.with_suffix(".running")
+        try:
+            os.replace(path, running)
+            os.utime(running)  # Claimed now, however long it was queued
+        except FileNotFoundError:
+            continue
+        job = _read_job(running)  # Re-read: it may have been updated since it was listed
+        if job is None:
+            running.unlink(missing_ok=True)
+            continue
+        claimed.append((running, job))
+        if len(claimed) == count:
+            break
+    return claimed
+
+
+def _requeue(running: Path) -> None:
+    """Put a claimed job back in line, unless the key was queued again meanwhile."""
+    job = running.with_suffix(".job")
+    try:
+        if job.exists():
+            running.unlink()
+        else:
+            os.replace(running, job)
+    except FileNotFoundError:
         pass
 
 
-def main() -> None:
-    args = sys.argv[1:]
-    if len(args) != 2:
-        return
+def queue_status(shared_dir: str | None = None) -> dict:
+    """Queue depth and how long the oldest queued refill has waited."""
+    queue = _queue_dir(shared_dir)
+    jobs = _queued(queue)
+    try:
+        running = sum(1 for _ in queue.glob("*.running"))
+    except OSError:
+        running = 0
+    now = time.time()
+    return {
+        "queued": len(jobs),
+        "running": running,
+        "oldest_wait_seconds": max((now - job["queued_at"] for _, job in jobs), default=0.0),
+    }
 
-    topic = None if args[0] == "null" else args[0]
-    level = None if args[1] == "null" else args[1]
 
-    if not _acquire_lock():
-        return
+def run(topic: str | None, level: str | None, config: dict, provider: AIProvider | None = None) -> int:
+    """Fetch one batch of tips into the cache, holding the prefetch lock.
+
+    Returns the number of new tips cached (0 if skipped or the call failed).
+    ``provider`` reuses an already created provider instead of making one.
+    """
+    shared_dir = config.get("shared_cache_dir")
+    lock_file = _lock_file(shared_dir)
+    if not _acquire_lock(lock_file):
+        return 0
 
     try:
-        from dev_tip.ai.cache import is_on_cooldown, mark_failure, save_cache
-        from dev_tip.ai.provider import create_provider
-        from dev_tip.config import load_config
+        from dev_tip.ai import provider_for
+        from dev_tip.ai.cache import is_on_cooldown, known_titles, mark_failure, save_cache
+        from dev_tip.ai.prompt import avoid_digest
+        from dev_tip.metrics import record_api_call, record_yield
 
         if is_on_cooldown():
-            return
+            return 0
 
-        config = load_config()
         provider_name = config.get("ai_provider")
-        if not provider_name:
-            return
-
-        api_key = config.get("ai_key")
-        if not api_key:
-            env_keys = {"gemini": "GEMINI_API_KEY", "openrouter": "OPENROUTER_API_KEY"}
-            env_var = env_keys.get(provider_name)
-            if env_var:
-                api_key = os.environ.get(env_var)
-        if not api_key:
-            return
-
-        provider = create_provider(provider_name, api_key, model=config.get("ai_model"))
+        provider = provider or provider_for(config)
+        if provider is None:
+            return 0
+
+        # Tell the model what is already cached so the batch is mostly new tips
+        avoid = avoid_digest(known_titles(topic, level, shared_dir))
+        start = time.monotonic()
         try:
-            new_tips = provider.generate_tips(topic, level, 10)
-        except Exception:
+            new_tips = provider.generate_tips(topic, level, BATCH_SIZE, avoid)
+        except Exception as e:
+            record_api_call(provider_name, time.monotonic() - start, e)
             mark_failure()
-            return
+            return 0
+        record_api_call(provider_name, time.monotonic() - start)
 
         # save_cache merges and deduplicates automatically
-        save_cache(new_tips, topic, level)
+        added = save_cache(new_tips, topic, level, shared_dir=shared_dir)
+        record_yield(provider_name, len(new_tips), len(added))
+        (_queue_dir(shared_dir) / f"{_job_name(topic, level)}.job").unlink(missing_ok=True)  # Refilled
+        return len(added)
+    finally:
+        _release_lock(lock_file)
+
+
+def _generate(
+    provider: AIProvider, topic: str | None, level: str | None, avoid: list[str]
+) -> tuple[list | None, float, Exception | None]:
+    """One provider call, for a worker thread: (tips, seconds, error)."""
+    start = time.monotonic()
+    try:
+        tips = provider.generate_tips(topic, level, BATCH_SIZE, avoid)
+    except Exception as e:
+        return None, time.monotonic() - start, e
+    return tips, time.monotonic() - start, None
+
+
+def _still_needed(topic: str | None, level: str | None, shared_dir: str | None) -> bool:
+    """Whether a queued key still needs a refill; an empty key always does."""
+    from dev_tip.ai.cache import cache_needs_refill, load_cache
+    from dev_tip.history import _load_history
+
+    tips = load_cache(topic, level, shared_dir=shared_dir)
+    if not tips:
+        return True
+    seen = set(_load_history())
+    unseen = sum(tip["id"] not in seen for tip in tips)
+    return cache_needs_refill(topic, level, unseen, shared_dir=shared_dir)
+
+
+def _drain_locked(queue: Path, config: dict, provider: AIProvider | None) -> tuple[int, bool]:
+    """Drain the queue while holding the lock; return (new tips cached, whether to stop)."""
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+
+    from dev_tip.ai import provider_for
+    from dev_tip.ai.cache import is_on_cooldown, known_titles, mark_failure, save_cache
+    from dev_tip.ai.prompt import avoid_digest
+    from dev_tip.metrics import observe, record_api_call, record_yield
+
+    # A job claimed this long ago was left by a worker that died
+    try:
+        for running in list(queue.glob("*.running")):
+            if time.time() - running.stat().st_mtime > LOCK_MAX_AGE:
+                _requeue(running)
+    except OSError:
+        pass
+    if is_on_cooldown():
+        return 0, True
+    provider_name = config.get("ai_provider")
+    provider = provider or provider_for(config)
+    if provider is None:
+        return 0, True
+
+    shared_dir = config.get("shared_cache_dir")
+    added = 0
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        while jobs := _claim(queue, CONCURRENCY):
+            calls = []
+            for path, job in jobs:
+                topic, level = job.get("topic"), job.get("level")
+                if not _still_needed(topic, level, shared_dir):
+                    path.unlink(missing_ok=True)  # Refilled meanwhile, e.g. by a blocking fetch
+                    continue
+                observe("prefetch_wait_seconds", time.time() - job["queued_at"])
+                avoid = avoid_digest(known_titles(topic, level, shared_dir))
+                # Each thread needs its own copy of the context that selects the state directory
+                call = pool.submit(contextvars.copy_context().run, _generate, provider, topic, level, avoid)
+                calls.append((path, topic, level, call))
+
+            # Results are cached one at a time, here, so cache writes never race
+            failed = False
+            for path, topic, level, call in calls:
+                tips, seconds, error = call.result()
+                record_api_call(provider_name, seconds, error)
+                if error is not None:
+                    failed = True
+                    _requeue(path)
+                    continue
+                new_tips = save_cache(tips, topic, level, shared_dir=shared_dir)
+                record_yield(provider_name, len(tips), len(new_tips))
+                added += len(new_tips)
+                path.unlink(missing_ok=True)
+            if failed:
+                mark_failure()
+                return added, True
+    return added, False
+
+
+def drain(config: dict, provider: AIProvider | None = None) -> int:
+    """Work through the queued refills; return the number of new tips cached.
+
+    Returns 0 straight away if another worker holds the lock.  Stops at the
+    first failed call, leaving the rest queued until the cooldown is over.
+    """
+    shared_dir = config.get("shared_cache_dir")
+    lock_file = _lock_file(shared_dir)
+    queue = _queue_dir(shared_dir)
+    added = 0
+    while _acquire_lock(lock_file):
+        try:
+            new_tips, stop = _drain_locked(queue, config, provider)
+        finally:
+            _release_lock(lock_file)
+        added += new_tips
+        # A refill queued while the lock was being released was not started by
+        # its spawn(), which still found the lock held: take it too
+        if stop or not _queued(queue):
+            break
+    return added
+
+
+def _spawn_subprocess() -> bool:
+    # A new interpreter does not inherit the context variable that selects the state directory
+    env = dict(os.environ)
+    env.pop(STATE_DIR_ENV, None)
+    if active_state_dir() is not None:
+        env[STATE_DIR_ENV] = str(active_state_dir())
+    try:
+        subprocess.Popen(
+            [sys.executable, "-m", "dev_tip.prefetch"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True,
+            env=env,
+        )
+    except OSError:
+        return False
+    return True
+
+
+def spawn(
+    topic: str | None, level: str | None, config: dict, unseen: int = 0, provider: AIProvider | None = None
+) -> bool:
+    """Queue a refill and start a detached worker; return False if none was started.
+
+    ``unseen`` is how many unseen tips the key has left, which sets its place
+    in the queue.  The refill stays queued when no worker is started: the
+    running worker, or the next one after a cooldown, picks it up.  The lock
+    and cooldown are checked before forking, so a worker that would exit
+    straight away costs nothing.  A forked worker reuses ``provider``, if
+    given, instead of making one.
+    """
+    from dev_tip.ai.cache import is_on_cooldown
+    from dev_tip.metrics import incr
+
+    shared_dir = config.get("shared_cache_dir")
+    try:
+        enqueue(topic, level, unseen, shared_dir)
+    except OSError:
+        return False
+    if _lock_is_held(_lock_file(shared_dir)) or is_on_cooldown():
+        return False
+    incr("prefetch_spawns")
+    if not hasattr(os, "fork"):
+        return _spawn_subprocess()
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        pid = os.fork()
+    except OSError:
+        return False
+    if pid:
+        os.waitpid(pid, 0)  # The intermediate child exits immediately
+        return True
+
+    # Intermediate child: new session, then fork again so the worker is
+    # re-parented to init and can never reacquire a controlling terminal.
+    try:
+        os.setsid()
+        for fd in _held.values():
+            os.close(fd)  # A lock another thread holds must not outlive it in the worker
+        _held.clear()
+        if os.fork():
+            os._exit(0)
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        drain(config, provider)
+    except BaseException:
+        pass
     finally:
-        _release_lock()
+        os._exit(0)
+
+
+def main() -> None:
+    """Drain the queue, after queueing ``<topic> <level>`` if given ("null" for any).
+
+    The state directory is taken from DEV_TIP_STATE_DIR when it is set.
+    """
+    args = sys.argv[1:]
+    if len(args) not in (0, 2):
+        return
+
+    from dev_tip.config import load_config
+
+    state_dir = os.environ.get(STATE_DIR_ENV)
+    with use_state_dir(Path(state_dir) if state_dir else None):
+        config = load_config()
+        if args:
+            topic = None if args[0] == "null" else args[0]
+            level = None if args[1] == "null" else args[1]
+            enqueue(topic, level, shared_dir=config.get("shared_cache_dir"))
+        drain(config)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+"""Raw-ANSI tip renderer.
+
+A tip is rendered into one pre-styled string and written with a single
+``sys.stdout.write``.  pygments, which highlights the example, is only
+imported when color is on.  Rendered blocks are not cached: history makes
+a tip show up about once, so a cache would cost a file read and write per
+prompt and almost never hit.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import textwrap
+
+MAX_WIDTH = 60
+
+DIM = "\x1b[2m"
+RESET = "\x1b[0m"
+
+TOPIC_EMOJI = {
+    "python": "\U0001f40d",
+    "git": "\U0001f500",
+    "docker": "\U0001f433",
+    "sql": "\U0001f4be",
+    "linux": "\U0001f427",
+    "kubernetes": "\u2638\ufe0f",
+    "vim": "\U0001f4dd",
+    "javascript": "\U0001f7e8",
+    "terraform": "\U0001f3d7\ufe0f",
+    "rust": "\U0001f980",
+}
+
+# Pygments lexer used for each topic's examples; anything else is shell.
+_EXAMPLE_LEXERS = {
+    "python": "python",
+    "sql": "sql",
+    "javascript": "javascript",
+    "rust": "rust",
+    "terraform": "terraform",
+    "vim": "vim",
+}
+
+
+def use_color(stream=None) -> bool:
+    """Honour NO_COLOR / FORCE_COLOR, otherwise color only on a terminal."""
+    if os.environ.get("NO_COLOR"):
+        return False
+    if os.environ.get("FORCE_COLOR"):
+        return True
+    stream = stream or sys.stdout
+    return hasattr(stream, "isatty") and stream.isatty()
+
+
+def _highlight(example: str, topic: str) -> list[str]:
+    from pygments import highlight
+    from pygments.formatters import TerminalFormatter
+    from pygments.lexers import get_lexer_by_name
+
+    lexer = get_lexer_by_name(_EXAMPLE_LEXERS.get(topic, "bash"))
+    return highlight(example, lexer, TerminalFormatter()).rstrip("\n").splitlines()
+
+
+def _wrap_example(example: str, width: int) -> str:
+    """Wrap example lines longer than ``width``; continuations are indented two more."""
+    width = max(width, 1)
+    out: list[str] = []
+    for line in example.splitlines():
+        if len(line) <= width:
+            out.append(line)
+            continue
+        indent = line[: len(line) - len(line.lstrip())]
+        out += textwrap.wrap(
+            line,
+            width=width,
+            subsequent_indent=(indent + "  ")[: width // 2],
+            break_on_hyphens=False,
+            replace_whitespace=False,
+        )
+    return "\n".join(out)
+
+
+def render_tip(tip: dict, width: int, quiet: bool = False, color: bool = True) -> str:
+    """Return the fully styled tip, wrapped and right-floated in ``width`` columns."""
+    wrap_width = min(width, MAX_WIDTH)
+    pad = " " * max(width - wrap_width, 0)
+    dim, reset = (DIM, RESET) if color else ("", "")
+
+    body_lines = textwrap.wrap(tip["body"].strip(), width=wrap_width)
+    if quiet:
+        lines = body_lines
+        example_lines: list[str] = []
+    else:
+        topic = tip["topic"]
+        emoji = TOPIC_EMOJI.get(topic, "\U0001f4a1")
+        header = f"{emoji} {topic} \u00b7 {tip['level']} \u00b7 {tip['title']}"
+        lines = textwrap.wrap(header, width=wrap_width) + [""] + body_lines
+
+        example = (tip.get("example") or "").strip("\n")
+        example_lines = []
+        if example.strip():
+            example = _wrap_example(example.expandtabs(), wrap_width - 2)
+            plain = example.splitlines()
+            styled = _highlight(example, topic) if color else plain
+            example_lines = [""] + ["  " + line if line.strip() else "" for line in styled]
+
+    out = [""]  # breathing room between shell output and tip
+    out += [f"{pad}{dim}{line}{reset}" if line else "" for line in lines]
+    out += [f"{pad}{line}" if line else "" for line in example_lines]
+    return "\n".join(out) + "\n"
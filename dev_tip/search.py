@@ -0,0 +1,317 @@
+"""Ranked full-text search over bundled, pack and cached AI tips.
+
+The index has two parts:
+
+- a memory-mapped main segment (~/.dev-tip/search.idx) holding sorted term
+  hashes, postings, document lengths and display fields, and
+- an append-only delta log (~/.dev-tip/search_delta.jsonl) that save_cache
+  appends newly cached tips to.
+
+Queries are scored with BM25 over both parts.  The main segment is rebuilt
+from scratch only when the static corpus changes, the delta log grows past
+DELTA_LIMIT, or the index is missing.  Index sections use native byte
+order; the file is a per-machine cache, not an interchange format.
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+
+from dev_tip.state import state_file
+
+INDEX_FILE = Path.home() / ".dev-tip" / "search.idx"
+DELTA_FILE = Path.home() / ".dev-tip" / "search_delta.jsonl"
+DELTA_LIMIT = 500  # cached tips appended before the main segment is rebuilt
+
+MAGIC = b"DTSX"
+VERSION = 1
+DISPLAY_FIELDS = ("id", "topic", "level", "title")
+TITLE_WEIGHT = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_HEADER = struct.Struct("<4sHHIIQII")  # magic, version, reserved, docs, terms, total length, fp ref
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can for from how if in into is it its of on or "
+    "the that this to use with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase search terms, dropping stopwords."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def _term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8).digest(), "little")
+
+
+def _term_counts(tip: dict) -> Counter:
+    """Weighted term frequencies for one tip (title terms count double)."""
+    counts: Counter = Counter()
+    for term in tokenize(str(tip.get("title") or "")):
+        counts[term] += TITLE_WEIGHT
+    body = f"{tip.get('body') or ''} {tip.get('example') or ''}"
+    counts.update(tokenize(body))
+    return counts
+
+
+def build_index(tips: list[dict], fingerprint: str, path: Path | None = None) -> None:
+    """Write a main index segment for tips, replacing any existing one atomically."""
+    path = path or state_file(INDEX_FILE)
+    postings: dict[str, list[int]] = {}
+    doclens: list[int] = []
+    strings = bytearray()
+    docrefs: list[int] = []
+
+    def add_string(value: str) -> None:
+        encoded = value.encode()
+        docrefs.extend((len(strings), len(encoded)))
+        strings.extend(encoded)
+
+    for doc, tip in enumerate(tips):
+        counts = _term_counts(tip)
+        doclens.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings.setdefault(term, []).extend((doc, tf))
+        for field in DISPLAY_FIELDS:
+            add_string(str(tip.get(field) or ""))
+
+    by_hash = sorted((_term_hash(term), entries) for term, entries in postings.items())
+    hashes = [h for h, _ in by_hash]
+    term_refs: list[int] = []
+    flat: list[int] = []
+    for _, entries in by_hash:
+        term_refs.extend((len(flat) // 2, len(entries) // 2))
+        flat.extend(entries)
+
+    fp = fingerprint.encode()
+    fp_off = len(strings)
+    strings.extend(fp)
+
+    header = _HEADER.pack(MAGIC, VERSION, 0, len(tips), len(hashes), sum(doclens), fp_off, len(fp))
+    body = b"".join((
+        array("Q", hashes).tobytes(),
+        array("I", term_refs).tobytes(),
+        array("I", flat).tobytes(),
+        array("I", doclens).tobytes(),
+        array("I", docrefs).tobytes(),
+        bytes(strings),
+    ))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(header + body)
+    os.replace(tmp, path)
+
+
+class SearchIndex:
+    """Read-only, memory-mapped main index segment."""
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _, docs, terms, total_len, fp_off, fp_len = _HEADER.unpack_from(self._mm, 0)
+        except struct.error as e:
+            self._mm.close()
+            raise ValueError(f"Truncated search index: {path}") from e
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"Not a dev-tip search index: {path}")
+
+        if len(self._mm) < _HEADER.size + 16 * terms:
+            self._mm.close()
+            raise ValueError(f"Truncated search index: {path}")
+        view = memoryview(self._mm)
+        at = _HEADER.size
+        self._hashes = view[at:at + 8 * terms].cast("Q")
+        at += 8 * terms
+        self._term_refs = view[at:at + 8 * terms].cast("I")
+        at += 8 * terms
+        # Postings for the last term end the postings section
+        posting_words = 2 * (self._term_refs[-2] + self._term_refs[-1]) if terms else 0
+        sizes = (4 * posting_words, 4 * docs, 4 * 2 * len(DISPLAY_FIELDS) * docs)
+        self._strings_at = at + sum(sizes)
+        if self._strings_at + fp_off + fp_len > len(self._mm):
+            for v in (self._term_refs, self._hashes, view):
+                v.release()
+            self._mm.close()
+            raise ValueError(f"Truncated search index: {path}")
+
+        self._postings = view[at:at + sizes[0]].cast("I")
+        at += sizes[0]
+        self._doclens = view[at:at + sizes[1]].cast("I")
+        at += sizes[1]
+        self._docrefs = view[at:at + sizes[2]].cast("I")
+        self._views = (view, self._hashes, self._term_refs, self._postings, self._doclens, self._docrefs)
+
+        self.doc_count = docs
+        self.total_length = total_len
+        self.fingerprint = self._string(fp_off, fp_len)
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._mm.close()
+
+    def __enter__(self) -> SearchIndex:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_at + offset
+        return self._mm[start:start + length].decode()
+
+    def postings(self, term: str) -> list[int]:
+        """Return the flat [doc, tf, doc, tf, ...] postings for a term."""
+        h = _term_hash(term)
+        i = bisect_left(self._hashes, h)
+        if i >= len(self._hashes) or self._hashes[i] != h:
+            return []
+        offset, count = self._term_refs[2 * i], self._term_refs[2 * i + 1]
+        return self._postings[2 * offset:2 * (offset + count)].tolist()
+
+    def doc_length(self, doc: int) -> int:
+        return self._doclens[doc]
+
+    def document(self, doc: int) -> dict:
+        """Decode the display fields of one document."""
+        base = doc * 2 * len(DISPLAY_FIELDS)
+        return {
+            field: self._string(self._docrefs[base + 2 * i], self._docrefs[base + 2 * i + 1])
+            for i, field in enumerate(DISPLAY_FIELDS)
+        }
+
+
+def _delta_entry(tip: dict) -> dict:
+    counts = _term_counts(tip)
+    entry = {field: str(tip.get(field) or "") for field in DISPLAY_FIELDS}
+    entry["tf"] = dict(counts)
+    entry["len"] = sum(counts.values())
+    return entry
+
+
+def _load_delta() -> list[dict]:
+    delta_file = state_file(DELTA_FILE)
+    if not delta_file.exists():
+        return []
+    entries = []
+    for line in delta_file.read_text().splitlines():
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue  # Torn final line from an interrupted append
+    return entries
+
+
+def add_to_index(tips: list[dict]) -> None:
+    """Append newly cached tips to the delta log (no-op until an index exists)."""
+    if not tips or not state_file(INDEX_FILE).exists():
+        return
+    lines = "".join(json.dumps(_delta_entry(t)) + "\n" for t in tips)
+    with open(state_file(DELTA_FILE), "a") as f:
+        f.write(lines)
+
+
+def reset_index() -> None:
+    """Delete the index so the next search rebuilds it."""
+    for path in (INDEX_FILE, DELTA_FILE):
+        state_file(path).unlink(missing_ok=True)
+
+
+def _corpus() -> tuple[list[dict], str]:
+    """Collect every searchable tip and the static-corpus fingerprint."""
+    from dev_tip.ai.cache import _load_all
+    from dev_tip.store import open_store
+
+    with open_store() as store:
+        tips = [store.get(i) for i in range(len(store))]
+        fingerprint = store.fingerprint
+
+    seen = {t["id"] for t in tips}
+    for entry in _load_all().get("keys", {}).values():
+        for tip in entry.get("tips", []):
+            if tip.get("id") not in seen:
+                seen.add(tip.get("id"))
+                tips.append(tip)
+    return tips, fingerprint
+
+
+def _open_index() -> tuple[SearchIndex, list[dict]]:
+    """Open the main segment and delta log, rebuilding when stale."""
+    from dev_tip.store import open_store
+
+    with open_store() as store:
+        fingerprint = store.fingerprint
+
+    delta = _load_delta()
+    if len(delta) <= DELTA_LIMIT:
+        try:
+            index = SearchIndex(state_file(INDEX_FILE))
+            if index.fingerprint == fingerprint:
+                return index, delta
+            index.close()
+        except (OSError, ValueError):
+            pass
+
+    tips, fingerprint = _corpus()
+    build_index(tips, fingerprint)
+    state_file(DELTA_FILE).unlink(missing_ok=True)
+    return SearchIndex(state_file(INDEX_FILE)), []
+
+
+def search(query: str, limit: int = 10) -> list[tuple[float, dict]]:
+    """Return up to limit (score, tip) pairs ranked by BM25."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+
+    index, delta = _open_index()
+    with index:
+        n_docs = index.doc_count + len(delta)
+        if n_docs == 0:
+            return []
+        avgdl = (index.total_length + sum(d["len"] for d in delta)) / n_docs
+
+        def weight(tf: int, length: int) -> float:
+            return tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl))
+
+        main_scores: dict[int, float] = {}
+        delta_scores: dict[int, float] = {}
+        for term in terms:
+            postings = index.postings(term)
+            delta_hits = [(i, d["tf"][term]) for i, d in enumerate(delta) if term in d["tf"]]
+            df = len(postings) // 2 + len(delta_hits)
+            if not df:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc, tf in zip(postings[0::2], postings[1::2]):
+                main_scores[doc] = main_scores.get(doc, 0.0) + idf * weight(tf, index.doc_length(doc))
+            for i, tf in delta_hits:
+                delta_scores[i] = delta_scores.get(i, 0.0) + idf * weight(tf, delta[i]["len"])
+
+        candidates = [(score, 0, doc) for doc, score in main_scores.items()]
+        candidates += [(score, 1, i) for i, score in delta_scores.items()]
+        results = []
+        for score, in_delta, doc in heapq.nlargest(limit, candidates):
+            if in_delta:
+                tip = {field: delta[doc][field] for field in DISPLAY_FIELDS}
+            else:
+                tip = index.document(doc)
+            results.append((score, tip))
+    return results
@@ -0,0 +1,38 @@
+"""Which directory dev-tip keeps its state in.
+
+Modules name their files with constants under ~/.dev-tip and resolve them
+through ``state_file`` when they use them.  Normally that returns the
+constant unchanged; inside ``use_state_dir(path)`` it returns the file of
+the same name in ``path`` instead.  The active directory is a context
+variable, so threads serving different state directories (one TipEngine
+per user) never see each other's files.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+_active: ContextVar[Path | None] = ContextVar("dev_tip_state_dir", default=None)
+
+
+def state_file(default: Path) -> Path:
+    """Return ``default``, or the file of the same name in the active state directory."""
+    root = _active.get()
+    return default if root is None else root / default.name
+
+
+def active_state_dir() -> Path | None:
+    """Return the directory set by ``use_state_dir`` in this context, if any."""
+    return _active.get()
+
+
+@contextmanager
+def use_state_dir(path: Path | None) -> Iterator[None]:
+    """Read and write state in ``path`` for the duration of the block (None: the defaults)."""
+    token = _active.set(Path(path) if path is not None else None)
+    try:
+        yield
+    finally:
+        _active.reset(token)
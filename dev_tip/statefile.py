@@ -0,0 +1,203 @@
+"""Checksummed state files that recover from crashes and corruption.
+
+A state file is a header line followed by a JSON payload::
+
+    #dev-tip-state 1 <crc32 of the payload, hex> <payload length>
+    {...}
+
+A write goes to a temporary file, which is fsynced and then renamed over the
+old file.  The old file is kept as ``<name>.bak``, a hard link, so nothing
+is copied.  A file that fails the check or does not parse is moved aside as
+``<name>.corrupt-<time>``.  It is replaced by the backup or, failing that, by
+whatever the caller could salvage from it.  This means a damaged file costs
+one recovery instead of a failed parse on every call.  Recoveries are logged
+to ~/.dev-tip/recovery.log for ``dev-tip status``.
+
+Plain JSON files written before this format are still read.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+import zlib
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from dev_tip import codec
+from dev_tip.state import state_file
+
+MAGIC = b"#dev-tip-state"
+FORMAT_VERSION = 1
+RECOVERY_LOG = Path.home() / ".dev-tip" / "recovery.log"
+KEEP_QUARANTINED = 3  # Corrupt copies kept per file for inspection
+
+# Salvage callbacks get the raw bytes of a corrupt file and return
+# (data, what was saved), or None if nothing could be.
+Salvage = Callable[[bytes], "tuple[Any, str] | None"]
+
+
+class CorruptState(ValueError):
+    """A state file failed its checksum or does not parse."""
+
+
+def _pack(payload: bytes) -> bytes:
+    return b"%s %d %08x %d\n" % (MAGIC, FORMAT_VERSION, zlib.crc32(payload), len(payload)) + payload
+
+
+def _unpack(data: bytes) -> bytes:
+    if not data.startswith(MAGIC):
+        return data  # Plain JSON from before checksums: parsing is the only check
+    end = data.find(b"\n")
+    try:
+        _, version, crc, length = data[:end].split(b" ")
+        version, crc, length = int(version), int(crc, 16), int(length)
+    except ValueError:
+        raise CorruptState("unreadable header") from None
+    if version != FORMAT_VERSION:
+        raise CorruptState(f"unknown format version {version}")
+    payload = data[end + 1:]
+    if len(payload) != length:
+        raise CorruptState(f"{len(payload)} of {length} bytes")
+    if zlib.crc32(payload) != crc:
+        raise CorruptState("checksum mismatch")
+    return payload
+
+
+def decode(data: bytes) -> Any:
+    """Check and parse the bytes of a state file; raise CorruptState if they are bad."""
+    payload = _unpack(data)
+    try:
+        return codec.loads(payload)
+    except ValueError as e:
+        raise CorruptState(f"invalid JSON ({e})") from None
+
+
+def backup_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.bak")
+
+
+def quarantine_path(path: Path) -> Path:
+    """A new name to move a corrupt ``path`` aside to; later ones sort after earlier ones."""
+    now = time.time()
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(now))
+    return path.with_name(f"{path.name}.corrupt-{stamp}.{int(now % 1 * 1e6):06d}-{os.getpid()}-{threading.get_ident()}")
+
+
+def _keep_backup(path: Path) -> None:
+    """Link the current file as the backup, if there is one and links work here."""
+    bak = backup_path(path)
+    tmp = bak.with_name(f".{bak.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        os.link(path, tmp)
+        os.replace(tmp, bak)
+        tmp.unlink(missing_ok=True)  # rename() is a no-op if bak already links the same file
+    except FileNotFoundError:
+        pass
+    except OSError:
+        tmp.unlink(missing_ok=True)  # No hard links on this filesystem: go without
+
+
+def write(path: Path, data: Any, mode: int | None = None) -> None:
+    """Atomically replace ``path`` with ``data``, keeping the previous version as the backup.
+
+    ``mode`` is applied regardless of the umask, e.g. to keep shared files
+    group-writable.
+    """
+    body = _pack(codec.dumps(data))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")  # Unique per thread
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666 if mode is None else mode)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if mode is not None:
+                os.fchmod(fd, mode)
+            f.write(body)
+            f.flush()
+            os.fsync(fd)
+        _keep_backup(path)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def read(path: Path, salvage: Salvage | None = None) -> Any:
+    """Return the data in a state file, recovering the file first if it is corrupt.
+
+    Raises FileNotFoundError if there is no file, or if it was corrupt and
+    nothing could be recovered (it is quarantined then, so it is gone).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+        inode = os.fstat(f.fileno()).st_ino
+    try:
+        return decode(data)
+    except CorruptState as e:
+        return _recover(path, data, inode, str(e), salvage)
+
+
+def _recover(path: Path, data: bytes, inode: int, reason: str, salvage: Salvage | None) -> Any:
+    recovered, action = None, "reset"
+    try:
+        recovered, action = decode(backup_path(path).read_bytes()), "restored from backup"
+    except (OSError, ValueError):
+        saved = salvage(data) if salvage else None
+        if saved is not None:
+            recovered, action = saved[0], f"salvaged {saved[1]}"
+
+    try:
+        st = os.stat(path)
+        if st.st_ino != inode:
+            return read(path, salvage)  # Another process already recovered it
+        quarantined = quarantine_path(path)
+        os.replace(path, quarantined)
+        if recovered is not None:
+            write(path, recovered, st.st_mode & 0o777)
+    except OSError:
+        # Not ours to fix (e.g. a read-only shared cache): recover in memory only
+        if recovered is None:
+            raise FileNotFoundError(path) from None
+        return recovered
+
+    for old in sorted(path.parent.glob(f"{path.name}.corrupt-*"))[:-KEEP_QUARANTINED]:
+        old.unlink(missing_ok=True)
+    log_recovery(path, reason, action, quarantined)
+    if recovered is None:
+        raise FileNotFoundError(path)
+    return recovered
+
+
+def log_recovery(path: Path, reason: str, action: str, quarantined: Path | None = None) -> None:
+    """Record a recovery for ``dev-tip status``."""
+    from dev_tip.metrics import incr
+
+    entry = {"time": time.time(), "file": str(path), "reason": reason, "action": action}
+    if quarantined is not None:
+        entry["quarantined"] = str(quarantined)
+    log = state_file(RECOVERY_LOG)
+    try:
+        log.parent.mkdir(parents=True, exist_ok=True)
+        with open(log, "ab") as f:
+            f.write(codec.dumps(entry) + b"\n")
+    except OSError:
+        pass
+    incr("state_recoveries", {"file": path.name})
+
+
+def recoveries(limit: int = 5) -> list[dict]:
+    """The most recent recoveries, newest last."""
+    try:
+        lines = state_file(RECOVERY_LOG).read_bytes().splitlines()
+    except OSError:
+        return []
+    entries = []
+    for line in lines[-limit:]:
+        try:
+            entry = codec.loads(line)
+        except ValueError:
+            continue
+        if isinstance(entry, dict):
+            entries.append(entry)
+    return entries
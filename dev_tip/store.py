@@ -0,0 +1,200 @@
+"""Compact memory-mapped tip store.
+
+The feed overlay, the bundled tips.yaml and any YAML packs in ~/.dev-tip/packs/ are compiled
+(see dev_tip.packs) into a single binary file.  It is opened with mmap, so showing a tip only
+decodes the record that is actually displayed instead of every tip.
+
+Layout (little-endian)::
+
+    header   magic, version, tip count, bucket count, fingerprint ref
+    buckets  topic ref, level ref, first record, record count
+    records  one (offset, length) string ref per field in FIELDS
+    strings  UTF-8 string table, offsets relative to its start
+
+Records are sorted by (topic, level), so every bucket is a contiguous run.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from pathlib import Path
+
+from dev_tip.record import FIELDS, Tip
+from dev_tip.state import state_file
+from dev_tip.tips import bundled_tips_path, pack_files
+
+STORE_FILE = Path.home() / ".dev-tip" / "tips.bin"
+
+MAGIC = b"DTIP"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHHIIII")
+_REF = struct.Struct("<II")
+_BUCKET = struct.Struct("<IIIIII")
+_RECORD = struct.Struct("<" + "II" * len(FIELDS))
+
+
+class _StringTable:
+    """Append-only, deduplicating UTF-8 string table."""
+
+    def __init__(self) -> None:
+        self._data = bytearray()
+        self._refs: dict[str, tuple[int, int]] = {}
+
+    def add(self, value: str) -> tuple[int, int]:
+        ref = self._refs.get(value)
+        if ref is None:
+            encoded = value.encode()
+            ref = (len(self._data), len(encoded))
+            self._data += encoded
+            self._refs[value] = ref
+        return ref
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._data)
+
+
+def compile_store(tips: list[dict], fingerprint: str, path: Path | None = None) -> None:
+    """Write tips to a compact store file, replacing any existing one atomically."""
+    path = path or state_file(STORE_FILE)
+    ordered = sorted(tips, key=lambda t: (str(t["topic"]), str(t["level"])))
+    strings = _StringTable()
+
+    buckets: list[list] = []
+    for index, tip in enumerate(ordered):
+        bucket = (str(tip["topic"]), str(tip["level"]))
+        if buckets and (buckets[-1][0], buckets[-1][1]) == bucket:
+            buckets[-1][3] += 1
+        else:
+            buckets.append([bucket[0], bucket[1], index, 1])
+
+    fp_ref = strings.add(fingerprint)
+    bucket_bytes = b"".join(
+        _BUCKET.pack(*strings.add(topic), *strings.add(level), first, count)
+        for topic, level, first, count in buckets
+    )
+    record_bytes = b"".join(
+        _RECORD.pack(*(n for field in FIELDS for n in strings.add(str(tip.get(field) or ""))))
+        for tip in ordered
+    )
+    header = _HEADER.pack(MAGIC, VERSION, 0, len(ordered), len(buckets), *fp_ref)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(header + bucket_bytes + record_bytes + strings.to_bytes())
+    os.replace(tmp, path)
+
+
+class TipStore:
+    """Read-only view over a compiled store file."""
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _, count, bucket_count, fp_off, fp_len = _HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Not a dev-tip store: {path}")
+            self._count = count
+            self._records_at = _HEADER.size + bucket_count * _BUCKET.size
+            self._strings_at = self._records_at + count * _RECORD.size
+            if self._strings_at > len(self._mm):
+                raise ValueError(f"Truncated dev-tip store: {path}")
+            self.fingerprint = self._string(fp_off, fp_len)
+            self._buckets = []
+            for i in range(bucket_count):
+                t_off, t_len, l_off, l_len, first, n = _BUCKET.unpack_from(
+                    self._mm, _HEADER.size + i * _BUCKET.size
+                )
+                self._buckets.append((self._string(t_off, t_len), self._string(l_off, l_len), first, n))
+        except struct.error as e:
+            self._mm.close()
+            raise ValueError(f"Truncated dev-tip store: {path}") from e
+        except ValueError:
+            self._mm.close()
+            raise
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_at + offset
+        return self._mm[start:start + length].decode()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> TipStore:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def topics(self) -> set[str]:
+        """Return every topic present in the store."""
+        return {topic for topic, _, _, _ in self._buckets}
+
+    def buckets(self) -> list[tuple[str, str, int]]:
+        """Return (topic, level, tip count) for every bucket."""
+        return [(topic, level, count) for topic, level, _, count in self._buckets]
+
+    def find(self, topic: str | None = None, level: str | None = None) -> list[int]:
+        """Return record indices matching the given filters."""
+        indices: list[int] = []
+        for b_topic, b_level, first, count in self._buckets:
+            if topic and b_topic != topic:
+                continue
+            if level and b_level != level:
+                continue
+            indices.extend(range(first, first + count))
+        return indices
+
+    def tip_id(self, index: int) -> str:
+        """Decode only the id of a record."""
+        offset, length = _REF.unpack_from(self._mm, self._records_at + index * _RECORD.size)
+        return self._string(offset, length)
+
+    def get(self, index: int) -> Tip:
+        """Decode a full tip record."""
+        refs = _RECORD.unpack_from(self._mm, self._records_at + index * _RECORD.size)
+        return Tip(*(self._string(refs[2 * i], refs[2 * i + 1]) for i in range(len(FIELDS))))
+
+
+def _source_files() -> list[Path]:
+    from dev_tip import tips
+
+    # The feed overlay goes first so its tips replace bundled ones with the same id
+    overlay = state_file(tips.OVERLAY_FILE)
+    return [*([overlay] if overlay.is_file() else []), bundled_tips_path(), *pack_files()]
+
+
+def _fingerprint(sources: list[Path]) -> str:
+    """Cheap change detector built from stat() of every source file."""
+    parts = [f"v{VERSION}"]
+    for path in sources:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        parts.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+    return "|".join(parts)
+
+
+def open_store() -> TipStore:
+    """Open the compiled store, recompiling it first if any source changed."""
+    sources = _source_files()
+    fingerprint = _fingerprint(sources)
+    try:
+        store = TipStore(state_file(STORE_FILE))
+        if store.fingerprint == fingerprint:
+            return store
+        store.close()
+    except (OSError, ValueError):
+        pass
+
+    from dev_tip.packs import compile_packs, merge_packs
+
+    # Unchanged packs come from the per-pack cache; a broken pack only loses its own tips
+    compile_store(merge_packs(compile_packs(sources)), fingerprint)
+    return TipStore(state_file(STORE_FILE))
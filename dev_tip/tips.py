@@ -2,44 +2,148 @@ from __future__ import annotations
 
 import random
 from importlib.resources import files
+from pathlib import Path
 from typing import Optional
 
 import yaml
 
+from dev_tip.mix import WILDCARD, bucket_sampler, parse_mix
+from dev_tip.state import state_file
+
 VALID_TOPICS = {
     "python", "git", "docker", "sql", "linux",
     "kubernetes", "vim", "javascript", "terraform", "rust",
 }
 VALID_LEVELS = {"beginner", "intermediate", "advanced"}
+REQUIRED_FIELDS = ("id", "topic", "level", "title", "body")
+OPTIONAL_FIELDS = ("example", "source")
+
+PACKS_DIR = Path.home() / ".dev-tip" / "packs"
+OVERLAY_FILE = Path.home() / ".dev-tip" / "overlay.json"  # Written by dev-tip update
+
+
+def bundled_tips_path() -> Path:
+    """Return the path of the bundled tips.yaml."""
+    return Path(str(files("dev_tip.data").joinpath("tips.yaml")))
+
+
+def load_overlay() -> dict:
+    """Return the feed overlay: ``{"serial", "tips", "delete"}``, empty if there is none."""
+    from dev_tip import codec
+
+    try:
+        overlay = codec.loads(state_file(OVERLAY_FILE).read_bytes())
+    except (OSError, ValueError):
+        overlay = None
+    if not isinstance(overlay, dict):
+        return {"serial": None, "tips": [], "delete": []}
+    return {
+        "serial": overlay.get("serial"),
+        "tips": [t for t in overlay.get("tips") or [] if isinstance(t, dict) and "id" in t],
+        "delete": [i for i in overlay.get("delete") or [] if isinstance(i, str)],
+    }
 
 
 def load_tips() -> list[dict]:
-    """Load all tips from the bundled YAML file."""
+    """Load all tips: the feed overlay in front of the bundled YAML file."""
     tip_file = files("dev_tip.data").joinpath("tips.yaml")
-    return yaml.safe_load(tip_file.read_text())
+    tips = yaml.safe_load(tip_file.read_text())
+    overlay = load_overlay()
+    if not overlay["tips"] and not overlay["delete"]:
+        return tips
+    hidden = set(overlay["delete"]) | {t["id"] for t in overlay["tips"]}
+    return overlay["tips"] + [t for t in tips if t["id"] not in hidden]
+
+
+def pack_files() -> list[Path]:
+    """Return the YAML tip packs in ~/.dev-tip/packs/, sorted by name."""
+    packs_dir = state_file(PACKS_DIR)
+    if not packs_dir.is_dir():
+        return []
+    return sorted(p for p in packs_dir.iterdir() if p.suffix in (".yaml", ".yml") and p.is_file())
+
+
+def load_pack(path: Path) -> list[dict]:
+    """Load a list of tips from a YAML pack file."""
+    tips = yaml.safe_load(path.read_text())
+    return tips if isinstance(tips, list) else []
+
+
+def validate_tips(tips: object, topics: set[str] | None = None) -> tuple[list[dict], list[str]]:
+    """Check a list of tips; return (valid tips, error messages).
+
+    Tips need string ``id``, ``topic``, ``level``, ``title`` and ``body``
+    fields, a known level and an id not used earlier in the list.  With
+    ``topics`` given, the topic must be one of them (packs may add new ones).
+    Optional ``example`` and ``source`` must be strings; other keys are dropped.
+    """
+    if not isinstance(tips, list):
+        return [], [f"expected a list of tips, got {type(tips).__name__}"]
+
+    valid: list[dict] = []
+    errors: list[str] = []
+    seen: set[str] = set()
+    for n, tip in enumerate(tips, 1):
+        if not isinstance(tip, dict):
+            errors.append(f"tip #{n}: not a mapping")
+            continue
+        name = f"tip #{n} ({tip['id']})" if isinstance(tip.get("id"), str) else f"tip #{n}"
+        missing = [f for f in REQUIRED_FIELDS if not isinstance(tip.get(f), str) or not tip[f].strip()]
+        if missing:
+            errors.append(f"{name}: missing {', '.join(missing)}")
+            continue
+        wrong = [f for f in OPTIONAL_FIELDS if tip.get(f) is not None and not isinstance(tip[f], str)]
+        if wrong:
+            errors.append(f"{name}: {', '.join(wrong)} must be text")
+            continue
+        if tip["level"] not in VALID_LEVELS:
+            errors.append(f"{name}: unknown level {tip['level']!r}")
+            continue
+        if topics is not None and tip["topic"] not in topics:
+            errors.append(f"{name}: unknown topic {tip['topic']!r}")
+            continue
+        if tip["id"] in seen:
+            errors.append(f"{name}: duplicate id")
+            continue
+        seen.add(tip["id"])
+        valid.append({f: tip[f] for f in REQUIRED_FIELDS + OPTIONAL_FIELDS if tip.get(f) is not None})
+    return valid, errors
+
+
+def _matcher(spec: str | list[str] | None):
+    """Return a predicate for one mix dimension, or None if it matches anything."""
+    mix = dict(parse_mix(spec))
+    if not mix or WILDCARD in mix:
+        return None
+    return mix.__contains__
 
 
 def filter_tips(
     tips: list[dict],
-    topic: Optional[str] = None,
-    level: Optional[str] = None,
+    topic: str | list[str] | None = None,
+    level: str | list[str] | None = None,
 ) -> list[dict]:
-    """Filter tips by topic and/or level."""
+    """Filter tips by topic and/or level (a name, a list or a mix spec; weights are ignored)."""
     filtered = tips
-    if topic:
-        filtered = [t for t in filtered if t["topic"] == topic]
-    if level:
-        filtered = [t for t in filtered if t["level"] == level]
+    topic_ok = _matcher(topic)
+    if topic_ok:
+        filtered = [t for t in filtered if topic_ok(t["topic"])]
+    level_ok = _matcher(level)
+    if level_ok:
+        filtered = [t for t in filtered if level_ok(t["level"])]
     return filtered
 
 
 def get_random_tip(
     tips: list[dict],
-    topic: Optional[str] = None,
-    level: Optional[str] = None,
+    topic: str | list[str] | None = None,
+    level: str | list[str] | None = None,
 ) -> Optional[dict]:
-    """Return a random tip matching the given filters, or None if no match."""
-    filtered = filter_tips(tips, topic=topic, level=level)
-    if not filtered:
+    """Return a random tip following the topic/level mixes, or None if no match."""
+    counts: dict[tuple[str, str], list[dict]] = {}
+    for tip in tips:
+        counts.setdefault((tip["topic"], tip["level"]), []).append(tip)
+    sampler = bucket_sampler([(t, lv, len(group)) for (t, lv), group in counts.items()], topic, level)
+    if not sampler:
         return None
-    return random.choice(filtered)
+    return random.choice(counts[sampler.sample()])
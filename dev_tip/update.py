@@ -0,0 +1,208 @@
+"""Incremental updates of the tip corpus from a feed.
+
+A feed is a set of static JSON files served over HTTP(S), listed by a
+manifest at ``update_url``::
+
+    {"format": "dev-tip-feed", "version": 1, "serial": 7,
+     "snapshot": "snapshot-7.json",
+     "deltas": [{"from": 6, "to": 7, "url": "delta-7.json"}, ...]}
+
+A snapshot (``{"serial", "tips", "delete"}``) holds everything the feed
+provides; a delta (``{"from", "to", "upsert", "delete"}``) holds the changes
+between two serials and never changes once published.  The manifest is
+fetched with If-None-Match/If-Modified-Since, so checking an unchanged feed
+costs one 304.  Otherwise the deltas after the local serial are applied,
+falling back to the snapshot when they do not reach the latest serial.
+
+The result is the overlay (``tips.OVERLAY_FILE``): its tips replace bundled
+tips with the same id and its ``delete`` list hides bundled ones.
+"""
+from __future__ import annotations
+
+import os
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from email.message import Message
+from pathlib import Path
+
+from dev_tip import codec
+from dev_tip.state import state_file
+
+STATE_FILE = Path.home() / ".dev-tip" / "update.json"
+FEED_FORMAT = "dev-tip-feed"
+FEED_VERSION = 1
+TIMEOUT = 30
+
+
+class _Fetcher:
+    """GETs feed files and counts requests and bytes."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.bytes = 0
+
+    def get(self, url: str, headers: dict[str, str] | None = None) -> tuple[int, Message, bytes]:
+        self.requests += 1
+        req = urllib.request.Request(url, headers={"User-Agent": "dev-tip", **(headers or {})})
+        try:
+            with urllib.request.urlopen(req, timeout=TIMEOUT) as resp:
+                body = resp.read()
+                status, resp_headers = resp.status, resp.headers
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            return 304, e.headers, b""
+        self.bytes += len(body)
+        return status, resp_headers, body
+
+    def json(self, url: str) -> dict:
+        _, _, body = self.get(url)
+        try:
+            data = codec.loads(body)
+        except ValueError as e:
+            raise ValueError(f"{url}: invalid JSON ({e})") from None
+        if not isinstance(data, dict):
+            raise ValueError(f"{url}: expected a JSON object")
+        return data
+
+
+def _read_json(path: Path) -> dict:
+    try:
+        data = codec.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(codec.dumps(data))
+    os.replace(tmp, path)
+
+
+def _serial(value: object, what: str) -> int:
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise ValueError(f"{what}: invalid serial {value!r}")
+    return value
+
+
+def _delta_chain(deltas: object, start: int, end: int) -> list[str] | None:
+    """URLs of the deltas leading from ``start`` to ``end``, or None if there is a gap."""
+    steps = {}
+    for delta in deltas if isinstance(deltas, list) else []:
+        if isinstance(delta, dict) and isinstance(delta.get("url"), str):
+            steps[delta.get("from")] = (delta.get("to"), delta["url"])
+    chain = []
+    serial = start
+    while serial != end:
+        step = steps.get(serial)
+        if step is None or not isinstance(step[0], int) or step[0] <= serial:
+            return None
+        serial, url = step
+        chain.append(url)
+    return chain
+
+
+def _apply(tips: dict[str, dict], deleted: set[str], upsert: object, delete: object) -> int:
+    """Apply one batch of changes in place; return the number of invalid tips."""
+    from dev_tip.tips import validate_tips
+
+    for tip_id in delete if isinstance(delete, list) else []:
+        if isinstance(tip_id, str):
+            tips.pop(tip_id, None)
+            deleted.add(tip_id)
+    valid, errors = validate_tips(upsert if upsert is not None else [])
+    for tip in valid:
+        tips[tip["id"]] = tip
+        deleted.discard(tip["id"])
+    return len(errors)
+
+
+def update(url: str, full: bool = False) -> dict:
+    """Bring the overlay up to date with the feed at ``url``; return a summary.
+
+    The summary has ``status`` ("unchanged", "delta" or "snapshot"),
+    ``serial``, the ``added``/``changed``/``removed`` tip counts, ``invalid``
+    tips skipped and the ``requests`` and ``bytes`` it took.  ``full``
+    ignores the local state and downloads the snapshot.
+    """
+    from dev_tip import tips as tip_data
+
+    state = _read_json(state_file(STATE_FILE))
+    if full or state.get("feed") != url:
+        state = {}
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+
+    fetcher = _Fetcher()
+    status, resp_headers, body = fetcher.get(url, headers)
+    summary = {
+        "status": "unchanged", "serial": state.get("serial"),
+        "added": 0, "changed": 0, "removed": 0, "invalid": 0,
+    }
+    if status != 304:
+        try:
+            manifest = codec.loads(body)
+        except ValueError as e:
+            raise ValueError(f"{url}: invalid JSON ({e})") from None
+        if not isinstance(manifest, dict) or manifest.get("format") != FEED_FORMAT:
+            raise ValueError(f"{url}: not a dev-tip feed")
+        if manifest.get("version") != FEED_VERSION:
+            raise ValueError(f"{url}: unsupported feed version {manifest.get('version')!r}")
+        serial = _serial(manifest.get("serial"), url)
+        local = state.get("serial")
+
+        if serial != local:
+            overlay = tip_data.load_overlay()
+            old = {tip["id"]: tip for tip in overlay["tips"]}
+            old_deleted = set(overlay["delete"])
+            chain = _delta_chain(manifest.get("deltas"), local, serial) if isinstance(local, int) else None
+            if chain is not None:
+                new, deleted, invalid = dict(old), set(old_deleted), 0
+                for delta_url in chain:
+                    delta_url = urllib.parse.urljoin(url, delta_url)
+                    delta = fetcher.json(delta_url)
+                    if delta.get("from") != local:
+                        raise ValueError(f"{delta_url}: expected a delta from serial {local}")
+                    local = _serial(delta.get("to"), delta_url)
+                    invalid += _apply(new, deleted, delta.get("upsert"), delta.get("delete"))
+                summary["status"] = "delta"
+            else:
+                if not isinstance(manifest.get("snapshot"), str):
+                    raise ValueError(f"{url}: no snapshot to start from")
+                snapshot_url = urllib.parse.urljoin(url, manifest["snapshot"])
+                snapshot = fetcher.json(snapshot_url)
+                if _serial(snapshot.get("serial"), snapshot_url) != serial:
+                    raise ValueError(f"{snapshot_url}: expected serial {serial}")
+                new, deleted = {}, set()
+                invalid = _apply(new, deleted, snapshot.get("tips"), snapshot.get("delete"))
+                summary["status"] = "snapshot"
+
+            summary["added"] = sum(1 for tip_id in new if tip_id not in old)
+            summary["changed"] = sum(1 for tip_id, tip in new.items() if tip_id in old and old[tip_id] != tip)
+            summary["removed"] = len((old.keys() - new.keys()) | (deleted - old_deleted))
+            summary["invalid"] = invalid
+            if new != old or deleted != old_deleted:
+                _write_json(
+                    state_file(tip_data.OVERLAY_FILE),
+                    {"serial": serial, "tips": list(new.values()), "delete": sorted(deleted)},
+                )
+        summary["serial"] = serial
+        state = {
+            "feed": url,
+            "serial": serial,
+            "etag": resp_headers.get("ETag"),
+            "last_modified": resp_headers.get("Last-Modified"),
+        }
+
+    state["checked_at"] = time.time()
+    _write_json(state_file(STATE_FILE), state)
+    summary["requests"] = fetcher.requests
+    summary["bytes"] = fetcher.bytes
+    return summary
@@ -14,10 +14,25 @@ def dev_tip_home(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
 
     monkeypatch.setattr("dev_tip.config.CONFIG_DIR", config_dir)
     monkeypatch.setattr("dev_tip.config.CONFIG_FILE", config_dir / "config.toml")
+    monkeypatch.setattr("dev_tip.config.SNAPSHOT_FILE", config_dir / ".config.snapshot")
     monkeypatch.setattr("dev_tip.history.HISTORY_DIR", config_dir)
     monkeypatch.setattr("dev_tip.history.HISTORY_FILE", config_dir / "history.json")
+    monkeypatch.setattr("dev_tip.history.HISTORY_SEGMENTS", config_dir / "history.d")
     monkeypatch.setattr("dev_tip.ai.cache.CACHE_DIR", config_dir)
     monkeypatch.setattr("dev_tip.ai.cache.CACHE_FILE", config_dir / "ai_cache.json")
     monkeypatch.setattr("dev_tip.hook.PAUSE_FILE", config_dir / ".paused")
+    monkeypatch.setattr("dev_tip.hook.SCHEDULE_FILE", config_dir / ".schedule")
     monkeypatch.setattr("dev_tip.cli.PAUSE_FILE", config_dir / ".paused")
+    monkeypatch.setattr("dev_tip.store.STORE_FILE", config_dir / "tips.bin")
+    monkeypatch.setattr("dev_tip.tips.PACKS_DIR", config_dir / "packs")
+    monkeypatch.setattr("dev_tip.tips.OVERLAY_FILE", config_dir / "overlay.json")
+    monkeypatch.setattr("dev_tip.update.STATE_FILE", config_dir / "update.json")
+    monkeypatch.setattr("dev_tip.packs.PACK_CACHE_DIR", config_dir / "packs.cache")
+    monkeypatch.setattr("dev_tip.search.INDEX_FILE", config_dir / "search.idx")
+    monkeypatch.setattr("dev_tip.search.DELTA_FILE", config_dir / "search_delta.jsonl")
+    monkeypatch.setattr("dev_tip.metrics.METRICS_LOG", config_dir / "metrics.log")
+    monkeypatch.setattr("dev_tip.metrics.METRICS_FILE", config_dir / "metrics.json")
+    monkeypatch.setattr("dev_tip.prefetch.QUEUE_DIR", config_dir / "prefetch.d")
+    monkeypatch.setattr("dev_tip.statefile.RECOVERY_LOG", config_dir / "recovery.log")
+    monkeypatch.setattr("dev_tip.ai.provider.MODEL_CAPS_FILE", config_dir / "model_caps.json")
     return config_dir
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import gzip
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from dev_tip.ai.bundle import content_hash, export_bundle, import_bundle
+from dev_tip.ai.cache import _load_all, load_cache, save_cache
+from dev_tip.cli import app
+
+runner = CliRunner()
+
+
+def _tips(topic, level, n, prefix="ai"):
+    return [
+        {"id": f"{prefix}-{topic}-{i}", "topic": topic, "level": level or "intermediate", "title": f"T{i}",
+         "body": f"{topic} body {i}", "example": "", "source": "ai"}
+        for i in range(n)
+    ]
+
+
+def test_export_import_roundtrip(dev_tip_home, tmp_path):
+    save_cache(_tips("python", "beginner", 3), "python", "beginner")
+    save_cache(_tips("git", None, 2), "git", None)
+    bundle = tmp_path / "tips.jsonl.gz"
+    assert export_bundle(bundle) == {"keys": 2, "tips": 5}
+
+    with gzip.open(bundle, "rt") as f:
+        header = json.loads(f.readline())
+        first = json.loads(f.readline())
+    assert header["format"] == "dev-tip-cache" and header["keys"] == ["git:intermediate", "python:beginner"]
+    assert first["h"] == content_hash(first["tip"])
+
+    (dev_tip_home / "ai_cache.json").unlink()
+    counts = import_bundle(bundle)
+    assert counts["added"] == 5 and counts["duplicates"] == 0
+    assert len(load_cache("python", "beginner")) == 3
+
+    # Importing again adds nothing
+    assert import_bundle(bundle)["duplicates"] == 5
+
+
+def test_import_dedupes_by_content_and_selects_keys(dev_tip_home, tmp_path):
+    save_cache(_tips("sql", "advanced", 2, prefix="other"), "sql", "advanced")
+    bundle = tmp_path / "b.jsonl.gz"
+    export_bundle(bundle)
+    (dev_tip_home / "ai_cache.json").unlink()
+
+    # Same content under different ids counts as a duplicate
+    save_cache(_tips("sql", "advanced", 1, prefix="mine"), "sql", "advanced")
+    assert import_bundle(bundle) == {"read": 2, "added": 1, "duplicates": 1, "invalid": 0, "bundle_tips": 2}
+    assert import_bundle(bundle, keys=["git:intermediate"])["added"] == 0
+
+
+def test_import_skips_corrupt_lines(dev_tip_home, tmp_path):
+    bundle = tmp_path / "bad.jsonl.gz"
+    tip = _tips("rust", None, 1)[0]
+    with gzip.open(bundle, "wt") as f:
+        f.write(json.dumps({"format": "dev-tip-cache", "version": 1, "keys": ["rust:None"], "tips": 3}) + "\n")
+        f.write(json.dumps({"k": "rust:None", "h": "0" * 16, "tip": tip}) + "\n")
+        f.write("{not json\n")
+        f.write(json.dumps({"k": "rust:None", "h": content_hash(tip), "tip": tip}) + "\n")
+    counts = import_bundle(bundle)
+    assert counts["added"] == 1 and counts["invalid"] == 2
+
+
+def test_import_rejects_foreign_files(dev_tip_home, tmp_path):
+    bundle = tmp_path / "x.gz"
+    with gzip.open(bundle, "wt") as f:
+        f.write('{"format": "something-else"}\n')
+    with pytest.raises(ValueError):
+        import_bundle(bundle)
+    assert not (dev_tip_home / "ai_cache.json").exists()
+
+
+def test_import_into_shared_cache(dev_tip_home, tmp_path):
+    save_cache(_tips("docker", None, 2), "docker", None)
+    bundle = tmp_path / "b.jsonl.gz"
+    export_bundle(bundle)
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    assert import_bundle(bundle, shared_dir=shared)["added"] == 2
+    assert (shared / "ai_cache.json").stat().st_mode & 0o777 == 0o664
+    assert (shared / ".ai_cache.lock").stat().st_mode & 0o777 == 0o664
+
+
+def test_truncated_bundle_fails_with_a_reason(dev_tip_home, tmp_path):
+    save_cache(_tips("sql", None, 200), "sql", None)
+    bundle = tmp_path / "b.jsonl.gz"
+    export_bundle(bundle)
+    (dev_tip_home / "ai_cache.json").unlink()
+    data = bundle.read_bytes()
+    bundle.write_bytes(data[: len(data) // 2])
+    with pytest.raises(ValueError, match="truncated"):
+        import_bundle(bundle)
+    assert not (dev_tip_home / "ai_cache.json").exists()
+
+    result = runner.invoke(app, ["cache", "import", str(bundle)])
+    assert result.exit_code == 1 and "truncated or corrupt bundle" in result.output
+
+
+def test_cache_cli(dev_tip_home, tmp_path):
+    save_cache(_tips("vim", "beginner", 4), "vim", "beginner")
+    bundle = tmp_path / "vim.jsonl.gz"
+    result = runner.invoke(app, ["cache", "export", str(bundle), "--key", "vim:beginner"])
+    assert result.exit_code == 0 and "Exported 4 tips" in result.output
+
+    (dev_tip_home / "ai_cache.json").unlink()
+    result = runner.invoke(app, ["cache", "import", str(bundle)])
+    assert result.exit_code == 0 and "Imported 4 tips" in result.output
+    assert len(_load_all()["keys"]["vim:beginner"]["tips"]) == 4
+
+    result = runner.invoke(app, ["cache", "import", str(tmp_path / "missing.gz")])
+    assert result.exit_code == 1
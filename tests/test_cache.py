@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import json
 import time
 
+from dev_tip import statefile
 from dev_tip.ai.cache import (
     clear_cache,
     get_cache_stats,
@@ -62,3 +64,133 @@ def test_get_cache_stats_with_data(dev_tip_home):
     stats = get_cache_stats()
     assert stats["keys"] == 2
     assert stats["total_tips"] == 2
+
+
+def test_shared_cache_read_through(dev_tip_home, tmp_path, monkeypatch):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    save_cache([{"id": "s1", "body": "shared"}], "python", "beginner", shared_dir=shared)
+    assert (shared / "ai_cache.json").stat().st_mode & 0o777 == 0o664
+    assert (shared / ".ai_cache.lock").stat().st_mode & 0o777 == 0o664
+
+    # A second user with an empty personal cache sees the shared tips
+    other = tmp_path / "other"
+    other.mkdir()
+    monkeypatch.setattr("dev_tip.ai.cache.CACHE_DIR", other)
+    monkeypatch.setattr("dev_tip.ai.cache.CACHE_FILE", other / "ai_cache.json")
+    assert load_cache("python", "beginner") == []
+    assert [t["id"] for t in load_cache("python", "beginner", shared_dir=shared)] == ["s1"]
+
+
+def test_shared_cache_merges_with_personal(dev_tip_home, tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    save_cache([{"id": "mine", "body": "x"}], "git", None)
+    save_cache([{"id": "mine", "body": "x"}, {"id": "theirs", "body": "y"}], "git", None, shared_dir=shared)
+    assert [t["id"] for t in load_cache("git", None, shared_dir=shared)] == ["mine", "theirs"]
+    stats = get_cache_stats(shared_dir=shared)
+    assert stats["shared_keys"] == 1
+    assert stats["shared_tips"] == 2
+
+
+def test_shared_cache_falls_back_when_unwritable(dev_tip_home, tmp_path):
+    missing = tmp_path / "does-not-exist"
+    save_cache([{"id": "t1", "body": "x"}], "sql", None, shared_dir=missing)
+    assert [t["id"] for t in load_cache("sql", None)] == ["t1"]
+
+
+def test_shared_cache_avoids_api_calls_across_users(dev_tip_home, tmp_path, monkeypatch):
+    from dev_tip.ai import get_ai_tip
+    from dev_tip.ai.fake import StandInServer
+
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    with StandInServer() as server:
+        config = {"ai_provider": "gemini", "ai_key": "k", "ai_base_url": server.url, "shared_cache_dir": str(shared)}
+        for user in range(5):
+            home = tmp_path / f"user{user}"
+            home.mkdir()
+            monkeypatch.setattr("dev_tip.ai.cache.CACHE_DIR", home)
+            monkeypatch.setattr("dev_tip.ai.cache.CACHE_FILE", home / "ai_cache.json")
+            monkeypatch.setattr("dev_tip.history.HISTORY_FILE", home / "history.json")
+            monkeypatch.setattr("dev_tip.history.HISTORY_SEGMENTS", home / "history.d")
+            tip, _ = get_ai_tip("python", "beginner", config)
+            assert tip is not None
+    assert server.stats["requests"] == 1
+
+
+def _tip(tip_id, topic, level):
+    return {"id": tip_id, "topic": topic, "level": level, "title": "T", "body": "B"}
+
+
+def test_tips_are_routed_by_their_own_topic_and_level(dev_tip_home):
+    # The model answered a python request with a git tip
+    save_cache([_tip("p1", "python", "beginner"), _tip("g1", "Git", "advanced")], "python", None)
+    assert [t["id"] for t in load_cache("git", "advanced")] == ["g1"]
+    assert [t["id"] for t in load_cache("python", None)] == ["p1"]
+    assert sorted(t["id"] for t in load_cache(None, None)) == ["g1", "p1"]
+    assert [t["id"] for t in load_cache(None, "beginner")] == ["p1"]
+
+
+def test_v2_cache_is_rerouted(dev_tip_home):
+    v2 = {"version": 2, "last_failure": 1.0, "keys": {
+        "None:None": {"generated_at": 5.0, "tips": [_tip("a", "sql", "beginner"), _tip("b", "rust", "expert")]},
+    }}
+    (dev_tip_home / "ai_cache.json").write_text(json.dumps(v2))
+    assert [t["id"] for t in load_cache("sql", "beginner")] == ["a"]
+    assert json.loads((dev_tip_home / "ai_cache.json").read_text()) == v2  # Reads never write
+    save_cache([{**_tip("c", "sql", "beginner"), "title": "Other"}], "sql", None)
+    data = statefile.decode((dev_tip_home / "ai_cache.json").read_bytes())
+    assert data["version"] == 3 and data["last_failure"] == 1.0
+    # Unknown levels keep the level that was requested
+    assert sorted(data["keys"]) == ["rust:None", "sql:beginner"]
+    assert [t["id"] for t in data["keys"]["sql:beginner"]["tips"]] == ["a", "c"]
+
+
+def test_broad_filters_avoid_api_calls(dev_tip_home, monkeypatch):
+    from dev_tip.ai import get_ai_tip
+    from dev_tip.ai.fake import StandInServer
+
+    monkeypatch.setattr("dev_tip.ai.BATCH_SIZE", 20)
+    workload = [
+        ("python", "beginner"), ("git", "advanced"), ("python", None), (None, None),
+        (None, "beginner"), ("git", None), (None, "advanced"), ("python", "beginner"),
+    ]
+    with StandInServer() as server:
+        config = {"ai_provider": "gemini", "ai_key": "k", "ai_base_url": server.url}
+        for topic, level in workload:
+            tip, _ = get_ai_tip(topic, level, config)
+            assert tip is not None
+            assert topic in (None, tip["topic"]) and level in (None, tip["level"])
+
+    # Exact-key lookups needed one call per distinct filter
+    exact_calls = len(set(workload))
+    avoided = exact_calls - server.stats["requests"]
+    assert server.stats["requests"] == 2
+    assert avoided == 5
+
+
+def test_miss_picks_only_what_was_stored_for_the_filter(dev_tip_home):
+    from dev_tip.ai import get_ai_tip
+    from dev_tip.ai.fake import FakeProvider
+
+    class _Provider(FakeProvider):
+        def generate_tips(self, topic, level, count, avoid=None):
+            return self.answer
+
+    provider = _Provider()
+    config = {"ai_provider": "fake"}
+    provider.answer = [_tip("g1", "git", "advanced")]  # Routed to another bucket
+    assert get_ai_tip("python", "beginner", config, lambda: provider) == (None, 0)
+    assert not is_on_cooldown()  # A miss, not a failure
+
+    provider.answer = [_tip("p1", "python", "beginner"), _tip("p2", "python", "beginner")]  # p2 repeats the title
+    tip, unseen = get_ai_tip("python", "beginner", config, lambda: provider)
+    assert tip["id"] == "p1" and unseen == 1
+
+
+def test_dedup_by_normalized_title(dev_tip_home):
+    save_cache([_tip("a1", "git", "beginner")], "git", None)
+    again = {**_tip("a2", "git", "beginner"), "title": " t. "}
+    other = {**_tip("a3", "git", "beginner"), "title": "Something else"}
+    assert save_cache([again, other], "git", None) == [other]
@@ -57,3 +57,42 @@ def test_quiet_mode(dev_tip_home):
     lines = [l for l in output.splitlines() if l.strip()]
     # At least one non-empty line (the body)
     assert len(lines) >= 1
+
+
+def test_search_command(dev_tip_home):
+    result = runner.invoke(app, ["search", "enumerate"])
+    assert result.exit_code == 0
+    assert "enumerate" in result.output
+
+    result = runner.invoke(app, ["search", "zzzznotaword"])
+    assert result.exit_code == 0
+    assert "No matching tips" in result.output
+
+
+def test_topic_mix(dev_tip_home):
+    from dev_tip.history import _load_history
+
+    for _ in range(10):
+        result = runner.invoke(app, ["--topic", "git:1,sql:1", "--level", "beginner"])
+        assert result.exit_code == 0
+    seen = _load_history()
+    assert len(seen) == 10
+    assert all(tip_id.startswith(("git-", "sql-")) for tip_id in seen)
+
+    result = runner.invoke(app, ["--topic", "git:zero"])
+    assert result.exit_code == 1
+    assert "Invalid topic" in result.output
+
+
+def test_context_biases_topic(dev_tip_home):
+    import random
+
+    from dev_tip.history import _load_history
+
+    random.seed(0)
+    for _ in range(20):
+        result = runner.invoke(app, ["--context", "sudo docker ps"])
+        assert result.exit_code == 0
+    docker = sum(tip_id.startswith("docker-") for tip_id in _load_history())
+    # 60% share; with 10 topics an unbiased draw would give ~2 of 20
+    assert docker >= 6
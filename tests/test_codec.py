@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import importlib
+import json
+import pickle
+import sys
+
+import pytest
+
+from dev_tip import codec, statefile
+from dev_tip.ai import cache
+from dev_tip.ai.cache import load_cache, save_cache
+from dev_tip.record import Tip
+
+TIP = {"id": "ai-1", "topic": "git", "level": "beginner", "title": "Stash", "body": "git stash", "example": ""}
+
+
+def test_tip_reads_like_the_dict_it_replaces():
+    tip = Tip.from_dict({**TIP, "tags": ["vcs"]})
+    assert tip == {**TIP, "tags": ["vcs"]} and {**TIP, "tags": ["vcs"]} == tip
+    assert tip["title"] == tip.title == "Stash"
+    assert tip.get("source") is None and "source" not in tip
+    assert tip["example"] == "" and tip["tags"] == ["vcs"]
+    with pytest.raises(KeyError):
+        tip["source"]
+    assert dict(tip) == tip.to_dict() == {**TIP, "tags": ["vcs"]}
+    assert pickle.loads(pickle.dumps(tip)) == tip
+    assert Tip.from_dict(tip) is tip
+    assert not hasattr(tip, "__dict__")
+
+
+@pytest.fixture(params=["json", codec.BACKEND])
+def backend(request, monkeypatch):
+    """The installed codec, and the stdlib fallback it replaces."""
+    if request.param == "json":
+        monkeypatch.setitem(sys.modules, "orjson", None)
+        monkeypatch.setitem(sys.modules, "msgspec", None)
+    module = importlib.reload(codec)
+    yield module
+    monkeypatch.undo()
+    importlib.reload(codec)
+
+
+def test_codec_round_trips_tips_compactly(backend):
+    data = {"tips": [Tip.from_dict(TIP)], "note": "naïve"}
+    encoded = backend.dumps(data)
+    assert b"\n" not in encoded and b": " not in encoded
+    assert "naïve".encode() in encoded
+    assert backend.loads(encoded) == json.loads(encoded) == {"tips": [TIP], "note": "naïve"}
+    assert backend.loads(encoded.decode()) == backend.loads(encoded)
+    with pytest.raises(ValueError):
+        backend.loads(encoded[:-3])
+
+
+def test_cache_is_compact_and_loads_tips(dev_tip_home):
+    save_cache([{**TIP, "tags": ["vcs"]}], "git", "beginner")
+    raw = cache.CACHE_FILE.read_bytes()
+    assert b"\n" not in raw.split(b"\n", 1)[1]  # The payload after the state file header
+    (tip,) = load_cache("git", None)
+    assert type(tip) is Tip and tip == {**TIP, "tags": ["vcs"]}
+
+    # Caches written pretty-printed by older versions still load
+    cache.CACHE_FILE.write_text(json.dumps(statefile.decode(raw), indent=2))
+    assert load_cache("git", "beginner") == [tip]
@@ -38,3 +38,55 @@ def test_format_value_types():
     assert _format_value("quiet", False) == "quiet = false"
     assert _format_value("every_commands", 10) == "every_commands = 10"
     assert _format_value("topic", "python") == 'topic = "python"'
+    assert _format_value("topic", ["python:2", "git"]) == 'topic = ["python:2", "git"]'
+
+
+def test_snapshot_skips_toml_parsing(dev_tip_home, monkeypatch):
+    """A second load is served from the snapshot without parsing TOML."""
+    import tomllib
+
+    save_config({"topic": "rust"})
+    assert (dev_tip_home / ".config.snapshot").exists()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("config.toml was parsed")
+
+    monkeypatch.setattr(tomllib, "load", fail)
+    assert load_config()["topic"] == "rust"
+
+
+def test_snapshot_invalidated_by_hand_edit(dev_tip_home):
+    """Editing config.toml by hand takes effect on the next load."""
+    save_config({"topic": "git"})
+    assert load_config()["topic"] == "git"
+    (dev_tip_home / "config.toml").write_text('topic = "docker"\nevery_commands = 3\n')
+    config = load_config()
+    assert config["topic"] == "docker"
+    assert config["every_commands"] == 3
+
+
+def test_invalid_values_fall_back_to_defaults(dev_tip_home):
+    """Values of the wrong type are ignored rather than passed through."""
+    (dev_tip_home / "config.toml").write_text('every_commands = "often"\nquiet = 1\nlevel = 5\n')
+    config = load_config()
+    assert config["every_commands"] == 15
+    assert config["quiet"] is False
+    assert config["level"] is None
+
+
+def test_topic_and_level_lists(dev_tip_home):
+    from dev_tip.mix import parse_mix
+
+    (dev_tip_home / "config.toml").write_text('topic = ["python:3", "git"]\nlevel = ["beginner", 2]\n')
+    config = load_config()
+    assert config["topic"] == ["python:3", "git"]
+    assert parse_mix(config["topic"]) == (("python", 3.0), ("git", 1.0))
+    assert config["level"] is None  # Not every entry is a name
+    save_config({"quiet": True})
+    assert load_config()["topic"] == ["python:3", "git"]
+
+
+def test_corrupt_snapshot_is_rebuilt(dev_tip_home):
+    save_config({"level": "advanced"})
+    (dev_tip_home / ".config.snapshot").write_bytes(b"\x00garbage")
+    assert load_config()["level"] == "advanced"
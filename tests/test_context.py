@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import pytest
+
+from dev_tip.context import bias_mix, classify, compile_trie, parse_rules
+from dev_tip.mix import parse_mix
+
+
+@pytest.mark.parametrize("context, topic", [
+    ("git status", "git"),
+    ("kubectl get", "kubernetes"),
+    ("helm upgrade", "kubernetes"),
+    ("kubectl-neat foo", "kubernetes"),
+    ("sudo docker", "docker"),
+    ("docker-compose up", "docker"),
+    ("psql -h", "sql"),
+    ("python3.12 -m", "python"),
+    ("/usr/bin/git log", "git"),
+    ("FOO=1 cargo", "rust"),
+    ("ls -la", None),
+    ("", None),
+    (None, None),
+])
+def test_classify_builtin(context, topic):
+    assert classify(context) == topic
+
+
+def test_classify_user_rules_override_and_extend():
+    spec = "mytool*:python,git:linux"
+    assert classify("mytool-ng run", spec) == "python"
+    assert classify("git push", spec) == "linux"
+    assert classify("gh pr", spec) == "git"
+
+
+def test_exact_rule_beats_prefix():
+    trie = compile_trie({"py*": "python", "pyth": "other"})
+    assert trie["p"]["y"][""] == {True: "python"}
+    rules = "py*:python,pyth:other"
+    assert classify("pyth", rules) == "other"
+    assert classify("pytho", rules) == "python"
+
+
+def test_parse_rules_rejects_garbage():
+    assert parse_rules(None) == {}
+    with pytest.raises(ValueError):
+        parse_rules("kubectl")
+
+
+def test_bias_mix():
+    biased = dict(parse_mix(bias_mix(None, "git")))
+    assert biased == {"git": 0.6, "*": pytest.approx(0.4)}
+
+    biased = dict(parse_mix(bias_mix("python:3,git:1", "git", share=0.5)))
+    assert biased == {"git": 0.5, "python": 0.5}
+
+    # Explicit filters are never overridden
+    assert bias_mix("python", "git") == "python"
+    assert bias_mix("python:1,*:1", None) == "python:1,*:1"
+    assert bias_mix("git", "git") == "git"
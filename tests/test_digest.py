@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+
+import pytest
+from typer.testing import CliRunner
+
+from dev_tip.ai.cache import save_cache
+from dev_tip.cli import app
+from dev_tip.digest import digest, load_corpus
+from dev_tip.history import _load_history
+from dev_tip.state import use_state_dir
+
+runner = CliRunner()
+
+
+def _history(target):
+    with use_state_dir(target):
+        return _load_history()
+
+
+def test_digest_honours_each_targets_history(dev_tip_home, tmp_path):
+    alice, bob = tmp_path / "alice", tmp_path / "bob"
+    alice.mkdir()
+    bob.mkdir()
+    corpus = load_corpus()
+    rng = random.Random(1)
+
+    first = list(digest(corpus, [alice, bob], 5, topic="git", rng=rng))
+    assert [len(d.tips) for d in first] == [5, 5]
+    assert all(t["topic"] == "git" for d in first for t in d.tips)
+    assert _history(alice) == [t["id"] for t in first[0].tips]
+
+    # 15 git tips: three rounds of five never repeat, the fourth starts over
+    seen = {t["id"] for t in first[0].tips}
+    for _ in range(2):
+        (result,) = digest(corpus, [alice], 5, topic="git", rng=rng)
+        assert not seen & {t["id"] for t in result.tips}
+        seen |= {t["id"] for t in result.tips}
+    assert len(seen) == 15
+    last = _history(alice)[-1]
+    (result,) = digest(corpus, [alice], 5, topic="git", rng=rng)
+    assert len(result.tips) == 5 and last not in {t["id"] for t in result.tips}
+    assert _history(alice) == [last] + [t["id"] for t in result.tips]
+
+    # Bob's history was never touched by Alice's rounds, nor the caller's
+    assert _history(bob) == [t["id"] for t in first[1].tips]
+    assert _load_history() == []
+
+
+@pytest.mark.skipif(os.geteuid() != 0, reason="needs root to create files for another user")
+def test_digest_without_mark_hands_files_to_the_target_owner(dev_tip_home, tmp_path):
+    target = tmp_path / "carol"
+    target.mkdir()
+    (target / "history.json").write_text(json.dumps(["git-001"]))
+    os.chown(target, 4321, 4321)
+
+    (result,) = digest(load_corpus(), [target], 2, topic="git", mark=False)
+    assert len(result.tips) == 2
+    written = [target / "history.d", *(target / "history.d").iterdir()]
+    assert any(path.name == "_base.log" for path in written)  # Migrated while reading
+    assert all(os.stat(path).st_uid == 4321 for path in written)
+
+
+def test_digest_command_streams_json_for_many_targets(dev_tip_home, tmp_path, monkeypatch):
+    save_cache([{"id": "ai-1", "topic": "zig", "level": "beginner", "title": "Comptime", "body": "B"}], "zig", None)
+    targets = []
+    for n in range(4):
+        (tmp_path / f"u{n}").mkdir()
+        targets.append(str(tmp_path / f"u{n}"))
+    listing = tmp_path / "targets.txt"
+    listing.write_text("\n".join(targets + [str(listing)]) + "\n")
+
+    import dev_tip.store
+
+    opened = []
+    real_open = dev_tip.store.open_store
+    monkeypatch.setattr(dev_tip.store, "open_store", lambda: opened.append(1) or real_open())
+
+    result = runner.invoke(app, ["digest", "-n", "2", "-t", "zig", "--targets-from", str(listing), "--format", "json"])
+    assert result.exit_code == 1  # The listing itself is not a state directory
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    # Only the cached AI tip is about zig, so each target gets just that one
+    assert [line["target"] for line in lines] == targets + [str(listing)]
+    assert all(line["id"] == "ai-1" for line in lines[:-1])
+    assert "error" in lines[-1]
+    assert opened == [1]  # The corpus was loaded once for all targets
+    assert _history(tmp_path / "u0")[0] == "ai-1"
+
+    result = runner.invoke(app, ["digest", "--state-dir", targets[0], "--no-mark", "-t", "git"])
+    assert result.exit_code == 0
+    assert f"==> {targets[0]} <==" in result.output
+    assert _history(tmp_path / "u0") == ["ai-1"]
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import threading
+
+from dev_tip.ai.cache import load_cache
+from dev_tip.engine import TipEngine
+from dev_tip.history import _load_history
+from dev_tip.state import use_state_dir
+from dev_tip.tips import load_tips
+
+
+def test_engines_keep_state_apart_across_threads(dev_tip_home, tmp_path):
+    engines = {name: TipEngine(tmp_path / name) for name in ("alice", "bob")}
+    served: dict[str, list[str]] = {name: [] for name in engines}
+    errors = []
+
+    def serve(name: str) -> None:
+        try:
+            for _ in range(5):
+                served[name].append(engines[name].next_tip(topic="git").tip["id"])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=serve, args=(name,)) for name in engines for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+
+    for name in engines:
+        assert (tmp_path / name / "history.d").is_dir()
+        with use_state_dir(tmp_path / name):
+            assert set(_load_history()) == set(served[name])
+    # Nothing leaked into the default state directory
+    assert not (dev_tip_home / "history.d").exists()
+    assert _load_history() == []
+
+
+def test_store_stays_open_until_a_pack_changes(dev_tip_home, tmp_path):
+    engine = TipEngine(tmp_path / "state")
+    store = engine.store
+    engine.next_tip()
+    assert engine.store is store
+
+    packs = tmp_path / "state" / "packs"
+    packs.mkdir()
+    (packs / "team.yaml").write_text(
+        "- id: team-1\n  topic: runbooks\n  level: beginner\n  title: Deploy\n  body: Run make deploy\n"
+    )
+    assert engine.store is not store
+    assert "runbooks" in engine.topics()
+    pick = engine.next_tip(topic="runbooks")
+    assert pick.tip["id"] == "team-1" and pick.source == "static"
+    assert len(engine.store) == len(load_tips()) + 1
+
+
+def test_prefetch_and_ai_tips(dev_tip_home, tmp_path):
+    state = tmp_path / "state"
+    engine = TipEngine(state, config={"ai_provider": "fake"})
+    assert engine.prefetch("docker", "advanced") == 10
+    provider = engine._provider
+
+    pick = engine.next_tip(topic="docker", level="advanced")
+    assert pick.source == "ai" and pick.unseen == 9 and not pick.refill
+    for _ in range(7):
+        pick = engine.next_tip(topic="docker", level="advanced")
+    assert pick.refill and pick.unseen == 2
+    assert engine._provider is provider
+
+    assert load_cache("docker", "advanced") == []  # The default cache is untouched
+    with use_state_dir(state):
+        assert len(load_cache("docker", "advanced")) == 10
+
+
+def test_config_is_reloaded_when_it_changes(dev_tip_home, tmp_path):
+    state = tmp_path / "state"
+    engine = TipEngine(state)
+    assert engine.config["topic"] is None
+    assert (state / "config.toml").exists()
+
+    (state / "config.toml").write_text('topic = "sql"\n')
+    assert engine.config["topic"] == "sql"
+    assert engine.next_tip().tip["topic"] == "sql"
+    engine.mark_seen("manual-id")
+    with use_state_dir(state):
+        assert "manual-id" in _load_history()
+
+
+def test_prefetch_goes_through_the_queue(dev_tip_home, tmp_path):
+    from dev_tip.metrics import collect
+    from dev_tip.prefetch import _acquire_lock, _lock_file, _release_lock, queue_status
+
+    state = tmp_path / "state"
+    engine = TipEngine(state, config={"ai_provider": "fake"})
+    with use_state_dir(state):
+        lock = _lock_file()
+        assert _acquire_lock(lock)  # A worker is running: it gets the refill
+        try:
+            assert engine.prefetch("docker", "advanced", 2) == 0
+            assert engine.prefetch("docker", "advanced", 1) == 0
+            assert queue_status()["queued"] == 1
+        finally:
+            _release_lock(lock)
+        assert engine.prefetch("git", "beginner") == 20  # Both queued keys
+        assert queue_status()["queued"] == 0
+        assert collect()["histograms"]["prefetch_wait_seconds"]
+
+
+def test_threads_sharing_one_engine_never_pick_the_same_tip(dev_tip_home, tmp_path):
+    engine = TipEngine(tmp_path / "state")
+    served: list[str] = []
+    errors = []
+
+    def serve() -> None:
+        try:
+            for _ in range(3):
+                served.append(engine.next_tip(topic="git").tip["id"])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=serve) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(served) == len(set(served)) == 12  # Fewer than the 15 git tips, so no reset
+
+
+def test_threads_sharing_one_engine_keep_every_tip(dev_tip_home, tmp_path):
+    from dev_tip.ai.cache import is_on_cooldown, save_cache
+    from dev_tip.statefile import recoveries
+
+    state = tmp_path / "state"
+    engine = TipEngine(state, config={"ai_provider": "fake"})
+    errors = []
+
+    def write(n: int) -> None:
+        try:
+            with use_state_dir(state):
+                for i in range(40):
+                    save_cache([{"id": f"t{n}-{i}", "title": f"Tip {n} {i}", "body": "b"}], "git", "beginner")
+            for _ in range(5):
+                engine.next_tip(topic="sql", level="advanced")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    with use_state_dir(state):
+        assert len(load_cache("git", "beginner")) == 160
+        assert recoveries() == [] and not is_on_cooldown()
+    assert not list(state.glob("*.corrupt-*"))
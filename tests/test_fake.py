@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+import random
+import urllib.error
+
+import pytest
+
+from dev_tip.ai import get_ai_tip
+from dev_tip.ai.cache import is_on_cooldown, load_cache
+from dev_tip.ai.fake import FakeProvider, FaultProfile, StandInServer
+from dev_tip.ai.gemini import DEFAULT_MODEL
+from dev_tip.ai.provider import create_provider, schema_unsupported
+
+
+def test_fault_profile_parse():
+    profile = FaultProfile.parse("latency_ms=20,jitter_ms=5,distribution=lognormal,rate_limit_rate=0.5,seed=3")
+    assert profile.latency_ms == 20
+    assert profile.distribution == "lognormal"
+    assert profile.rate_limit_rate == 0.5
+    assert profile.seed == 3
+    assert FaultProfile.parse(None) == FaultProfile()
+    with pytest.raises(ValueError):
+        FaultProfile.parse("bogus=1")
+
+
+def test_fault_profile_rates():
+    profile = FaultProfile(error_rate=0.2, malformed_rate=0.3)
+    rng = random.Random(0)
+    faults = [profile.sample_fault(rng) for _ in range(10_000)]
+    assert 0.17 < faults.count("error") / len(faults) < 0.23
+    assert 0.27 < faults.count("malformed") / len(faults) < 0.33
+    assert "rate_limit" not in faults
+
+
+def test_fake_provider_registered():
+    provider = create_provider("fake", "", model="seed=1")
+    tips = provider.generate_tips("git", "advanced", 4)
+    assert len(tips) == 4
+    assert all(t["topic"] == "git" and t["level"] == "advanced" for t in tips)
+    assert all(t["id"].startswith("ai-") for t in tips)
+
+
+@pytest.mark.parametrize("spec, error", [
+    ("error_rate=1", urllib.error.URLError),
+    ("rate_limit_rate=1", urllib.error.HTTPError),
+    ("malformed_rate=1", json.JSONDecodeError),
+    ("truncated_rate=1", json.JSONDecodeError),
+])
+def test_fake_provider_faults(spec, error):
+    with pytest.raises(error):
+        FakeProvider(model=spec).generate_tips(None, None, 3)
+
+
+@pytest.mark.parametrize("name", ["gemini", "openrouter"])
+def test_stand_in_server_wire_formats(name):
+    with StandInServer(FaultProfile(seed=7)) as server:
+        provider = create_provider(name, "test-key", base_url=server.url)
+        tips = provider.generate_tips("docker", "beginner", 3)
+    assert len(tips) == 3
+    assert all(t["topic"] == "docker" for t in tips)
+    assert server.stats == {"requests": 1, "ok": 1}
+
+
+def test_stand_in_server_rate_limit_triggers_cooldown(dev_tip_home):
+    config = {"ai_provider": "gemini", "ai_key": "k"}
+    with StandInServer(FaultProfile(rate_limit_rate=1)) as server:
+        config["ai_base_url"] = server.url
+        assert get_ai_tip("python", None, config) == (None, 0)
+        assert is_on_cooldown()
+        assert get_ai_tip("python", None, config) == (None, 0)
+    assert server.stats == {"requests": 1, "rate_limit": 1}
+
+
+def test_get_ai_tip_with_fake_provider(dev_tip_home):
+    tip, unseen = get_ai_tip("sql", None, {"ai_provider": "fake"})
+    assert tip is not None
+    assert tip["topic"] == "sql"
+    assert unseen == 10
+    assert len(load_cache("sql", None)) == 10
+
+
+@pytest.mark.parametrize("name", ["gemini", "openrouter", "local"])
+def test_stand_in_server_structured_output(name):
+    with StandInServer(FaultProfile(seed=7)) as server:
+        base_url = server.url + "/v1" if name == "local" else server.url
+        provider = create_provider(name, "test-key", base_url=base_url)
+        tips = provider.generate_tips("docker", "beginner", 3)
+    assert len(tips) == 3
+    assert all(t["topic"] == "docker" and t["level"] == "beginner" for t in tips)
+    assert all(t["title"].startswith("Stand-in") and t["source"] == "ai" for t in tips)
+    assert provider.last_usage["output_tokens"] > 0
+
+
+@pytest.mark.parametrize("name", ["gemini", "openrouter", "local"])
+def test_structured_output_falls_back_to_free_form(name, dev_tip_home):
+    with StandInServer(FaultProfile(seed=7)) as server:
+        server.schema_support = False
+        base_url = server.url + "/v1" if name == "local" else server.url
+        provider = create_provider(name, "test-key", base_url=base_url)
+        assert len(provider.generate_tips("git", None, 2)) == 2
+        assert len(provider.generate_tips("git", None, 2)) == 2
+        # The next run remembers the model and goes free-form straight away
+        again = create_provider(name, "test-key", base_url=base_url)
+        assert len(again.generate_tips("git", None, 2)) == 2
+    # One rejected structured attempt, then free-form from then on
+    assert server.stats == {"requests": 3, "ok": 3}
+
+
+def test_bad_key_is_not_a_schema_rejection(dev_tip_home):
+    with StandInServer() as server:
+        server.api_key = "good-key"
+        provider = create_provider("gemini", "bad-key", base_url=server.url)
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            provider.generate_tips("git", None, 2)
+        assert exc.value.code == 400
+        assert server.connections == 1  # No free-form retry
+        assert not schema_unsupported("gemini", DEFAULT_MODEL)
+        provider = create_provider("gemini", "good-key", base_url=server.url)
+        assert len(provider.generate_tips("git", None, 2)) == 2
+    assert server.stats == {"requests": 1, "ok": 1}
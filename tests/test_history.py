@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-from dev_tip.history import _load_history, get_unseen, mark_seen
+import json
+import multiprocessing
+import os
+
+from dev_tip.history import _load_history, compact, get_unseen, mark_seen
 
 
 def test_mark_seen_and_unseen(dev_tip_home):
@@ -28,3 +32,114 @@ def test_no_duplicate_marks(dev_tip_home):
     mark_seen("x")
     history = _load_history()
     assert history.count("x") == 1
+
+
+def _on(monkeypatch, host):
+    monkeypatch.setattr("dev_tip.history.HOST", host)
+
+
+def test_hosts_write_own_segments_and_merge_in_time_order(dev_tip_home, monkeypatch):
+    for host, tip_id in (("a", "1"), ("b", "2"), ("a", "3"), ("b", "1")):
+        _on(monkeypatch, host)
+        mark_seen(tip_id)
+    segments = dev_tip_home / "history.d"
+    assert sorted(p.name for p in segments.glob("*.log")) == ["a.log", "b.log"]
+    assert not (dev_tip_home / "history.json").exists()
+    assert _load_history() == ["1", "2", "3"]
+
+    # A reset on one host clears what every host marked before it
+    _on(monkeypatch, "b")
+    assert [t["id"] for t in get_unseen([{"id": "1"}, {"id": "2"}, {"id": "3"}])] == ["1", "2"]
+    assert _load_history() == ["3"]
+
+
+def test_cached_view_follows_appends_and_survives_corruption(dev_tip_home, monkeypatch):
+    _on(monkeypatch, "a")
+    mark_seen("x")
+    assert _load_history() == ["x"]
+    view = dev_tip_home / "history.d" / ".a.view"
+    assert view.exists()
+
+    _on(monkeypatch, "b")
+    mark_seen("y")
+    with open(dev_tip_home / "history.d" / "b.log", "a") as f:
+        f.write("123")  # Torn line from a writer still in progress
+    assert _load_history() == ["x", "y"]
+    view.write_bytes(b"garbage")
+    assert _load_history() == ["x", "y"]
+
+
+def test_late_events_replay_in_time_order_over_the_view(dev_tip_home, monkeypatch):
+    _on(monkeypatch, "a")
+    mark_seen("x")
+    mark_seen("y")
+    assert _load_history() == ["x", "y"]
+    segments = dev_tip_home / "history.d"
+    (x_stamp, _, _), (y_stamp, _, _) = (line.split("\t") for line in (segments / "a.log").read_text().splitlines())
+
+    # Host b's clock runs behind: its reset sorts between the two marks, so "y" stays seen
+    (segments / "b.log").write_text(f"{int(y_stamp) - 1}\t!\tx\n")
+    assert _load_history() == ["x", "y"]
+    with open(segments / "b.log", "a") as f:
+        f.write(f"{int(x_stamp) - 1}\t+\tz\n")
+    assert _load_history() == ["x", "y"]  # Marked before the reset, so wiped by it
+    (segments / ".a.view").unlink()
+    assert _load_history() == ["x", "y"]
+
+
+def test_compaction_folds_own_and_idle_segments(dev_tip_home, monkeypatch):
+    segments = dev_tip_home / "history.d"
+    _on(monkeypatch, "old")
+    mark_seen("o1")
+    mark_seen("o1")
+    os.utime(segments / "old.log", (0, 0))
+    _on(monkeypatch, "busy")
+    mark_seen("b1")
+    _on(monkeypatch, "me")
+    for tip_id in ("m1", "m2", "m1"):
+        mark_seen(tip_id)
+    before = _load_history()
+
+    assert compact() == 2
+    assert sorted(p.name for p in segments.glob("*.log")) == ["_base.log", "busy.log"]
+    assert len((segments / "_base.log").read_text().splitlines()) == 3  # o1, m1, m2
+    assert _load_history() == before == ["o1", "b1", "m1", "m2"]
+
+
+def test_compaction_runs_automatically_and_drops_pre_reset_lines(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.history.COMPACT_BYTES", 200)
+    for n in range(20):
+        mark_seen(f"tip-{n}")
+    get_unseen([{"id": "tip-19"}])  # Everything seen: reset, keeping tip-19
+    for n in range(20, 30):
+        mark_seen(f"tip-{n}")
+    assert _load_history() == ["tip-19"] + [f"tip-{n}" for n in range(20, 30)]
+    total = sum(p.stat().st_size for p in (dev_tip_home / "history.d").glob("*.log"))
+    assert total < 600
+
+
+def test_legacy_history_file_is_migrated(dev_tip_home):
+    (dev_tip_home / "history.json").write_text(json.dumps(["a", "b"]))
+    mark_seen("c")
+    assert _load_history() == ["a", "b", "c"]
+    assert not (dev_tip_home / "history.json").exists()
+
+
+def _mark_many(segments, host, count):
+    import dev_tip.history as history
+
+    history.HISTORY_SEGMENTS = segments
+    history.HOST = host
+    for n in range(count):
+        history.mark_seen(f"{host}-{n}")
+
+
+def test_concurrent_hosts_lose_nothing(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.history.COMPACT_BYTES", 2000)  # Compactions race the other writers
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_mark_many, args=(dev_tip_home / "history.d", f"h{i}", 150)) for i in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert len(_load_history()) == 600
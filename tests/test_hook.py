@@ -25,6 +25,8 @@ def test_build_hook_command_all_args():
 def test_build_hook_block_zsh():
     block = _build_hook_block("zsh", "dev-tip", 15, 30)
     assert "precmd" in block
+    assert "add-zsh-hook preexec" in block
+    assert '--context "$_dt_w1 $_dt_w2"' in block
     assert "add-zsh-hook" in block
     assert "[ -f" in block
     assert ".paused" in block
@@ -66,3 +68,78 @@ def test_enable_disable_roundtrip(dev_tip_home, monkeypatch):
     content = rc_file.read_text()
     assert HOOK_MARKER_START not in content
     assert "# existing content" in content
+
+
+def test_enable_pre_caches_for_keyless_provider(dev_tip_home, monkeypatch):
+    from dev_tip.hook import enable
+
+    spawned = []
+    monkeypatch.setattr("dev_tip.hook._get_rc_file", lambda: dev_tip_home.parent / ".zshrc")
+    monkeypatch.setattr("dev_tip.hook._detect_shell", lambda: "zsh")
+    monkeypatch.setattr("dev_tip.prefetch.spawn", lambda topic, level, config, provider: spawned.append(topic) or True)
+
+    enable(topic="git")
+    assert spawned == []  # No provider configured
+    enable(provider="fake", topic="git")
+    assert spawned == ["git"]
+
+
+def test_build_hook_command_quotes_topic_mix():
+    cmd = _build_hook_command(topic="python:60,*:40", level="beginner,intermediate")
+    assert "--topic 'python:60,*:40'" in cmd
+    assert "--level beginner,intermediate" in cmd
+
+
+def test_bash_hook_passes_last_command_words():
+    import shutil
+    import subprocess
+
+    import pytest
+
+    if not shutil.which("bash"):
+        pytest.skip("bash not available")
+    block = _build_hook_block("bash", "echo ran", 15, 30)
+    script = f"set -o history\n{block}\n_DEV_TIP_CMD_COUNT=99\nhistory -s 'kubectl get pods -A'\n_dev_tip_prompt\n"
+    out = subprocess.run(["bash", "-c", script], capture_output=True, text=True, check=True)
+    assert out.stdout == "ran --context kubectl get\n"
+
+
+def test_shared_schedule_counts_commands_across_shells(dev_tip_home, monkeypatch):
+    import shutil
+    import subprocess
+
+    import pytest
+
+    from dev_tip.config import load_config
+    from dev_tip.hook import SCHEDULE_FILE, enable
+
+    if not shutil.which("bash"):
+        pytest.skip("bash not available")
+    rc_file = dev_tip_home.parent / ".bashrc"
+    monkeypatch.setattr("dev_tip.hook._get_rc_file", lambda: rc_file)
+    monkeypatch.setattr("dev_tip.hook._detect_shell", lambda: "bash")
+    enable(every_commands=3, every_minutes=60, shared_schedule=True)
+    block = _build_hook_block("bash", "echo ran", 3, 60, shared_schedule=True)
+    assert "_DEV_TIP_CMD_COUNT" not in block and str(SCHEDULE_FILE) in block
+
+    def prompts(n: int) -> str:
+        """Open a new shell and show n prompts in it."""
+        script = f"set -o history\n{block}\nhistory -s 'git log'\n" + "_dev_tip_prompt\n" * n
+        return subprocess.run(["bash", "-c", script], capture_output=True, text=True, check=True).stdout
+
+    # Enabling makes a tip due; after that a new shell no longer starts with one
+    assert prompts(1) == "ran --context git log\n"
+    assert prompts(2) == ""
+    assert SCHEDULE_FILE.read_text().endswith("\nxx")
+    assert prompts(1) == "ran --context git log\n"  # The third command overall
+    assert SCHEDULE_FILE.read_text().endswith("\n")
+
+    # A garbled or half-written schedule restarts instead of showing a tip
+    for garbled in ("17000", "x\n", ""):
+        SCHEDULE_FILE.write_text(garbled)
+        assert prompts(3) == ""
+        assert SCHEDULE_FILE.read_text().endswith("\nxx")
+
+    assert load_config()["shared_schedule"] is True
+    enable()  # Keeps the saved mode
+    assert str(SCHEDULE_FILE) in rc_file.read_text()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import json
+import time
+import urllib.error
+
+import pytest
+
+from dev_tip.ai.fake import FaultProfile, StandInServer, UnixStandInServer
+from dev_tip.ai.local import LocalProvider
+from dev_tip.ai.provider import create_provider
+
+
+def test_create_local_provider():
+    assert isinstance(create_provider("local", ""), LocalProvider)
+    with pytest.raises(ValueError):
+        LocalProvider(base_url="ftp://example.com")
+
+
+def test_generation_over_http_reuses_connections():
+    with StandInServer(FaultProfile(seed=1)) as server:
+        provider = LocalProvider(base_url=server.url + "/v1", max_in_flight=2)
+        first = provider.generate_tips("rust", "beginner", 10)
+        second = provider.generate_tips("rust", "beginner", 10)
+        provider.close()
+    assert len(first) == len(second) == 10
+    assert all(t["topic"] == "rust" for t in first + second)
+    assert server.stats["requests"] == 4
+    assert server.connections == 2
+
+
+def test_requests_run_in_flight_concurrently():
+    with StandInServer(FaultProfile(latency_ms=300, distribution="fixed")) as server:
+        provider = LocalProvider(base_url=server.url + "/v1", max_in_flight=4)
+        start = time.perf_counter()
+        results = provider.generate_many([("git", None, 3), ("sql", None, 3), ("vim", None, 3)])
+        elapsed = time.perf_counter() - start
+    assert [r[0]["topic"] for r in results] == ["git", "sql", "vim"]
+    assert elapsed < 0.8
+
+
+def test_generation_over_unix_socket(tmp_path):
+    with UnixStandInServer(str(tmp_path / "llm.sock")) as server:
+        provider = create_provider("local", "", base_url=server.url)
+        tips = provider.generate_tips("docker", None, 5)
+    assert len(tips) == 5
+    assert server.stats == {"requests": 1, "ok": 1}
+
+
+def test_usage_is_summed_over_chunks():
+    provider = LocalProvider(max_in_flight=3)
+    content = json.dumps([{"title": "T", "body": "B", "topic": "git", "level": "beginner"}])
+    answer = {"choices": [{"message": {"content": content}}], "usage": {"prompt_tokens": 7, "completion_tokens": 3}}
+    provider._post = lambda payload: answer
+    assert len(provider.generate_tips("git", None, 15)) == 3  # One tip per chunk
+    assert provider.last_usage == {"prompt_tokens": 21, "output_tokens": 9}
+
+
+def test_zero_tips_asked_for():
+    assert LocalProvider(base_url="http://127.0.0.1:9/v1").generate_tips("git", None, 0) == []
+
+
+def test_all_chunks_failing_raises():
+    with StandInServer(FaultProfile(rate_limit_rate=1)) as server:
+        provider = LocalProvider(base_url=server.url + "/v1")
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            provider.generate_tips(None, None, 10)
+    assert exc.value.code == 429
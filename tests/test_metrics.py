@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+
+from typer.testing import CliRunner
+
+from dev_tip import metrics
+from dev_tip.cli import app
+
+runner = CliRunner()
+
+
+def test_counters_and_histograms_fold(dev_tip_home):
+    metrics.incr("tips_served", {"source": "static"})
+    metrics.incr("tips_served", {"source": "static"})
+    metrics.incr("tips_served", {"source": "ai"})
+    metrics.observe("api_latency_seconds", 0.3, {"provider": "gemini"})
+    metrics.observe("api_latency_seconds", 7.0, {"provider": "gemini"})
+
+    data = metrics.fold()
+    assert data["counters"]["tips_served"] == {"source=static": 2, "source=ai": 1}
+    hist = data["histograms"]["api_latency_seconds"]["provider=gemini"]
+    assert hist["count"] == 2
+    assert hist["sum"] == 7.3
+    assert hist["buckets"] == [0, 0, 1, 1, 1, 1, 2, 2]  # cumulative
+    assert not metrics.METRICS_LOG.exists()
+
+    # Later increments add to the folded snapshot
+    metrics.incr("tips_served", {"source": "ai"})
+    assert metrics.fold()["counters"]["tips_served"]["source=ai"] == 2
+
+
+def test_queue_waits_have_their_own_buckets(dev_tip_home):
+    metrics.observe("prefetch_wait_seconds", 0.5)
+    metrics.observe("prefetch_wait_seconds", 240.0)
+    hist = metrics.fold()["histograms"]["prefetch_wait_seconds"][""]
+    assert hist["le"] == list(metrics.QUEUE_WAIT_BUCKETS)
+    assert hist["buckets"] == [1, 1, 1, 1, 2, 2, 2, 2]  # Minutes land below +Inf
+    text = metrics.to_openmetrics(metrics.collect())
+    assert 'dev_tip_prefetch_wait_seconds_bucket{le="300.0"} 2' in text
+
+
+def test_torn_lines_are_ignored(dev_tip_home):
+    metrics.incr("prefetch_spawns")
+    with open(metrics.METRICS_LOG, "a") as f:
+        f.write("c\tprefetch_sp")
+    assert metrics.fold()["counters"] == {"prefetch_spawns": {"": 1}}
+
+
+def test_log_folds_when_large(dev_tip_home, monkeypatch):
+    monkeypatch.setattr(metrics, "FOLD_BYTES", 200)
+    for _ in range(20):
+        metrics.incr("tips_served", {"source": "static"})
+    assert metrics.METRICS_FILE.exists()
+    assert metrics.METRICS_LOG.stat().st_size <= 200
+    assert metrics.fold()["counters"]["tips_served"]["source=static"] == 20
+
+
+def test_record_api_call_outcomes(dev_tip_home):
+    import urllib.error
+
+    metrics.record_api_call("gemini", 0.2)
+    metrics.record_api_call("gemini", 0.2, json.JSONDecodeError("x", "", 0))
+    metrics.record_api_call("gemini", 0.2, urllib.error.HTTPError("u", 429, "r", {}, None))
+    counters = metrics.fold()["counters"]
+    assert counters["api_calls"] == {
+        "outcome=ok,provider=gemini": 1,
+        "outcome=parse_error,provider=gemini": 1,
+        "outcome=rate_limited,provider=gemini": 1,
+    }
+    assert counters["parse_failures"] == {"provider=gemini": 1}
+
+
+def _hammer(log, snapshot, n):
+    metrics.METRICS_LOG, metrics.METRICS_FILE, metrics.FOLD_BYTES = log, snapshot, 512
+    for _ in range(n):
+        metrics.incr("tips_served", {"source": "static"})
+
+
+def test_concurrent_writers_lose_nothing(dev_tip_home):
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_hammer, args=(metrics.METRICS_LOG, metrics.METRICS_FILE, 200)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert metrics.fold()["counters"]["tips_served"]["source=static"] == 800
+
+
+def test_openmetrics_format(dev_tip_home):
+    metrics.incr("api_calls", {"provider": "gemini", "outcome": "ok"})
+    metrics.observe("api_latency_seconds", 0.3, {"provider": "gemini"})
+    text = metrics.to_openmetrics(metrics.collect({"state_bytes": 1234}))
+    assert "# TYPE dev_tip_api_calls counter" in text
+    assert 'dev_tip_api_calls_total{outcome="ok",provider="gemini"} 1' in text
+    assert 'dev_tip_api_latency_seconds_bucket{provider="gemini",le="0.25"} 0' in text
+    assert 'dev_tip_api_latency_seconds_bucket{provider="gemini",le="+Inf"} 1' in text
+    assert 'dev_tip_api_latency_seconds_count{provider="gemini"} 1' in text
+    assert "dev_tip_state_bytes 1234" in text
+    assert text.endswith("# EOF\n")
+
+
+def test_label_values_are_escaped(dev_tip_home):
+    model = 'org/model,v=2 "fast"\\x\tnew\nline'
+    metrics.incr("api_calls", {"provider": model, "outcome": "ok"})
+    metrics.incr("api_calls", {"provider": model, "outcome": "ok"})
+    data = metrics.fold()
+    (key,) = data["counters"]["api_calls"]
+    assert data["counters"]["api_calls"][key] == 2
+    assert metrics._parse_labels(key) == [("outcome", "ok"), ("provider", model)]
+    text = metrics.to_openmetrics(data)
+    assert 'dev_tip_api_calls_total{outcome="ok",provider="org/model,v=2 \\"fast\\"\\\\x\tnew\\nline"} 2' in text
+
+
+def test_cli_counts_tips_and_status_json(dev_tip_home, tmp_path):
+    runner.invoke(app, [])
+    runner.invoke(app, [])
+    prom = tmp_path / "dev_tip.prom"
+    result = runner.invoke(app, ["status", "--json", "--textfile", str(prom)])
+    assert result.exit_code == 0
+    data = json.loads(result.output)
+    assert data["history"]["tips_seen"] == 2
+    assert data["metrics"]["counters"]["tips_served"] == {"source=static": 2}
+    assert data["metrics"]["gauges"]["state_bytes"] > 0
+    assert 'dev_tip_tips_served_total{source="static"} 2' in prom.read_text()
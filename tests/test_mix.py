@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import random
+from collections import Counter
+
+import pytest
+
+from dev_tip.mix import AliasTable, BucketSampler, bucket_sampler, choose, mix_names, parse_mix
+from dev_tip.tips import get_random_tip, load_tips
+
+# 99.9th percentile of chi-square; keeps the statistical tests deterministic in practice
+_CHI2_999 = {1: 10.83, 2: 13.82, 3: 16.27, 4: 18.47, 5: 20.52, 9: 27.88}
+
+
+def _chi_square(observed: Counter, expected: dict, draws: int) -> float:
+    return sum((observed[k] - p * draws) ** 2 / (p * draws) for k, p in expected.items())
+
+
+def test_parse_mix():
+    assert parse_mix(None) == ()
+    assert parse_mix("python") == (("python", 1.0),)
+    assert parse_mix("python:60, kubernetes:30,*:10") == (("python", 60.0), ("kubernetes", 30.0), ("*", 10.0))
+    assert parse_mix(["git", "docker:2"]) == (("git", 1.0), ("docker", 2.0))
+    assert mix_names("python:60,*:40") == ["python"]
+    for bad in ("python:0", "python:x", "python:-1", ":5", "git,git"):
+        with pytest.raises(ValueError):
+            parse_mix(bad)
+
+
+def test_alias_table_distribution():
+    weights = [5, 1, 0, 3, 1]
+    table = AliasTable(weights)
+    rng = random.Random(42)
+    draws = 100_000
+    counts = Counter(table.sample(rng) for _ in range(draws))
+    assert counts[2] == 0
+    expected = {i: w / sum(weights) for i, w in enumerate(weights) if w}
+    assert _chi_square(counts, expected, draws) < _CHI2_999[3]
+
+
+def test_alias_table_rejects_empty():
+    with pytest.raises(ValueError):
+        AliasTable([])
+    with pytest.raises(ValueError):
+        AliasTable([0, 0])
+
+
+def test_bucket_sampler_follows_topic_mix():
+    tips = load_tips()
+    buckets = Counter((t["topic"], t["level"]) for t in tips)
+    sampler = BucketSampler(tuple((t, lv, n) for (t, lv), n in buckets.items()),
+                            parse_mix("python:60,kubernetes:30,*:10"), ())
+    rng = random.Random(7)
+    draws = 50_000
+    topics = Counter(sampler.sample(rng)[0] for _ in range(draws))
+    grouped = Counter({
+        "python": topics["python"],
+        "kubernetes": topics["kubernetes"],
+        "*": draws - topics["python"] - topics["kubernetes"],
+    })
+    assert _chi_square(grouped, {"python": 0.6, "kubernetes": 0.3, "*": 0.1}, draws) < _CHI2_999[2]
+
+
+def test_bucket_sampler_uniform_within_cell():
+    # One topic entry over buckets of sizes 1 and 3: tips stay equally likely
+    sampler = BucketSampler((("git", "beginner", 1), ("git", "advanced", 3)), parse_mix("git"), ())
+    rng = random.Random(3)
+    draws = 40_000
+    counts = Counter(sampler.sample(rng)[1] for _ in range(draws))
+    assert _chi_square(counts, {"beginner": 0.25, "advanced": 0.75}, draws) < _CHI2_999[1]
+
+
+def test_bucket_sampler_drops_empty_entries():
+    sampler = bucket_sampler([("git", "beginner", 4)], "git:1,haskell:99", "beginner,advanced")
+    assert sampler.buckets == [("git", "beginner")]
+    assert not bucket_sampler([("git", "beginner", 4)], "haskell", None)
+
+
+def test_bucket_sampler_memoized():
+    buckets = [("git", "beginner", 4), ("sql", "advanced", 2)]
+    assert bucket_sampler(buckets, "git:2,sql:1", None) is bucket_sampler(list(buckets), "git:2,sql:1", None)
+
+
+def test_choose():
+    rng = random.Random(1)
+    assert choose(None, rng) is None
+    assert choose("python", rng) == "python"
+    picks = Counter(choose("python:3,*:1", rng) for _ in range(20_000))
+    assert set(picks) == {"python", None}
+    assert 0.72 < picks["python"] / 20_000 < 0.78
+
+
+def test_get_random_tip_with_lists():
+    tips = load_tips()
+    for _ in range(50):
+        tip = get_random_tip(tips, topic=["git", "sql"], level="beginner,advanced")
+        assert tip["topic"] in {"git", "sql"} and tip["level"] in {"beginner", "advanced"}
+    assert get_random_tip(tips, topic="nonexistent") is None
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typer.testing import CliRunner
+
+from dev_tip.cli import app
+from dev_tip.packs import compile_packs, merge_packs
+from dev_tip.store import _source_files, open_store
+from dev_tip.tips import load_tips
+
+runner = CliRunner()
+
+
+def _pack(prefix: str, n: int, topic: str = "runbooks") -> str:
+    return "".join(
+        f"- id: {prefix}-{i}\n  topic: {topic}\n  level: beginner\n  title: T{i}\n  body: {prefix} body {i}\n"
+        for i in range(n)
+    )
+
+
+def _write_packs(home, **packs):
+    directory = home / "packs"
+    directory.mkdir(exist_ok=True)
+    for name, text in packs.items():
+        (directory / f"{name}.yaml").write_text(text)
+
+
+def test_build_reports_errors_and_duplicates(dev_tip_home):
+    bundled_id = load_tips()[0]["id"]
+    bad = _pack("ops", 2) + f"- id: {bundled_id}\n  topic: git\n  level: beginner\n  title: X\n  body: Y\n"
+    bad += "- id: ops-9\n  topic: runbooks\n  level: expert\n  title: X\n  body: Y\n"
+    _write_packs(dev_tip_home, ops=bad, broken="- id: [unclosed\n")
+
+    result = runner.invoke(app, ["packs", "build", "--jobs", "1"])
+    assert result.exit_code == 1
+    assert "ops.yaml: 2 tips, 1 errors, 1 duplicate ids" in result.output
+    assert "unknown level 'expert'" in result.output
+    assert f"{bundled_id}: already defined in tips.yaml" in result.output
+    assert "broken.yaml: 0 tips, 1 errors" in result.output and "invalid YAML" in result.output
+
+    # The valid tips still made it into the store
+    with open_store() as store:
+        assert sorted(store.tip_id(i) for i in store.find(topic="runbooks")) == ["ops-0", "ops-1"]
+        assert len(store) == len(load_tips()) + 2
+
+
+def test_only_changed_packs_are_recompiled(dev_tip_home):
+    _write_packs(dev_tip_home, a=_pack("a", 3), b=_pack("b", 3))
+    first = compile_packs(_source_files())
+    assert [r.cached for r in first] == [False, False, False]
+
+    _write_packs(dev_tip_home, b=_pack("b", 4))
+    second = compile_packs(_source_files())
+    assert [r.cached for r in second] == [True, True, False]
+    assert [len(r.tips) for r in second] == [len(load_tips()), 3, 4]
+    # The entry for the old version of b.yaml is pruned
+    assert len(list((dev_tip_home / "packs.cache").glob("*.bin"))) == 3
+
+
+def test_parallel_build_matches_serial(dev_tip_home):
+    _write_packs(dev_tip_home, a=_pack("a", 5), b=_pack("b", 5), c=_pack("a", 2))
+    parallel = merge_packs(compile_packs(_source_files(), jobs=2))
+    for path in (dev_tip_home / "packs.cache").iterdir():
+        path.unlink()
+    serial_results = compile_packs(_source_files(), jobs=1)
+    assert merge_packs(serial_results) == parallel
+    assert serial_results[-1].duplicates == [("a-0", "a.yaml"), ("a-1", "a.yaml")]
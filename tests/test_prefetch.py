@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+
+from dev_tip.ai.cache import load_cache, mark_failure
+from dev_tip.ai.fake import FakeProvider
+from dev_tip.prefetch import (
+    _acquire_lock,
+    _lock_is_held,
+    _release_lock,
+    drain,
+    enqueue,
+    queue_status,
+    run,
+    spawn,
+)
+
+FAKE = {"ai_provider": "fake"}
+
+
+def _lock_path(home):
+    return home / ".prefetch.lock"
+
+
+def test_lock_roundtrip(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    assert _acquire_lock()
+    assert _lock_is_held(_lock_path(dev_tip_home))
+    assert not _acquire_lock()
+    _release_lock()
+    assert not _lock_is_held(_lock_path(dev_tip_home))
+
+
+def test_lock_is_exclusive_across_processes_and_dies_with_holder(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    # A lock file from an older version, or a crashed worker, is not a lock
+    _lock_path(dev_tip_home).write_text(json.dumps({"pid": os.getpid(), "time": time.time()}))
+    assert not _lock_is_held(_lock_path(dev_tip_home))
+
+    ready, done = os.pipe(), os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(ready[1], b"1" if _acquire_lock() else b"0")
+        os.read(done[0], 1)
+        os._exit(0)  # Dies holding the lock
+    assert os.read(ready[0], 1) == b"1"
+    assert _lock_is_held(_lock_path(dev_tip_home)) and not _acquire_lock()
+    os.write(done[1], b"x")
+    os.waitpid(pid, 0)
+    assert _acquire_lock()
+    _release_lock()
+
+
+def test_run_fills_cache(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    run("git", None, FAKE)
+    assert len(load_cache("git", None)) == 10
+    assert not _lock_is_held(_lock_path(dev_tip_home))
+
+
+def test_spawn_skipped_when_lock_held(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    monkeypatch.setattr("os.fork", lambda: (_ for _ in ()).throw(AssertionError("forked")))
+    assert _acquire_lock()
+    assert spawn("git", None, FAKE) is False
+    # Queued for the running worker instead of dropped
+    assert queue_status()["queued"] == 1
+    _release_lock()
+    assert drain(FAKE) == 10
+    assert len(load_cache("git", None)) == 10 and queue_status()["queued"] == 0
+
+
+def test_spawn_skipped_on_cooldown(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    monkeypatch.setattr("os.fork", lambda: (_ for _ in ()).throw(AssertionError("forked")))
+    mark_failure()
+    assert spawn("git", None, FAKE) is False
+
+
+def test_spawn_forks_detached_worker(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    assert spawn("docker", "advanced", FAKE) is True
+
+    deadline = time.time() + 10
+    tips: list = []
+    while not tips and time.time() < deadline:
+        time.sleep(0.05)
+        try:
+            tips = load_cache("docker", "advanced")
+        except ValueError:
+            pass  # Caught the worker mid-write
+    assert len(tips) == 10
+
+
+def test_subprocess_worker_keeps_the_state_dir(dev_tip_home, tmp_path, monkeypatch):
+    import subprocess
+
+    from dev_tip import prefetch
+    from dev_tip.state import active_state_dir, use_state_dir
+
+    launched = []
+    monkeypatch.delattr(os, "fork", raising=False)
+    monkeypatch.setattr(subprocess, "Popen", lambda args, **kwargs: launched.append(kwargs["env"]))
+    state = tmp_path / "state"
+    with use_state_dir(state):
+        assert spawn("git", "beginner", FAKE) is True
+    assert launched[0][prefetch.STATE_DIR_ENV] == str(state)
+
+    drained = []
+    monkeypatch.setenv(prefetch.STATE_DIR_ENV, str(state))
+    monkeypatch.setattr("sys.argv", ["dev_tip.prefetch"])
+    monkeypatch.setattr(prefetch, "drain", lambda config: drained.append(active_state_dir()))
+    prefetch.main()
+    assert drained == [state]
+
+
+def test_forked_worker_reuses_the_callers_provider(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    # Without a key the worker could not make a provider of its own
+    assert spawn("docker", "advanced", {"ai_provider": "gemini"}, provider=FakeProvider()) is True
+
+    deadline = time.time() + 10
+    tips: list = []
+    while not tips and time.time() < deadline:
+        time.sleep(0.05)
+        try:
+            tips = load_cache("docker", "advanced")
+        except ValueError:
+            pass  # Caught the worker mid-write
+    assert len(tips) == 10
+
+
+def _generation_yield(monkeypatch, home, avoid: bool) -> tuple[float, float]:
+    from dev_tip.ai.fake import FaultProfile, StandInServer
+    from dev_tip.metrics import collect
+
+    if not avoid:
+        monkeypatch.setattr("dev_tip.ai.prompt.avoid_digest", lambda titles: [])
+    with StandInServer(FaultProfile(title_pool=200, seed=3)) as server:
+        config = {"ai_provider": "gemini", "ai_key": "k", "ai_base_url": server.url}
+        for _ in range(6):
+            run("python", "beginner", config)
+    counters = collect()["counters"]
+    new = counters["ai_tips_generated"]["provider=gemini,result=new"]
+    assert new == len(load_cache("python", "beginner"))
+    return counters["api_calls"]["outcome=ok,provider=gemini"], new
+
+
+def test_avoid_list_raises_yield_per_call(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    calls, new_with = _generation_yield(monkeypatch, dev_tip_home, avoid=True)
+    for name in ("ai_cache.json", "metrics.json"):
+        (dev_tip_home / name).unlink()
+    calls_without, new_without = _generation_yield(monkeypatch, dev_tip_home, avoid=False)
+
+    assert calls == calls_without == 6
+    # Fewer API calls per unique tip when the model is told what is cached
+    assert calls / new_with < 0.6 * calls_without / new_without
+
+
+def test_queue_dedupes_by_key(dev_tip_home):
+    enqueue("git", "beginner", unseen=3)
+    first = queue_status()
+    enqueue("git", "beginner", unseen=1)
+    enqueue("git", "beginner", unseen=2)
+    enqueue("sql", None, unseen=0)
+    (job,) = (dev_tip_home / "prefetch.d").glob("git*.job")
+    queued = json.loads(job.read_text())
+    assert queued["unseen"] == 1 and time.time() - queued["queued_at"] >= first["oldest_wait_seconds"]
+    assert queue_status()["queued"] == 2
+
+
+class _RecordingProvider:
+    """Records the order of calls and how many overlap."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.calls: list[tuple] = []
+        self.in_flight = self.max_in_flight = 0
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def generate_tips(self, topic, level, count, avoid=None):
+        with self._lock:
+            self.calls.append((topic, level))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self._lock:
+            self.in_flight -= 1
+        if self.fail:
+            raise OSError("down")
+        return FakeProvider().generate_tips(topic, level, count)
+
+
+def test_drain_most_depleted_first_under_limit(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    monkeypatch.setattr("dev_tip.prefetch.CONCURRENCY", 2)
+    for unseen, topic in [(3, "sql"), (0, "git"), (2, "docker"), (1, "python"), (3, "vim")]:
+        enqueue(topic, "beginner", unseen)
+        time.sleep(0.001)
+    provider = _RecordingProvider()
+    assert drain(FAKE, provider=provider) > 0 and len(provider.calls) == 5
+    assert [topic for topic, _ in provider.calls[:2]] in (["git", "python"], ["python", "git"])
+    assert [topic for topic, _ in provider.calls[2:4]] in (["docker", "sql"], ["sql", "docker"])
+    assert provider.calls[4] == ("vim", "beginner")
+    assert provider.max_in_flight == 2
+    assert queue_status() == {"queued": 0, "running": 0, "oldest_wait_seconds": 0.0}
+    assert not _lock_is_held(_lock_path(dev_tip_home))
+
+
+def test_failed_refill_stays_queued(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    enqueue("git", None)
+    enqueue("sql", None)
+    enqueue("vim", None)
+    assert drain(FAKE, provider=_RecordingProvider(fail=True)) == 0
+    assert queue_status()["queued"] == 3
+    assert drain(FAKE) == 0  # Cooling down: nothing is tried
+
+
+def test_worker_crash_leaves_job_for_the_next(dev_tip_home, monkeypatch):
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    enqueue("git", None)
+    (job,) = (dev_tip_home / "prefetch.d").glob("*.job")
+    running = job.with_suffix(".running")
+    job.rename(running)  # Claimed by another worker
+    enqueue("git", None)
+    assert queue_status() == {"queued": 0, "running": 1, "oldest_wait_seconds": 0.0}
+    # A fresh claim may belong to a live worker: leave it alone
+    assert drain(FAKE) == 0 and running.exists()
+    old = time.time() - 3600
+    os.utime(running, (old, old))  # That worker died long ago
+    assert drain(FAKE) == 10
+    assert queue_status()["running"] == 0
+
+
+def test_refilled_key_is_skipped(dev_tip_home, monkeypatch):
+    from dev_tip.ai.cache import save_cache
+
+    monkeypatch.setattr("dev_tip.prefetch.LOCK_FILE", _lock_path(dev_tip_home))
+    enqueue("git", None)
+    save_cache(FakeProvider().generate_tips("git", None, 10), "git", None)  # A blocking fetch got there first
+    provider = _RecordingProvider()
+    assert drain(FAKE, provider=provider) == 0
+    assert provider.calls == [] and queue_status()["queued"] == 0
+
+
+def test_status_shows_queue(dev_tip_home):
+    from typer.testing import CliRunner
+
+    from dev_tip.cli import app
+
+    enqueue("git", None)
+    result = CliRunner().invoke(app, ["status"])
+    assert "Prefetch queue" in result.output and "queued:       1" in result.output
+    result = CliRunner().invoke(app, ["status", "--json"])
+    data = json.loads(result.output)
+    assert data["prefetch"]["queued"] == 1
+    assert data["metrics"]["gauges"]["prefetch_queue_depth"] == 1
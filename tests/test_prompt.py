@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from dev_tip.ai.prompt import (
+    WIRE_KEYS,
+    avoid_digest,
+    build_prompt,
+    build_structured_prompt,
+    gemini_response_schema,
+    openai_response_format,
+    parse_response,
+)
+
+
+def test_parse_free_form_fenced():
+    text = '```json\n[{"topic": "git", "title": "T", "body": "B", "level": "beginner"}]\n```'
+    [tip] = parse_response(text)
+    assert tip["topic"] == "git"
+    assert tip["example"] == ""
+    assert tip["source"] == "ai"
+    assert tip["id"].startswith("ai-")
+
+
+def test_parse_compact_keys_bare_and_wrapped():
+    compact = [{"t": "sql", "l": "advanced", "h": "Use EXPLAIN", "b": "Read plans.", "x": "EXPLAIN SELECT 1;"}]
+    for text in (json.dumps(compact), json.dumps({"tips": compact})):
+        [tip] = parse_response(text)
+        assert tip["title"] == "Use EXPLAIN"
+        assert tip["example"] == "EXPLAIN SELECT 1;"
+        assert "h" not in tip
+
+
+def test_parse_rejects_non_tips():
+    with pytest.raises(ValueError):
+        parse_response('{"answer": 42}')
+    with pytest.raises(ValueError):
+        parse_response('[{"t": "git"}]')
+
+
+def test_structured_prompt_is_shorter():
+    assert len(build_structured_prompt("git", "beginner", 10)) < len(build_prompt("git", "beginner", 10))
+    assert 'Topic must be "git"' in build_structured_prompt("git", None, 10)
+
+
+def test_schemas_cover_wire_keys():
+    items = gemini_response_schema()["items"]
+    assert items["required"] == list(WIRE_KEYS)
+    assert items["properties"]["l"]["enum"] == ["beginner", "intermediate", "advanced"]
+
+    schema = openai_response_format()["json_schema"]
+    assert schema["strict"] is True
+    tip = schema["schema"]["properties"]["tips"]["items"]
+    assert set(tip["properties"]) == set(WIRE_KEYS)
+    assert tip["additionalProperties"] is False
+
+
+def test_avoid_digest_skips_similar_titles_and_keeps_budget():
+    titles = ["Use git rebase -i", "Use git rebase -i!", "Rebase interactively with git", "Stash with a message"]
+    assert avoid_digest(titles) == ["Use git rebase -i", "Rebase interactively with git", "Stash with a message"]
+    assert avoid_digest(titles, budget=15) == ["Use git rebase -i", "Rebase interactively with git"]
+    assert avoid_digest([f"Tip number {n}" for n in range(100)], limit=5) == [f"Tip number {n}" for n in range(5)]
+
+
+def test_prompts_list_titles_to_avoid():
+    for build in (build_prompt, build_structured_prompt):
+        prompt = build("git", None, 10, avoid=["Use git   rebase -i", "Stash with a message"])
+        assert "do not repeat these or close variants:\n- Use git rebase -i\n- Stash with a message" in prompt
+        assert "Already known" not in build("git", None, 10)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import re
+
+from dev_tip.render import DIM, RESET, render_tip
+
+TIP = {
+    "id": "python-001",
+    "topic": "python",
+    "level": "beginner",
+    "title": "Use enumerate() instead of range(len())",
+    "body": "Instead of range(len(items)), use enumerate(items). " * 3,
+    "example": "for i, name in enumerate(names):\n    print(i, name)\n",
+}
+
+
+def test_render_plain_block(dev_tip_home):
+    block = render_tip(TIP, 100, color=False)
+    lines = block.splitlines()
+    assert lines[0] == ""
+    assert "python · beginner · Use enumerate()" in lines[1]
+    assert "\x1b[" not in block
+    # Right-floated: text starts after the padding
+    assert lines[1].startswith(" " * 40)
+    assert all(len(line) <= 100 for line in lines)
+    assert any(line.endswith("  for i, name in enumerate(names):") for line in lines)
+
+
+def test_render_wraps_long_example(dev_tip_home):
+    command = "docker run --rm -it -v $(pwd):/src -w /src -e HOME=/tmp --network host python:3.12-slim python -m pytest -q tests/"
+    tip = {**TIP, "id": "docker-001", "topic": "docker", "example": command + " " + "x" * 30}
+    assert len(tip["example"]) > 140
+    for color in (False, True):
+        lines = render_tip(tip, 80, color=color).splitlines()
+        plain = [re.sub(r"\x1b\[[0-9;]*m", "", line) for line in lines]
+        assert all(len(line) <= 80 for line in plain)
+    example_lines = plain[max(n for n, line in enumerate(plain) if not line) + 1 :]
+    assert len(example_lines) > 1
+    assert " ".join(example_lines).split() == tip["example"].split()
+
+
+def test_render_quiet_omits_header_and_example(dev_tip_home):
+    block = render_tip(TIP, 80, quiet=True, color=False)
+    assert "·" not in block
+    assert "enumerate(names)" not in block
+    assert "Instead of" in block
+
+
+def test_render_color_styles_and_highlights(dev_tip_home):
+    block = render_tip(TIP, 80, color=True)
+    assert DIM in block and RESET in block
+    example_line = next(line for line in block.splitlines() if "names" in line and "for" in line)
+    assert "\x1b[" in example_line
+
+
+def test_render_follows_width_and_content_without_state(dev_tip_home):
+    narrow = render_tip(TIP, 40, color=False)
+    wide = render_tip(TIP, 120, color=False)
+    assert narrow != wide
+    changed = render_tip(dict(TIP, body="Something else entirely."), 40, color=False)
+    assert "Something else" in changed
+    assert not any(dev_tip_home.iterdir())  # Nothing is cached on disk
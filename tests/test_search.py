@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from dev_tip.ai.cache import clear_cache, save_cache
+from dev_tip.search import DELTA_LIMIT, SearchIndex, build_index, search, tokenize
+
+
+def _tip(tip_id: str, title: str, body: str, topic: str = "python") -> dict:
+    return {"id": tip_id, "topic": topic, "level": "beginner", "title": title, "body": body}
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert tokenize("Use the Git REBASE command") == ["git", "rebase", "command"]
+
+
+def test_build_index_postings(tmp_path):
+    path = tmp_path / "search.idx"
+    build_index([_tip("a", "Rebase often", "git rebase"), _tip("b", "Merge", "git merge")], "fp", path)
+    with SearchIndex(path) as index:
+        assert index.doc_count == 2
+        assert index.fingerprint == "fp"
+        assert index.postings("git")[0::2] == [0, 1]
+        assert index.postings("rebase") == [0, 3]  # title weight 2 + body 1
+        assert index.postings("missing") == []
+        assert index.document(1)["title"] == "Merge"
+
+
+def test_search_bundled_tips(dev_tip_home):
+    results = search("enumerate")
+    assert results
+    assert results[0][1]["id"] == "python-001"
+
+
+def test_search_ranks_title_matches_first(dev_tip_home):
+    save_cache([
+        _tip("ai-1", "Zebra mentioned in passing", "nothing special here"),
+        _tip("ai-2", "Quokka quokka", "all about the quokka"),
+        _tip("ai-3", "Other", "a quokka appears once"),
+    ], "python", None)
+    ids = [tip["id"] for _, tip in search("quokka")]
+    assert ids == ["ai-2", "ai-3"]
+
+
+def test_save_cache_updates_index_incrementally(dev_tip_home):
+    search("warmup")  # builds the main segment
+    save_cache([_tip("ai-9", "Flamingo tricks", "pink birds")], "python", None)
+    assert (dev_tip_home / "search_delta.jsonl").exists()
+    assert [tip["id"] for _, tip in search("flamingo")] == ["ai-9"]
+
+
+def test_large_delta_folds_into_main_segment(dev_tip_home):
+    search("warmup")
+    save_cache([_tip(f"ai-{i}", f"Ocelot {i}", "cat") for i in range(DELTA_LIMIT + 1)], "python", None)
+    assert len(search("ocelot", limit=1000)) == DELTA_LIMIT + 1
+    assert not (dev_tip_home / "search_delta.jsonl").exists()
+
+
+def test_clear_cache_drops_cached_results(dev_tip_home):
+    save_cache([_tip("ai-5", "Narwhal", "tusks")], "python", None)
+    assert search("narwhal")
+    clear_cache()
+    assert search("narwhal") == []
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+
+import pytest
+from typer.testing import CliRunner
+
+from dev_tip import codec, statefile
+from dev_tip.ai import cache
+from dev_tip.ai.cache import load_cache, save_cache
+from dev_tip.cli import app
+from dev_tip.history import _load_history, mark_seen
+
+
+def _tip(n: int) -> dict:
+    return {"id": f"ai-{n}", "topic": "git", "level": "beginner", "title": f"Tip {n}", "body": f"Body {n}"}
+
+
+def _damage(data: bytes, rng: random.Random) -> bytes:
+    """Truncate, flip a byte or zero a span at a random point, as a crash or bad disk would."""
+    at = rng.randrange(len(data))
+    kind = rng.choice(["truncate", "flip", "zero"])
+    if kind == "truncate":
+        return data[:at]
+    if kind == "flip":
+        return data[:at] + bytes([data[at] ^ 0xFF]) + data[at + 1:]
+    return data[:at] + b"\0" * 64 + data[at + 64:]
+
+
+def test_write_read_and_keep_backup(dev_tip_home):
+    path = dev_tip_home / "state.json"
+    statefile.write(path, {"n": 1})
+    statefile.write(path, {"n": 2})
+    assert path.read_bytes().startswith(statefile.MAGIC)
+    assert statefile.read(path) == {"n": 2}
+    assert statefile.read(statefile.backup_path(path)) == {"n": 1}
+    with pytest.raises(statefile.CorruptState):
+        statefile.decode(path.read_bytes()[:-1])
+    with pytest.raises(FileNotFoundError):
+        statefile.read(dev_tip_home / "missing.json")
+
+
+def test_corrupt_cache_recovers_from_backup(dev_tip_home):
+    rng = random.Random(49)
+    save_cache([_tip(n) for n in range(20)], "git", "beginner")
+    save_cache([_tip(n) for n in range(20, 30)], "git", "advanced")
+    good = cache.CACHE_FILE.read_bytes()
+    before = statefile.read(statefile.backup_path(cache.CACHE_FILE))
+
+    for round in range(30):
+        cache.CACHE_FILE.write_bytes(_damage(good, rng))
+        assert cache._load_all(cache.CACHE_FILE) == before, round
+        # Healed on disk: the next read is clean and logs nothing
+        assert statefile.read(cache.CACHE_FILE) == before
+        assert len(statefile.recoveries(limit=100)) == round + 1
+        cache.CACHE_FILE.write_bytes(good)
+
+    assert len(list(dev_tip_home.glob("ai_cache.json.corrupt-*"))) == statefile.KEEP_QUARANTINED
+    entry = statefile.recoveries()[-1]
+    assert entry["action"] == "restored from backup" and entry["file"] == str(cache.CACHE_FILE)
+
+
+def test_corrupt_cache_without_backup_salvages_tips(dev_tip_home):
+    rng = random.Random(7)
+    tips = [_tip(n) for n in range(40)]
+    save_cache(tips, "git", "beginner")
+    good = cache.CACHE_FILE.read_bytes()
+    for _ in range(20):
+        damaged = _damage(good, rng)
+        cache.CACHE_FILE.write_bytes(damaged)
+        statefile.backup_path(cache.CACHE_FILE).write_bytes(b"\0" * 10)
+        # Exactly the tips the damage left intact
+        intact = [t for t in tips if codec.dumps(t) in damaged]
+        assert sorted(load_cache(None, None), key=lambda t: t["id"]) == sorted(intact, key=lambda t: t["id"])
+    assert "salvaged" in statefile.recoveries()[-1]["action"]
+
+
+def test_unrecoverable_file_is_quarantined(dev_tip_home):
+    cache.CACHE_FILE.write_bytes(b"\0" * 100)
+    assert load_cache(None, None) == []
+    assert not cache.CACHE_FILE.exists()
+    (entry,) = statefile.recoveries()
+    assert entry["action"] == "reset" and os.path.exists(entry["quarantined"])
+
+
+def test_ai_tip_survives_corrupt_cache(dev_tip_home):
+    from dev_tip.ai import get_ai_tip
+    from dev_tip.ai.fake import StandInServer
+
+    save_cache([_tip(n) for n in range(5)], "git", "beginner")
+    save_cache([_tip(n) for n in range(5, 10)], "git", "advanced")
+    data = cache.CACHE_FILE.read_bytes()
+    cache.CACHE_FILE.write_bytes(data[: len(data) // 2])
+    with StandInServer() as server:
+        config = {"ai_provider": "gemini", "ai_key": "k", "ai_base_url": server.url}
+        tip, _ = get_ai_tip("git", "beginner", config)
+    assert tip is not None and server.stats["requests"] == 0
+
+    result = CliRunner().invoke(app, ["status"])
+    assert "Recovered state files" in result.output and "ai_cache.json" in result.output
+    result = CliRunner().invoke(app, ["status", "--json"])
+    assert json.loads(result.output)["recoveries"][0]["action"] == "restored from backup"
+
+
+def test_torn_history_line_does_not_swallow_the_next(dev_tip_home):
+    mark_seen("a")
+    (segment,) = (dev_tip_home / "history.d").glob("*.log")
+    with open(segment, "ab") as f:
+        f.write(b"123\t+\tb")  # Torn by a crash
+    mark_seen("c")
+    assert {"a", "c"} <= set(_load_history())
+
+    # A garbled view is rebuilt rather than trusted
+    (view,) = (dev_tip_home / "history.d").glob(".*.view")
+    view.write_bytes(b"\0" * 16)
+    assert _load_history()[-1] == "c"
+
+
+def test_truncated_legacy_history_is_salvaged(dev_tip_home):
+    (dev_tip_home / "history.json").write_text(json.dumps(["one", "two", "three"])[:-8])
+    assert _load_history() == ["one", "two"]
+    assert not (dev_tip_home / "history.json").exists()
+    (entry,) = statefile.recoveries()
+    assert entry["action"] == "salvaged 2 tips" and "history.json.corrupt-" in entry["quarantined"]
+
+
+def test_threads_writing_one_file_never_corrupt_it(dev_tip_home):
+    from concurrent.futures import ThreadPoolExecutor
+
+    path = dev_tip_home / "state.json"
+
+    def writer(n: int) -> None:
+        for i in range(50):
+            statefile.write(path, {"writer": n, "i": i, "pad": "x" * 2000})
+            assert statefile.read(path)["i"] >= 0
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(writer, range(4)))
+    assert statefile.read(path)["i"] == 49
+    assert statefile.recoveries() == [] and not list(dev_tip_home.glob("*.corrupt-*"))
+    assert not list(dev_tip_home.glob(".*.tmp"))
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from dev_tip.store import TipStore, compile_store, open_store
+from dev_tip.tips import load_tips
+
+PACK = """\
+- id: runbook-001
+  topic: runbooks
+  title: Drain a node before patching
+  body: Use kubectl drain with --ignore-daemonsets.
+  level: intermediate
+- id: runbook-002
+  topic: runbooks
+  title: Missing body is skipped
+  level: beginner
+"""
+
+
+def test_compile_roundtrip(tmp_path):
+    tips = [
+        {"id": "a", "topic": "git", "level": "beginner", "title": "A", "body": "alpha"},
+        {"id": "b", "topic": "python", "level": "advanced", "title": "B", "body": "beta", "example": "x = 1"},
+        {"id": "c", "topic": "git", "level": "beginner", "title": "C", "body": "gamma"},
+    ]
+    path = tmp_path / "tips.bin"
+    compile_store(tips, "fp", path)
+
+    with TipStore(path) as store:
+        assert len(store) == 3
+        assert store.fingerprint == "fp"
+        assert store.topics() == {"git", "python"}
+        git = store.find(topic="git", level="beginner")
+        assert sorted(store.tip_id(i) for i in git) == ["a", "c"]
+        tip = store.get(store.find(topic="python")[0])
+        assert tip["id"] == "b"
+        assert tip["example"] == "x = 1"
+        assert tip["source"] == ""
+
+
+def test_open_store_matches_bundled(dev_tip_home):
+    with open_store() as store:
+        assert len(store) == len(load_tips())
+        python = store.find(topic="python", level="beginner")
+        assert python
+        assert all(store.get(i)["level"] == "beginner" for i in python)
+
+
+def test_open_store_includes_packs(dev_tip_home):
+    with open_store() as store:
+        assert "runbooks" not in store.topics()
+
+    packs = dev_tip_home / "packs"
+    packs.mkdir()
+    (packs / "team.yaml").write_text(PACK)
+
+    with open_store() as store:
+        ids = [store.tip_id(i) for i in store.find(topic="runbooks")]
+        assert ids == ["runbook-001"]
+
+
+def test_open_store_rebuilds_corrupt_file(dev_tip_home):
+    (dev_tip_home / "tips.bin").write_bytes(b"garbage")
+    with open_store() as store:
+        assert len(store) == len(load_tips())
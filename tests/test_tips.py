@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dev_tip.tips import VALID_LEVELS, VALID_TOPICS, filter_tips, load_tips
+from dev_tip.tips import VALID_LEVELS, VALID_TOPICS, filter_tips, load_tips, validate_tips
 
 
 def test_load_tips_returns_list():
@@ -39,3 +39,40 @@ def test_valid_topics_constant():
 
 def test_valid_levels_constant():
     assert VALID_LEVELS == {"beginner", "intermediate", "advanced"}
+
+
+def test_filter_by_topic_list_and_mix():
+    tips = load_tips()
+    both = filter_tips(tips, topic=["git", "sql"])
+    assert {t["topic"] for t in both} == {"git", "sql"}
+    assert filter_tips(tips, topic="git:3,sql:1") == both
+    assert filter_tips(tips, topic="git,*") == tips
+
+
+def test_bundled_tips_are_valid():
+    tips, errors = validate_tips(load_tips(), VALID_TOPICS)
+    assert errors == []
+    assert len(tips) == len(load_tips())
+
+
+def test_validate_tips_reports_problems():
+    good = {"id": "a", "topic": "git", "level": "beginner", "title": "T", "body": "B", "extra": 1}
+    tips, errors = validate_tips([
+        good,
+        {**good, "body": ""},
+        {**good, "id": "b", "level": "expert"},
+        {**good, "id": "c", "topic": "runbooks"},
+        {**good, "id": "d", "example": ["x"]},
+        dict(good),
+        "not a tip",
+    ], VALID_TOPICS)
+    assert tips == [{k: v for k, v in good.items() if k != "extra"}]
+    assert errors == [
+        "tip #2 (a): missing body",
+        "tip #3 (b): unknown level 'expert'",
+        "tip #4 (c): unknown topic 'runbooks'",
+        "tip #5 (d): example must be text",
+        "tip #6 (a): duplicate id",
+        "tip #7: not a mapping",
+    ]
+    assert validate_tips({"id": "a"}) == ([], ["expected a list of tips, got dict"])
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from typer.testing import CliRunner
+
+from dev_tip.cli import app
+from dev_tip.store import open_store
+from dev_tip.tips import load_tips
+from dev_tip.update import update
+
+runner = CliRunner()
+
+
+class FeedServer:
+    """Serves feed files from a dict with ETag/Last-Modified and 304s; logs (path, status)."""
+
+    def __init__(self) -> None:
+        self.files: dict[str, bytes] = {}
+        self.log: list[tuple[str, int]] = []
+        feed = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = feed.files.get(self.path.lstrip("/"))
+                if body is None:
+                    feed.log.append((self.path, 404))
+                    self.send_error(404)
+                    return
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    feed.log.append((self.path, 304))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                feed.log.append((self.path, 200))
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", formatdate(usegmt=True))
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/index.json"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def publish(self, name: str, data: dict) -> None:
+        self.files[name] = json.dumps(data).encode()
+
+    def manifest(self, serial: int, deltas: list[tuple[int, int]]) -> None:
+        self.publish("index.json", {
+            "format": "dev-tip-feed", "version": 1, "serial": serial,
+            "snapshot": f"snapshot-{serial}.json",
+            "deltas": [{"from": a, "to": b, "url": f"delta-{b}.json"} for a, b in deltas],
+        })
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture()
+def feed():
+    server = FeedServer()
+    yield server
+    server.close()
+
+
+def _tip(tip_id: str, title: str = "Feed tip") -> dict:
+    return {"id": tip_id, "topic": "git", "level": "beginner", "title": title, "body": f"{tip_id} body"}
+
+
+def test_snapshot_then_unchanged_costs_one_304(dev_tip_home, feed):
+    bundled = load_tips()
+    changed_id, deleted_id = bundled[0]["id"], bundled[1]["id"]
+    feed.publish("snapshot-1.json", {
+        "serial": 1, "tips": [_tip("feed-1"), _tip(changed_id, "Rewritten")], "delete": [deleted_id],
+    })
+    feed.manifest(1, [])
+
+    summary = update(feed.url)
+    assert summary["status"] == "snapshot" and summary["serial"] == 1
+    assert (summary["added"], summary["removed"]) == (2, 1)
+    tips = {t["id"]: t for t in load_tips()}
+    assert tips[changed_id]["title"] == "Rewritten"
+    assert "feed-1" in tips and deleted_id not in tips
+    assert len(tips) == len(bundled)
+
+    # The compiled store sees the overlay too
+    with open_store() as store:
+        ids = {store.tip_id(i) for i in range(len(store))}
+        assert "feed-1" in ids and deleted_id not in ids
+        assert len(store) == len(bundled)
+
+    feed.log.clear()
+    summary = update(feed.url)
+    assert summary["status"] == "unchanged" and summary["requests"] == 1
+    assert feed.log == [("/index.json", 304)]
+
+
+def test_deltas_are_followed_and_gaps_fall_back_to_snapshot(dev_tip_home, feed):
+    feed.publish("snapshot-1.json", {"serial": 1, "tips": [_tip("feed-1"), _tip("feed-2")]})
+    feed.manifest(1, [])
+    update(feed.url)
+
+    feed.publish("delta-2.json", {"from": 1, "to": 2, "upsert": [_tip("feed-3")], "delete": ["feed-1"]})
+    feed.publish("delta-3.json", {"from": 2, "to": 3, "upsert": [_tip("feed-2", "Edited"), {"id": "bad"}]})
+    feed.manifest(3, [(1, 2), (2, 3)])
+    feed.log.clear()
+    summary = update(feed.url)
+    assert summary["status"] == "delta"
+    assert (summary["added"], summary["changed"], summary["removed"], summary["invalid"]) == (1, 1, 1, 1)
+    assert [path for path, _ in feed.log] == ["/index.json", "/delta-2.json", "/delta-3.json"]
+    tips = {t["id"]: t for t in load_tips()}
+    assert "feed-1" not in tips and tips["feed-2"]["title"] == "Edited" and "feed-3" in tips
+
+    # Older deltas were dropped from the manifest: start over from the snapshot
+    feed.publish("snapshot-5.json", {"serial": 5, "tips": [_tip("feed-5")]})
+    feed.manifest(5, [(4, 5)])
+    feed.log.clear()
+    summary = update(feed.url)
+    assert summary["status"] == "snapshot"
+    assert [path for path, _ in feed.log] == ["/index.json", "/snapshot-5.json"]
+    ids = {t["id"] for t in load_tips()}
+    assert "feed-5" in ids and "feed-2" not in ids
+
+
+def test_update_command(dev_tip_home, feed):
+    result = runner.invoke(app, ["update"])
+    assert result.exit_code == 1 and "No update_url configured" in result.output
+
+    (dev_tip_home / "config.toml").write_text(f'update_url = "{feed.url}"\n')
+    feed.publish("index.json", {"format": "something-else"})
+    result = runner.invoke(app, ["update"])
+    assert result.exit_code == 1 and "not a dev-tip feed" in result.output
+
+    feed.publish("snapshot-1.json", {"serial": 1, "tips": [_tip("feed-1")]})
+    feed.manifest(1, [])
+    result = runner.invoke(app, ["update"])
+    assert result.exit_code == 0
+    assert "Updated to serial 1" in result.output and "1 new" in result.output
+    result = runner.invoke(app, ["update"])
+    assert "up to date (serial 1)" in result.output